@@ -49,6 +49,12 @@ def main():
         ("server_mirror/unified_engine/adapters.py", "unified_engine/adapters.py"),
         ("server_mirror/unified_engine/engine.py", "unified_engine/engine.py"),
         ("server_mirror/unified_engine/tick_sources.py", "unified_engine/tick_sources.py"),
+        ("server_mirror/unified_engine/tick_store.py", "unified_engine/tick_store.py"),
+        ("server_mirror/unified_engine/log_index.py", "unified_engine/log_index.py"),
+        ("server_mirror/unified_engine/log_files.py", "unified_engine/log_files.py"),
+        ("server_mirror/unified_engine/file_watch.py", "unified_engine/file_watch.py"),
+        ("server_mirror/unified_engine/tick_bus.py", "unified_engine/tick_bus.py"),
+        ("server_mirror/unified_engine/profiling.py", "unified_engine/profiling.py"),
         ("server_mirror/backtesting/strategies/v3_variants.py", "backtesting/strategies/v3_variants.py"),
         ("server_mirror/backtesting/strategies/simple_market_maker.py", "backtesting/strategies/simple_market_maker.py"),
         ("server_mirror/backtesting/engine.py", "backtesting/engine.py"),
@@ -3,30 +3,17 @@ import os
 import argparse
 import csv
 import time as time_module
-from datetime import datetime, timedelta, time
+from datetime import datetime, timedelta
 from pathlib import Path
 import json
 
 # Add server_mirror to path to ensure we use the correct code
 sys.path.insert(0, os.path.join(os.getcwd(), "server_mirror"))
 
-from server_mirror.unified_engine.engine import UnifiedEngine
-from server_mirror.unified_engine.adapters import SimAdapter
-from server_mirror.unified_engine.tick_sources import iter_ticks_from_market_logs
-from server_mirror.backtesting.engine import parse_market_date_from_ticker
-
-
-def _compute_holdings(adapter: SimAdapter) -> float:
-    holdings = 0.0
-    positions = adapter.get_positions()
-    for ticker, pos in positions.items():
-        yes_qty = int(pos.get("yes") or 0)
-        no_qty = int(pos.get("no") or 0)
-        last_price = adapter.last_prices.get(ticker, 50.0)
-        holdings += yes_qty * (last_price / 100.0)
-        holdings += no_qty * ((100.0 - last_price) / 100.0)
-    return holdings
-
+from server_mirror.unified_engine.backtest import BacktestConfig, BacktestRun, default_strategy_kwargs
+from server_mirror.unified_engine.tick_sources import iter_ticks_from_market_logs, market_logs_time_bounds
+from server_mirror.unified_engine.tick_store import iter_ticks_from_tick_store
+from server_mirror.unified_engine.tick_cache import iter_ticks_from_tick_cache, tick_cache_time_bounds
 
 
 def _build_decision_logger(path: str | None):
@@ -127,6 +114,23 @@ def main():
     parser.add_argument("--quiet", action="store_true", help="Suppress non-error output")
     parser.add_argument("--decision-log", type=str, default=None, help="Path to decision log CSV")
     parser.add_argument("--log-dir", type=str, default=r"vm_logs\market_logs", help="Directory containing market logs")
+    parser.add_argument(
+        "--tick-store",
+        type=str,
+        default="",
+        help="Columnar tick store dir built by unified_engine.tick_store ('auto' = <log-dir>/tick_store)",
+    )
+    parser.add_argument(
+        "--tick-cache",
+        type=str,
+        default="",
+        help="Shared memory-mapped tick cache dir (unified_engine.tick_cache); replaces --log-dir parsing",
+    )
+    parser.add_argument(
+        "--stream-ticks",
+        action="store_true",
+        help="Heap-merge market logs file by file instead of loading the whole history into memory",
+    )
     parser.add_argument("--famine-days", type=int, default=0, help="Consecutive losing days before pausing trading")
     parser.add_argument("--abundance-days", type=int, default=0, help="Consecutive winning days before resuming trading")
     parser.add_argument("--famine-daily-pct", type=float, default=0.0, help="Daily pct <= threshold counts as famine")
@@ -150,6 +154,11 @@ def main():
         default=0.0,
         help="Probability of passive fill per minute (0.0 to 1.0)",
     )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Time each engine phase per tick and write out_dir/engine_profile.json",
+    )
     args = parser.parse_args()
 
     os.environ["BT_VERBOSE"] = "1" if args.verbose else "0"
@@ -168,60 +177,33 @@ def main():
     end_ts = datetime.strptime(args.end_ts, "%Y-%m-%d %H:%M:%S")
     warmup_start_ts = start_ts - timedelta(hours=args.warmup_hours)
 
-    initial_cash = args.initial_cash
-    min_requote_interval = args.min_requote_interval
-
-    if ":" in args.strategy:
-        # Dynamic loading: module:function
-        import importlib
-        module_name, func_name = args.strategy.split(":")
-        mod = importlib.import_module(module_name)
-        strat_func = getattr(mod, func_name)
-    else:
-        # Legacy behavior
-        import server_mirror.backtesting.strategies.v3_variants as v3_variants
-        strat_func = getattr(v3_variants, args.strategy)
-
     if args.strategy_kwargs and args.strategy_kwargs != "{}":
         strategy_kwargs = json.loads(args.strategy_kwargs)
-    elif args.strategy == "generic_v3":
-        strategy_kwargs = {
-            "risk_pct": 0.8,
-            "max_notional_pct": 0.10,
-            "margin_cents": 8.0,
-            "tightness_percentile": 10,
-            "scaling_factor": 2.0,
-            "max_inventory": 150,
-            "max_loss_pct": 0.03
-        }
     else:
-        strategy_kwargs = {}
+        strategy_kwargs = default_strategy_kwargs(args.strategy)
 
     print(f"DEBUG_STRAT_ARGS: {args.strategy} strategy_kwargs={strategy_kwargs}")
 
-    def _build_strategy():
-        try:
-            strat = strat_func(**strategy_kwargs)
-        except TypeError:
-            strat = strat_func()
-
-        if args.max_loss_pct is not None:
-            try:
-                if hasattr(strat, "mm") and hasattr(strat.mm, "max_loss_pct"):
-                    strat.mm.max_loss_pct = float(args.max_loss_pct)
-                if hasattr(strat, "max_loss_pct"):
-                    strat.max_loss_pct = float(args.max_loss_pct)
-            except (TypeError, ValueError):
-                pass
-
-        if args.trade_all_day:
-            log("Disabling time constraints (trade-all-day)...")
-            strat.active_hours = list(range(24))
-        return strat
-
-    strategy = _build_strategy()
-
-    log(f"Loaded Strategy: {strategy.name}")
+    config = BacktestConfig(
+        start_ts=start_ts,
+        end_ts=end_ts,
+        strategy=args.strategy,
+        strategy_kwargs=strategy_kwargs,
+        initial_cash=args.initial_cash,
+        min_requote_interval=args.min_requote_interval,
+        warmup_hours=args.warmup_hours,
+        day_boundary_hour=args.day_boundary_hour,
+        trade_all_day=args.trade_all_day,
+        max_loss_pct=args.max_loss_pct,
+        famine_days=args.famine_days,
+        abundance_days=args.abundance_days,
+        famine_daily_pct=args.famine_daily_pct,
+        abundance_daily_pct=args.abundance_daily_pct,
+        resume_restart_mode=args.resume_restart_mode,
+        resume_restart_pct=args.resume_restart_pct,
+        fill_prob_per_min=args.fill_prob_per_min,
+        profile=args.profile,
+    )
 
     snapshot_path = args.snapshot
     log(f"Loading snapshot from: {snapshot_path}")
@@ -229,167 +211,91 @@ def main():
         snapshot = json.load(f)
 
     initial_positions = snapshot.get("positions", {})
-    log(f"Loaded {len(initial_positions)} initial positions from snapshot.")
-
-    adapter = SimAdapter(
-        initial_cash=initial_cash,
-        initial_positions=initial_positions,
-        diag_log=None,
-        fill_prob_per_min=args.fill_prob_per_min,
-    )
-
-    # Seed initial prices from snapshot cost basis to avoid equity spikes
-    for ticker, pos in initial_positions.items():
-        yes_qty = int(pos.get("yes") or 0)
-        no_qty = int(pos.get("no") or 0)
-        cost = float(pos.get("cost") or 0.0)
-        
-        if yes_qty > 0:
-            # Price in cents
-            adapter.last_prices[ticker] = (cost / yes_qty) * 100.0
-        elif no_qty > 0:
-            # Price in cents (implied YES price)
-            adapter.last_prices[ticker] = 100.0 - ((cost / no_qty) * 100.0)
 
     decision_log_path = args.decision_log
     decision_log = None
     if decision_log_path:
         decision_log = _build_decision_logger(decision_log_path)
 
-    engine = UnifiedEngine(
-        strategy=strategy,
-        adapter=adapter,
-        min_requote_interval=min_requote_interval,
-        diag_log=None,
+    run = BacktestRun(
+        config,
+        initial_positions,
         decision_log=decision_log,
+        verbose=args.verbose,
+        quiet=args.quiet,
+        log=log,
     )
+    log(f"Loaded Strategy: {run.base_strategy.name}")
+    log(f"Loaded {len(initial_positions)} initial positions from snapshot.")
+    adapter = run.adapter
+
+    # Only ticks from warmup start onward are used, so let the tick sources
+    # seek past older history instead of parsing and discarding it.
+    load_end_ts = end_ts if args.end_ts != default_end_ts else None
+
+    def _load_ticks():
+        if args.tick_cache:
+            return iter_ticks_from_tick_cache(args.tick_cache, start_ts=warmup_start_ts, end_ts=load_end_ts)
+        if args.tick_store:
+            store_dir = None if args.tick_store == "auto" else args.tick_store
+            return iter_ticks_from_tick_store(
+                log_dir, store_dir=store_dir, start_ts=warmup_start_ts, end_ts=load_end_ts
+            )
+        return iter_ticks_from_market_logs(
+            log_dir, stream=args.stream_ticks, start_ts=warmup_start_ts, end_ts=load_end_ts
+        )
 
-    famine_enabled = args.famine_days > 0 and args.abundance_days > 0
-    resume_on_restart = args.resume_restart_mode != "off"
-    gate_state = {
-        "enabled": True,
-        "current_day": None,
-        "day_start_equity": None,
-        "last_day_equity": None,
-        "neg_streak": 0,
-        "pos_streak": 0,
-    }
-    shadow_state = {
-        "day": None,
-        "start_equity": None,
-        "last_equity": None,
-        "adapter": None,
-        "engine": None,
-    }
-
-    if famine_enabled:
-        class _GatedStrategy:
-            def __init__(self, base, gate):
-                self._base = base
-                self._gate = gate
-                self.name = getattr(base, "name", "gated")
-
-            def __getattr__(self, item):
-                return getattr(self._base, item)
-
-            def on_market_update(self, *args, **kwargs):
-                if not self._gate["enabled"]:
-                    return []
-                return self._base.on_market_update(*args, **kwargs)
-
-        strategy = _GatedStrategy(strategy, gate_state)
-        engine.strategy = strategy
-
-    log(f"Loading ticks from {log_dir}...")
-    ticks = list(iter_ticks_from_market_logs(log_dir))
-    log(f"Loaded {len(ticks)} ticks.")
-    if args.end_ts == default_end_ts and ticks:
-        # If the user did not set an end bound, align to last available tick for accurate progress/ETA.
-        last_tick_ts = max(tick["time"] for tick in ticks if tick.get("time"))
-        if last_tick_ts < end_ts:
-            end_ts = last_tick_ts
-            log(f"Auto end_ts set to last tick: {end_ts}")
+    if args.tick_cache or (args.stream_ticks and not args.tick_store):
+        if args.tick_cache:
+            log(f"Attaching shared tick cache {args.tick_cache}...")
+        else:
+            log(f"Streaming ticks from {log_dir}...")
+        ticks = _load_ticks()
+        if args.end_ts == default_end_ts:
+            if args.tick_cache:
+                _, last_tick_ts = tick_cache_time_bounds(args.tick_cache)
+            else:
+                _, last_tick_ts = market_logs_time_bounds(log_dir)
+            if last_tick_ts and last_tick_ts < end_ts:
+                end_ts = last_tick_ts
+                log(f"Auto end_ts set to last tick: {end_ts}")
+    else:
+        if args.tick_store:
+            log(f"Loading ticks from tick store ({args.tick_store}) with CSV fallback from {log_dir}...")
+        else:
+            log(f"Loading ticks from {log_dir}...")
+        ticks = list(_load_ticks())
+        log(f"Loaded {len(ticks)} ticks.")
+        if args.end_ts == default_end_ts and ticks:
+            # If the user did not set an end bound, align to last available tick for accurate progress/ETA.
+            last_tick_ts = max(tick["time"] for tick in ticks if tick.get("time"))
+            if last_tick_ts < end_ts:
+                end_ts = last_tick_ts
+                log(f"Auto end_ts set to last tick: {end_ts}")
+    config.end_ts = end_ts
 
     log(f"Starting Warmup from {warmup_start_ts} to {start_ts}...")
     log(f"Simulation Start: {start_ts}")
 
     count = 0
-    warmup_count = 0
     sim_start_perf_time = time_module.perf_counter()
-    equity_history = []
-    equity_breakdowns = []
-    last_breakdown_date = None
-    started = False
-
-    def record_equity(record_ts: datetime) -> float:
-        nonlocal last_breakdown_date
-        cash_val = adapter.get_cash()
-        holdings_val = _compute_holdings(adapter)
-        equity_val = cash_val + holdings_val
-        equity_history.append(
-            {
-                "date": record_ts.isoformat(),
-                "equity": equity_val,
-                "cash": cash_val,
-                "holdings": holdings_val,
-            }
-        )
-        # Record breakdown once per day (on the first tick of each day)
-        current_date = record_ts.date()
-        if last_breakdown_date is None or current_date > last_breakdown_date:
-            positions = adapter.get_positions()
-            for ticker, pos in positions.items():
-                yes_qty = int(pos.get("yes") or 0)
-                no_qty = int(pos.get("no") or 0)
-                last_price = adapter.last_prices.get(ticker, 50.0)
-                value = (yes_qty * (last_price / 100.0)) + (no_qty * ((100.0 - last_price) / 100.0))
-                equity_breakdowns.append(
-                    {
-                        "date": current_date.isoformat(),
-                        "ticker": ticker,
-                        "yes_qty": yes_qty,
-                        "no_qty": no_qty,
-                        "last_price": last_price,
-                        "value": value,
-                        "cash": cash_val,
-                        "equity": equity_val,
-                    }
-                )
-            last_breakdown_date = current_date
-        return equity_val
-
-    settled_dates: set[tuple[str, datetime.date]] = set()
 
     # Look-forward seeder for tickers missing from warmup
-    # Find the first index where t >= start_ts
-    start_idx = 0
-    for i, tick in enumerate(ticks):
-        if tick["time"] >= start_ts:
-            start_idx = i
-            break
-    
-    missing_tickers = [t for t in initial_positions if t not in adapter.last_prices]
+    missing_tickers = run.missing_price_tickers()
     if missing_tickers:
         log(f"Looking forward for {len(missing_tickers)} missing ticker prices...")
-        for ticker in missing_tickers:
-            # Search forward from start_idx
-            for i in range(start_idx, len(ticks)):
-                if ticks[i]["ticker"] == ticker:
-                    ms = ticks[i]["market_state"]
-                    ya = ms.get("yes_ask")
-                    yb = ms.get("yes_bid")
-                    price = None
-                    if ya is not None and yb is not None:
-                        price = (float(ya) + float(yb)) / 2.0
-                    elif ya is not None:
-                        price = float(ya)
-                    elif yb is not None:
-                        price = float(yb)
-                    
-                    if price is not None:
-                        adapter.last_prices[ticker] = price
-                        log(f"  Found forward price for {ticker}: {price}")
-                        break
+        if isinstance(ticks, list):
+            # Find the first index where t >= start_ts
+            start_idx = 0
+            for i, tick in enumerate(ticks):
+                if tick["time"] >= start_ts:
+                    start_idx = i
+                    break
+            forward_ticks = ticks[start_idx:]
+        else:
+            # Streaming: scan a second cursor instead of holding the history.
+            forward_ticks = (tick for tick in _load_ticks() if tick["time"] >= start_ts)
+        run.seed_forward_prices(forward_ticks)
 
     for tick in ticks:
         t = tick["time"]
@@ -401,110 +307,9 @@ def main():
             break
 
         if t < start_ts:
-            warmup_count += 1
-            if warmup_count % 10000 == 0:
-                if args.verbose and not args.quiet:
-                    print(f"Warmup processed {warmup_count} ticks... Current: {t}")
-
-            portfolios_inventories = {"MM": {"YES": 0, "NO": 0}}
-            active_orders = []
-            spendable_cash = initial_cash
-
-            adapter.process_tick(tick["ticker"], tick["market_state"], t)
-
-            strategy.on_market_update(
-                tick["ticker"],
-                tick["market_state"],
-                t,
-                portfolios_inventories,
-                active_orders,
-                spendable_cash,
-            )
+            run.on_warmup_tick(tick)
             continue
 
-        if not started:
-            started = True
-        
-        equity_val = record_equity(t)
-
-        if famine_enabled:
-            if args.day_boundary_hour:
-                day = (t - timedelta(hours=args.day_boundary_hour)).date()
-            else:
-                day = t.date()
-            if gate_state["current_day"] is None:
-                gate_state["current_day"] = day
-                gate_state["day_start_equity"] = equity_val
-                gate_state["last_day_equity"] = equity_val
-            elif day == gate_state["current_day"]:
-                gate_state["last_day_equity"] = equity_val
-            else:
-                # Day rolled over: evaluate previous day performance
-                start_eq = gate_state["day_start_equity"]
-                end_eq = gate_state["last_day_equity"]
-                if start_eq and end_eq is not None:
-                    daily_pct = ((end_eq / start_eq) - 1.0) * 100.0
-                    if daily_pct <= args.famine_daily_pct:
-                        gate_state["neg_streak"] += 1
-                        gate_state["pos_streak"] = 0
-                    elif daily_pct >= args.abundance_daily_pct:
-                        gate_state["pos_streak"] += 1
-                        gate_state["neg_streak"] = 0
-                    else:
-                        gate_state["neg_streak"] = 0
-                        gate_state["pos_streak"] = 0
-
-                if gate_state["enabled"] and gate_state["neg_streak"] >= args.famine_days:
-                    gate_state["enabled"] = False
-                    if not args.quiet:
-                        print(f"[FAMINE] Pausing at {t} after {gate_state['neg_streak']} losing days")
-                    for order in list(adapter.open_orders):
-                        adapter.cancel_order(order.get("order_id"))
-                elif (not gate_state["enabled"]) and (not resume_on_restart) and gate_state["pos_streak"] >= args.abundance_days:
-                    gate_state["enabled"] = True
-                    if not args.quiet:
-                        print(f"[ABUNDANCE] Resuming at {t} after {gate_state['pos_streak']} winning days")
-                    gate_state["neg_streak"] = 0
-                    gate_state["pos_streak"] = 0
-
-                if resume_on_restart and not gate_state["enabled"] and args.resume_restart_mode == "eod":
-                    start_eq = shadow_state["start_equity"]
-                    end_eq = shadow_state["last_equity"]
-                    if start_eq and end_eq is not None:
-                        restart_pct = ((end_eq / start_eq) - 1.0) * 100.0
-                        if restart_pct >= args.resume_restart_pct:
-                            gate_state["enabled"] = True
-                            gate_state["neg_streak"] = 0
-                            gate_state["pos_streak"] = 0
-                            if not args.quiet:
-                                print(
-                                    f"[RESTART] Resuming at {t} (EOD restart ROI {restart_pct:.2f}%)"
-                                )
-
-                gate_state["current_day"] = day
-                gate_state["day_start_equity"] = equity_val
-                gate_state["last_day_equity"] = equity_val
-                if resume_on_restart and not gate_state["enabled"]:
-                    shadow_state["day"] = day
-                    shadow_state["start_equity"] = adapter.get_cash()
-                    shadow_state["last_equity"] = shadow_state["start_equity"]
-                    shadow_adapter = SimAdapter(initial_cash=shadow_state["start_equity"])
-                    shadow_engine = UnifiedEngine(
-                        strategy=_build_strategy(),
-                        adapter=shadow_adapter,
-                        min_requote_interval=min_requote_interval,
-                        diag_log=None,
-                        decision_log=None,
-                    )
-                    shadow_state["adapter"] = shadow_adapter
-                    shadow_state["engine"] = shadow_engine
-                else:
-                    shadow_state["day"] = None
-                    shadow_state["start_equity"] = None
-                    shadow_state["last_equity"] = None
-                    shadow_state["adapter"] = None
-                    shadow_state["engine"] = None
-
         count += 1
         if count % 10000 == 0:
             if not args.quiet:
@@ -530,59 +335,7 @@ def main():
                 else:
                     print(f"Sim processed {count} ticks... Current: {t}")
 
-        engine.on_tick(
-            ticker=tick["ticker"],
-            market_state=tick["market_state"],
-            current_time=t,
-            tick_seq=tick.get("seq"),
-            tick_source=tick.get("source_file"),
-            tick_row=tick.get("source_row"),
-        )
-
-        if resume_on_restart and not gate_state["enabled"]:
-            shadow_engine = shadow_state.get("engine")
-            shadow_adapter = shadow_state.get("adapter")
-            if shadow_engine is not None and shadow_adapter is not None:
-                shadow_engine.on_tick(
-                    ticker=tick["ticker"],
-                    market_state=tick["market_state"],
-                    current_time=t,
-                    tick_seq=tick.get("seq"),
-                    tick_source=tick.get("source_file"),
-                    tick_row=tick.get("source_row"),
-                )
-                shadow_equity = shadow_adapter.get_cash() + _compute_holdings(shadow_adapter)
-                shadow_state["last_equity"] = shadow_equity
-                if args.resume_restart_mode == "intraday":
-                    start_eq = shadow_state["start_equity"]
-                    if start_eq and ((shadow_equity / start_eq) - 1.0) * 100.0 >= args.resume_restart_pct:
-                        gate_state["enabled"] = True
-                        gate_state["neg_streak"] = 0
-                        gate_state["pos_streak"] = 0
-                        shadow_state["day"] = None
-                        shadow_state["start_equity"] = None
-                        shadow_state["last_equity"] = None
-                        shadow_state["adapter"] = None
-                        shadow_state["engine"] = None
-                        if not args.quiet:
-                            print(
-                                f"[RESTART] Resuming at {t} (intraday restart ROI >= {args.resume_restart_pct:.2f}%)"
-                            )
-
-        for ticker in list(adapter.positions.keys()):
-            m_dt = parse_market_date_from_ticker(ticker)
-            if m_dt:
-                settle_dt = datetime.combine(m_dt.date() + timedelta(days=1), time(5, 0, 0))
-                if t >= settle_dt and (ticker, m_dt.date()) not in settled_dates:
-                    last_price = adapter.last_prices.get(ticker, 50.0)
-                    settle_price = 100.0 if last_price >= 50.0 else 0.0
-
-                    if args.verbose and not args.quiet:
-                        print(f"*** SETTLING {ticker} at {t} (Price: {settle_price}) ***")
-                    payout = adapter.settle_market(ticker, settle_price, t)
-                    if args.verbose and not args.quiet:
-                        print(f"*** Payout: ${payout:.2f} | New Cash: ${adapter.cash:.2f} ***")
-                    settled_dates.add((ticker, m_dt.date()))
+        run.on_tick(tick)
 
     log("Backtest Complete.")
     log(f"Trades: {len(adapter.trades)}")
@@ -592,24 +345,11 @@ def main():
 
     log("\nFinal Holdings:")
     total_mtm = 0.0
-    positions = adapter.get_positions()
-    if not positions:
+    holdings = run.final_holdings()
+    if not holdings:
         log("  None")
     else:
-        for ticker, pos in positions.items():
-            yes_qty = pos.get("yes", 0)
-            no_qty = pos.get("no", 0)
-            last_yes_price = adapter.last_prices.get(ticker, 0.0)
-
-            if yes_qty > 0:
-                mark_price = last_yes_price
-                val = yes_qty * (mark_price / 100.0)
-                pos_str = f"{yes_qty} YES"
-            else:
-                mark_price = 100.0 - last_yes_price
-                val = no_qty * (mark_price / 100.0)
-                pos_str = f"{no_qty} NO"
-
+        for ticker, pos_str, mark_price, val in holdings:
             total_mtm += val
             log(
                 f"  {ticker:25} | {pos_str:8} | Mark Price: {mark_price:5.1f} | Value: ${val:6.2f}"
@@ -618,17 +358,10 @@ def main():
     log(f"\nTotal MTM Value: ${total_mtm:.2f}")
     print(f"Total Portfolio Value: ${final_cash + total_mtm:.2f}")
 
-    import pandas as pd
-
-    trades_df = pd.DataFrame(adapter.trades)
-    trades_df.to_csv(out_dir / "unified_trades.csv", index=False)
-    if equity_history:
-        equity_df = pd.DataFrame(equity_history)
-        equity_df.to_csv(out_dir / "equity_history.csv", index=False)
-    if equity_breakdowns:
-        breakdown_df = pd.DataFrame(equity_breakdowns)
-        breakdown_df.to_csv(out_dir / "equity_breakdown.csv", index=False)
+    run.write_outputs(out_dir)
     log(f"\nSaved trades to {out_dir / 'unified_trades.csv'}")
+    if args.profile:
+        log(f"Saved engine profile to {out_dir / 'engine_profile.json'}")
 
 
 if __name__ == "__main__":
@@ -480,6 +480,9 @@ class MicroScalper(ComplexStrategy):
         return None
 
 class RegimeSwitcher(ComplexStrategy):
+    # Only reads its inputs, so the unified engine may pass its cached order views.
+    shared_order_view = True
+
     def __init__(
         self,
         name,
@@ -663,12 +666,16 @@ class ComplexBacktester:
 
     def load_all_data(self):
         print(f"Loading data from {self.log_dir}...")
-        files = sorted(glob.glob(os.path.join(self.log_dir, "market_data_*.csv")))
+        # Settled dates may have been rotated to .csv.gz; pandas decompresses those itself.
+        files = sorted(
+            glob.glob(os.path.join(self.log_dir, "market_data_*.csv"))
+            + glob.glob(os.path.join(self.log_dir, "market_data_*.csv.gz"))
+        )
         
         # Filter by date
         filtered_files = []
         for f in files:
-            date_str = os.path.basename(f).split('-')[-1].replace('.csv', '')
+            date_str = os.path.basename(f).split('-')[-1].replace('.gz', '').replace('.csv', '')
             try:
                 file_dt = datetime.strptime(date_str, "%y%b%d")
             except Exception:
@@ -2,6 +2,7 @@
 from dataclasses import dataclass
 from datetime import datetime
 import csv
+import gzip
 import json
 import math
 import os
@@ -17,6 +18,9 @@ class Order:
     source: str = "MM"
 
 class SimpleMarketMaker:
+    # Only reads its inputs, so the unified engine may pass its cached order views.
+    shared_order_view = True
+
     def __init__(self, spread_cents: int = 4, risk_pct: float = 0.5, min_qty: int = 1, max_qty: int = 100, qty: int = None, max_price: int = 99, max_pos: int = 0, skew_factor: float = 0.0, min_gap_cents: int | None = None):
         if qty:
             self.name = f"SimpleMM_s{spread_cents}_q{qty}_max{max_price}_lim{max_pos}_skew{skew_factor}"
@@ -185,24 +189,86 @@ def simple_mm_fixed(**kwargs):
 
 
 class LadderCache:
+    """Latest full ladder per ticker from the logger's ladder files.
+
+    Reads both the legacy orderbook_ladder_*.csv snapshots and the
+    ladder_stream_*.csv keyframe/delta stream, and serves whichever is newer.
+    A streamed ladder is rebuilt from its last keyframe plus every delta
+    after it; since the stream only records changes, its age is that of the
+    newest row in the file (heartbeats included), not of the ticker's last
+    change.
+    """
+
     def __init__(self, log_dir: str, refresh_interval_s: float = 2.0):
         self.log_dir = log_dir
         self.refresh_interval_s = refresh_interval_s
         self.cache = {}  # ticker -> {"ts": datetime, "yes": [[p,q]], "no": [[p,q]]}
         self.file_state = {}  # path -> {"offset": int, "last_read": float}
+        self.stream_books = {}  # ticker -> {"ts": datetime, "yes": {p: q}, "no": {p: q}, "view": (yes, no) | None}
 
-    def _ladder_path(self, ticker: str) -> str:
+    def _date_code(self, ticker: str) -> str:
         try:
             parts = ticker.split('-')
             if len(parts) >= 2:
-                market_date_code = f"{parts[0]}-{parts[1]}"
-            else:
-                market_date_code = "UNKNOWN"
+                return f"{parts[0]}-{parts[1]}"
         except Exception:
-            market_date_code = "UNKNOWN"
-        return os.path.join(self.log_dir, f"orderbook_ladder_{market_date_code}.csv")
+            pass
+        return "UNKNOWN"
+
+    def _ladder_path(self, ticker: str) -> str:
+        return os.path.join(self.log_dir, f"orderbook_ladder_{self._date_code(ticker)}.csv")
+
+    def _stream_path(self, ticker: str) -> str:
+        return os.path.join(self.log_dir, f"ladder_stream_{self._date_code(ticker)}.csv")
+
+    def _load_rotated(self, path: str) -> None:
+        """Read a settled date's <ladder>.csv.gz once; rotated files only grow by rotation."""
+        gz_path = path + ".gz"
+        try:
+            stat = os.stat(gz_path)
+        except FileNotFoundError:
+            return
+        state = self.file_state.get(gz_path)
+        if state is not None and state["size"] == stat.st_size:
+            return
+        state = {"size": stat.st_size, "bad_rows": 0}
+        try:
+            with gzip.open(gz_path, "rt", encoding="utf-8", newline="") as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                self._ingest_rows(reader, state, gz_path)
+        except (OSError, EOFError) as e:
+            print(f"DEBUG: LadderCache failed reading {gz_path}: {e}")
+        self.file_state[gz_path] = state
+
+    def _ingest_rows(self, reader, state: dict, path: str) -> None:
+        for row in reader:
+            if len(row) < 4:
+                state["bad_rows"] += 1
+                if state["bad_rows"] % 25 == 0:
+                    print(f"DEBUG: LadderCache skipped {state['bad_rows']} bad rows in {path}")
+                continue
+            ts_raw, ticker, yes_raw, no_raw = row[0], row[1], row[2], row[3]
+            if not ticker:
+                state["bad_rows"] += 1
+                continue
+            try:
+                ts = datetime.fromisoformat(ts_raw)
+            except Exception:
+                state["bad_rows"] += 1
+                continue
+            try:
+                yes = json.loads(yes_raw) if yes_raw else []
+                no = json.loads(no_raw) if no_raw else []
+                yes = [[int(p), int(q)] for p, q in yes]
+                no = [[int(p), int(q)] for p, q in no]
+            except Exception:
+                state["bad_rows"] += 1
+                continue
+            self.cache[ticker] = {"ts": ts, "yes": yes, "no": no}
 
     def _refresh_file(self, path: str) -> None:
+        self._load_rotated(path)
         try:
             stat = os.stat(path)
         except FileNotFoundError:
@@ -235,40 +301,127 @@ class LadderCache:
             reader = csv.reader(f)
             if state["offset"] == 0:
                 next(reader, None)
-            for row in reader:
-                if len(row) < 4:
-                    state["bad_rows"] += 1
-                    if state["bad_rows"] % 25 == 0:
-                        print(f"DEBUG: LadderCache skipped {state['bad_rows']} bad rows in {path}")
-                    continue
-                ts_raw, ticker, yes_raw, no_raw = row[0], row[1], row[2], row[3]
-                if not ticker:
-                    state["bad_rows"] += 1
-                    continue
-                try:
-                    ts = datetime.fromisoformat(ts_raw)
-                except Exception:
-                    state["bad_rows"] += 1
-                    continue
-                try:
-                    yes = json.loads(yes_raw) if yes_raw else []
-                    no = json.loads(no_raw) if no_raw else []
-                    yes = [[int(p), int(q)] for p, q in yes]
-                    no = [[int(p), int(q)] for p, q in no]
-                except Exception:
-                    state["bad_rows"] += 1
-                    continue
-                self.cache[ticker] = {"ts": ts, "yes": yes, "no": no}
+            self._ingest_rows(reader, state, path)
             state["offset"] = f.tell()
             state["last_read"] = time.time()
         self.file_state[path] = state
 
+    def _ingest_stream(self, handle, state: dict, path: str) -> int:
+        """Apply the complete rows read from a binary handle; returns the bytes consumed."""
+        lines = []
+        consumed = 0
+        bad_before = state["bad_rows"]
+        for line in handle:
+            if not line.endswith(b"\n"):
+                break  # the logger is mid-row; pick it up on the next refresh
+            consumed += len(line)
+            lines.append(line.decode("utf-8", errors="replace"))
+        for row in csv.reader(lines):
+            if len(row) < 5:
+                if row:
+                    state["bad_rows"] += 1
+                continue
+            ts_raw, ticker, kind, yes_raw, no_raw = row[0], row[1], row[2], row[3], row[4]
+            try:
+                ts = datetime.fromisoformat(ts_raw)
+            except ValueError:
+                state["bad_rows"] += 1
+                continue
+            state["ts"] = ts
+            if kind == "H":
+                continue
+            try:
+                yes = [(int(p), int(q)) for p, q in json.loads(yes_raw or "[]")]
+                no = [(int(p), int(q)) for p, q in json.loads(no_raw or "[]")]
+            except (ValueError, TypeError):
+                state["bad_rows"] += 1
+                continue
+            if kind == "K":
+                self.stream_books[ticker] = {"ts": ts, "yes": dict(yes), "no": dict(no), "view": None}
+                state["tickers"].add(ticker)
+                continue
+            book = self.stream_books.get(ticker)
+            if kind != "D" or book is None:
+                # A delta before the ticker's first keyframe cannot be applied.
+                continue
+            for side, levels in (("yes", yes), ("no", no)):
+                side_levels = book[side]
+                for price, qty in levels:
+                    if qty > 0:
+                        side_levels[price] = qty
+                    else:
+                        side_levels.pop(price, None)
+            book["ts"] = ts
+            book["view"] = None
+        if state["bad_rows"] // 25 > bad_before // 25:
+            print(f"DEBUG: LadderCache skipped {state['bad_rows']} bad rows in {path}")
+        return consumed
+
+    def _refresh_stream(self, path: str) -> None:
+        state = self.file_state.get(path)
+        if state is None:
+            state = {"offset": 0, "gz_size": None, "last_read": 0.0, "ts": None, "tickers": set(), "bad_rows": 0}
+            self.file_state[path] = state
+        if time.time() - state["last_read"] < self.refresh_interval_s:
+            return
+        state["last_read"] = time.time()
+        try:
+            gz_size = os.path.getsize(path + ".gz")
+        except OSError:
+            gz_size = None
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            size = 0
+        if gz_size != state["gz_size"] or size < state["offset"]:
+            # Rotated or rewritten: rebuild this date's ladders from the top.
+            for ticker in state["tickers"]:
+                self.stream_books.pop(ticker, None)
+            state.update(offset=0, gz_size=gz_size, ts=None, tickers=set())
+            if gz_size is not None:
+                try:
+                    with gzip.open(path + ".gz", "rb") as f:
+                        f.readline()
+                        self._ingest_stream(f, state, path + ".gz")
+                except (OSError, EOFError) as e:
+                    print(f"DEBUG: LadderCache failed reading {path}.gz: {e}")
+        if size <= state["offset"]:
+            return
+        with open(path, "rb") as f:
+            f.seek(state["offset"])
+            if state["offset"] == 0:
+                header = f.readline()
+                if not header.endswith(b"\n"):
+                    return
+                state["offset"] = len(header)
+            state["offset"] += self._ingest_stream(f, state, path)
+
+    def _streamed(self, ticker: str):
+        book = self.stream_books.get(ticker)
+        if book is None:
+            return None
+        if book["view"] is None:
+            book["view"] = (
+                [[p, q] for p, q in sorted(book["yes"].items(), reverse=True)],
+                [[p, q] for p, q in sorted(book["no"].items(), reverse=True)],
+            )
+        file_ts = self.file_state[self._stream_path(ticker)]["ts"]
+        ts = max(book["ts"], file_ts) if file_ts is not None else book["ts"]
+        return {"ts": ts, "yes": book["view"][0], "no": book["view"][1]}
+
     def get(self, ticker: str, now: datetime):
         path = self._ladder_path(ticker)
         self._refresh_file(path)
-        return self.cache.get(ticker)
+        self._refresh_stream(self._stream_path(ticker))
+        snapshot = self.cache.get(ticker)
+        streamed = self._streamed(ticker)
+        if streamed is None or (snapshot is not None and snapshot["ts"] > streamed["ts"]):
+            return snapshot
+        return streamed
 
 class SimpleMarketMakerV2:
+    shared_order_view = True
+
     def __init__(self, spread_cents: int = 4, risk_pct: float = 0.5, min_qty: int = 1, qty: int = None, max_price: int = 99, skew_factor: float = 0.1, min_gap_cents: int | None = None,
                  ladder_depth: int = 10, ladder_stale_s: float = 10.0, ladder_refresh_s: float = 2.0,
                  ladder_min_depth_qty: int = 10, exit_slip_cents: int = 1, exit_safety_factor: float = 0.5,
@@ -6,7 +6,13 @@ import requests
 import csv
 import os
 import base64
-from datetime import datetime
+import collections
+import gzip
+import queue
+import shutil
+import struct
+import threading
+from datetime import datetime, timedelta
 from cryptography.hazmat.primitives import serialization, hashes
 from cryptography.hazmat.primitives.asymmetric import padding
 
@@ -21,10 +27,85 @@ PRIVATE_KEY_PATH = os.environ.get("KALSHI_PRIVATE_KEY", "kalshi_prod_private_key
 WS_URL = "wss://api.elections.kalshi.com/trade-api/ws/v2"
 API_URL = "https://api.elections.kalshi.com/trade-api/v2"
 LOG_DIR = os.environ.get("KALSHI_LOG_DIR", "market_logs") # Directory to store CSVs
+# Comma-separated Kalshi series to record over one websocket
+SERIES = [s.strip() for s in os.environ.get("KALSHI_SERIES", "KXHIGHNY").split(",") if s.strip()]
 # Hardcoded ladder logging settings (do not override via env)
 LADDER_DEPTH = 10
 LADDER_INTERVAL_S = 5.0
 LADDER_TRIGGER_SPREAD = 0.0  # cents
+# "stream": full-depth keyframes plus changed levels (ladder_stream_*.csv)
+# "snapshot": top LADDER_DEPTH levels every LADDER_INTERVAL_S (orderbook_ladder_*.csv)
+LADDER_MODE = os.environ.get("KALSHI_LADDER_MODE", "stream")
+LADDER_DELTA_INTERVAL_S = 0.5  # level changes are coalesced per ticker for this long
+LADDER_KEYFRAME_S = 60.0  # a changing ticker gets a full-depth keyframe at least this often
+LADDER_HEARTBEAT_S = 5.0  # a silent stream file for a current market date gets an empty row so readers know it is live
+# Local pub/sub socket for top-of-book rows ("" disables it)
+TICK_BUS_PATH = os.environ.get("KALSHI_TICK_BUS", os.path.join(LOG_DIR, "tick_bus.sock"))
+TICK_BUS_MAX_BUFFER = 1 << 20  # bytes queued for a subscriber before it is dropped
+# CSV writer pool: handles stay open, rows are flushed in batches
+CSV_FLUSH_ROWS = 256  # rows buffered per file before a flush
+CSV_FLUSH_INTERVAL_S = 1.0  # max age of buffered rows
+# Top-of-book CSVs are tailed live (trader, follow-mode engine), so they flush far sooner.
+CSV_LIVE_FLUSH_INTERVAL_S = 0.1
+CSV_LIVE_PREFIXES = ("market_data_",)
+CSV_MAX_OPEN_FILES = 64
+CSV_BUFFER_BYTES = 1 << 16
+WRITE_QUEUE_MAX = 100000  # pending disk writes before the receive loop is made to wait
+MARKET_DISCOVERY_INTERVAL_S = 300
+SUBSCRIBE_BATCH_SIZE = 200  # market tickers per subscribe command
+SUBSCRIBE_ACK_TIMEOUT_S = 30  # unacked subscriptions are resent after this
+HTTP_TIMEOUT_S = 10
+STATS_INTERVAL_S = 60  # per-series throughput report
+# Rotation of settled market dates into seekable gzip (one member per block of rows)
+ROTATE_AFTER_DAYS = 2  # market date must be at least this many days old
+ROTATE_IDLE_S = 3600  # and the file untouched for this long
+ROTATE_CHECK_S = 600
+ROTATE_FRAME_ROWS = 1000  # rows per gzip member, i.e. seek granularity for readers
+ROTATE_PREFIXES = ("market_data_", "orderbook_ladder_", "ladder_stream_", "book_gaps_")
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_INTERVAL_S = 10  # rewrite at least this often while rows are flowing
+MANIFEST_SUFFIXES = (".csv", ".csv.gz", ".bin", ".bin.gz")
+# Binary journal of every raw snapshot/delta, for full-depth replay
+BOOK_JOURNAL_ENABLED = True
+
+MARKET_CSV_HEADER = [
+    "timestamp", 
+    "market_ticker", 
+    "best_yes_bid", 
+    "best_yes_bid_qty",
+    "best_no_bid", 
+    "best_no_bid_qty",
+    "implied_no_ask", # 100 - best_yes_bid
+    "implied_no_ask_size", # qty at best yes bid
+    "implied_yes_ask", # 100 - best_no_bid
+    "implied_yes_ask_size", # qty at best no bid
+    "last_trade_price"
+]
+LADDER_CSV_HEADER = [
+    "timestamp",
+    "market_ticker",
+    "yes_bids",
+    "no_bids"
+]
+# K = keyframe (every level), D = changed levels only (qty 0 = level gone),
+# H = heartbeat (no ticker). Levels are JSON [[price, qty], ...].
+LADDER_STREAM_CSV_HEADER = [
+    "timestamp",
+    "market_ticker",
+    "kind",
+    "yes_bids",
+    "no_bids"
+]
+# GAP = sequence break seen (book suspect), RESYNC = fresh snapshot from a resubscribe applied
+GAP_CSV_HEADER = [
+    "timestamp",
+    "event",
+    "market_ticker",
+    "sid",
+    "expected_seq",
+    "received_seq"
+]
 
 # ==========================================
 # AUTHENTICATION
@@ -49,20 +130,728 @@ def create_headers(private_key, method: str, path: str) -> dict:
         "KALSHI-ACCESS-TIMESTAMP": timestamp,
     }
 
+# ==========================================
+# TICK BUS
+# ==========================================
+class TickBus:
+    """
+    Publishes each logged BBO row as a JSON line to every process connected
+    to a Unix domain socket, so traders can skip tailing the CSVs.
+    publish() never blocks the logger: a subscriber that stops reading is dropped.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.subscribers = set()
+        self.server = None
+        self.seq = 0
+
+    async def start(self):
+        if not self.path or not hasattr(asyncio, "start_unix_server"):
+            return
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Tick bus disabled, cannot reuse {self.path}: {e}")
+            return
+        try:
+            self.server = await asyncio.start_unix_server(self._on_connect, path=self.path)
+            print(f"Tick bus listening on {self.path}")
+        except OSError as e:
+            print(f"Tick bus disabled: {e}")
+
+    async def _on_connect(self, reader, writer):
+        self.subscribers.add(writer)
+        print(f"Tick bus subscriber connected ({len(self.subscribers)} total)")
+        try:
+            # Subscribers never send anything; EOF means they went away.
+            await reader.read()
+        except Exception:
+            pass
+        finally:
+            self._drop(writer)
+
+    def _drop(self, writer):
+        if writer in self.subscribers:
+            self.subscribers.discard(writer)
+            print(f"Tick bus subscriber left ({len(self.subscribers)} remaining)")
+        writer.close()
+
+    def publish(self, row):
+        if not self.subscribers:
+            return
+        self.seq += 1
+        row["seq"] = self.seq
+        line = (json.dumps(row) + "\n").encode("utf-8")
+        for writer in list(self.subscribers):
+            if writer.is_closing() or writer.transport.get_write_buffer_size() > TICK_BUS_MAX_BUFFER:
+                self._drop(writer)
+                continue
+            writer.write(line)
+
+# ==========================================
+# ORDER BOOK
+# ==========================================
+MAX_PRICE = 99 # Kalshi levels are 1-99 cents
+
+class BookSide:
+    """
+    Resting bids for one side of a market, indexed by price in cents.
+    best is kept up to date on every change, so top of book is a lookup
+    and a ladder walks at most MAX_PRICE levels instead of sorting.
+    """
+    __slots__ = ("qty", "best")
+
+    def __init__(self):
+        self.qty = [0] * (MAX_PRICE + 1)
+        self.best = 0 # 0 = no bids
+
+    def get(self, price, default=0):
+        if 0 < price <= MAX_PRICE:
+            return self.qty[price] or default
+        return default
+
+    def set(self, price, qty):
+        if not 0 < price <= MAX_PRICE:
+            return
+        qty = qty if qty > 0 else 0
+        self.qty[price] = qty
+        if qty:
+            if price > self.best:
+                self.best = price
+        elif price == self.best:
+            best = price - 1
+            while best > 0 and not self.qty[best]:
+                best -= 1
+            self.best = best
+
+    def top(self, depth):
+        """Best `depth` levels as (price, qty), highest price first."""
+        levels = []
+        price = self.best
+        while price > 0 and len(levels) < depth:
+            if self.qty[price]:
+                levels.append((price, self.qty[price]))
+            price -= 1
+        return levels
+
+def new_book():
+    return {'yes': BookSide(), 'no': BookSide()}
+
+# ==========================================
+# BOOK JOURNAL
+# ==========================================
+# Record layout (little endian), shared with unified_engine/book_journal.py:
+#   u32 body length, then body = header + payload
+#   header: u8 kind, u64 journal seq, u64 exchange seq (0 = none), f64 epoch ts, u16 ticker id
+#   JOURNAL_TICKER:   payload = utf-8 ticker, defines ticker id for the rest of the file
+#   JOURNAL_SNAPSHOT: u8 n_yes, u8 n_no, then n_yes + n_no levels of (u8 price, i32 qty)
+#   JOURNAL_DELTA:    u8 side (0 yes, 1 no), u8 price, i32 delta
+#   JOURNAL_GAP:      u64 expected seq, u64 received seq; book suspect until the next snapshot
+JOURNAL_MAGIC = b"KBJ1"
+JOURNAL_TICKER = 0
+JOURNAL_SNAPSHOT = 1
+JOURNAL_DELTA = 2
+JOURNAL_GAP = 3
+_JOURNAL_LEN = struct.Struct("<I")
+_JOURNAL_HEADER = struct.Struct("<BQQdH")
+_JOURNAL_LEVEL = struct.Struct("<Bi")
+_JOURNAL_DELTA = struct.Struct("<BBi")
+_JOURNAL_GAP = struct.Struct("<QQ")
+
+class BookJournal:
+    """
+    Append-only, length-prefixed binary journal of the raw orderbook feed,
+    one file per series per day (book_journal_<series>_YYYY-MM-DD.bin).
+    A torn final record after a crash is simply ignored by the reader.
+    """
+    def __init__(self, log_dir=LOG_DIR, series=None, manifest=None):
+        self.log_dir = log_dir
+        self.prefix = f"book_journal_{series}_" if series else "book_journal_"
+        self.manifest = manifest
+        self.day = None
+        self.file = None
+        self.seq = 0
+        self.ticker_ids = {}
+        self.batch = new_batch()
+
+    def _roll(self, now):
+        day = datetime.fromtimestamp(now).date()
+        if day == self.day and self.file is not None:
+            return
+        self.close()
+        self.day = day
+        self.ticker_ids = {}
+        path = os.path.join(self.log_dir, f"{self.prefix}{day.isoformat()}.bin")
+        # Ticker ids are per file, so a restart mid-day starts a new segment.
+        self.file = open(path, 'ab', buffering=CSV_BUFFER_BYTES)
+        self.file.write(JOURNAL_MAGIC)
+
+    def _append(self, kind, exchange_seq, now, ticker_id, payload):
+        self.seq += 1
+        body = _JOURNAL_HEADER.pack(kind, self.seq, exchange_seq or 0, now, ticker_id) + payload
+        self.file.write(_JOURNAL_LEN.pack(len(body)) + body)
+        self.batch[0] += 1
+        if self.batch[1] is None:
+            self.batch[1] = now
+        self.batch[2] = now
+
+    def _ticker_id(self, ticker, now):
+        ticker_id = self.ticker_ids.get(ticker)
+        if ticker_id is None:
+            ticker_id = len(self.ticker_ids)
+            self.ticker_ids[ticker] = ticker_id
+            self._append(JOURNAL_TICKER, 0, now, ticker_id, ticker.encode('utf-8'))
+            self.batch[3].add(ticker)
+        return ticker_id
+
+    def snapshot(self, now, ticker, yes_levels, no_levels, exchange_seq=None):
+        self._roll(now)
+        ticker_id = self._ticker_id(ticker, now)
+        payload = bytes([len(yes_levels), len(no_levels)]) + b"".join(
+            _JOURNAL_LEVEL.pack(p, q) for p, q in yes_levels + no_levels
+        )
+        self._append(JOURNAL_SNAPSHOT, exchange_seq, now, ticker_id, payload)
+
+    def delta(self, now, ticker, side, price, delta, exchange_seq=None):
+        self._roll(now)
+        ticker_id = self._ticker_id(ticker, now)
+        payload = _JOURNAL_DELTA.pack(0 if side == 'yes' else 1, price, delta)
+        self._append(JOURNAL_DELTA, exchange_seq, now, ticker_id, payload)
+
+    def gap(self, now, ticker, expected_seq, received_seq):
+        self._roll(now)
+        ticker_id = self._ticker_id(ticker, now)
+        payload = _JOURNAL_GAP.pack(expected_seq, received_seq)
+        self._append(JOURNAL_GAP, received_seq, now, ticker_id, payload)
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+            if self.manifest is not None and self.batch[0]:
+                rows, first, last, tickers = self.batch
+                self.manifest.record(
+                    self.file.name, self.file.tell(), rows,
+                    datetime.fromtimestamp(first).isoformat() if first is not None else None,
+                    datetime.fromtimestamp(last).isoformat() if last is not None else None,
+                    tickers,
+                )
+            self.batch = new_batch()
+
+    def close(self):
+        if self.file is not None:
+            self.flush()
+            self.file.close()
+            self.file = None
+
+# ==========================================
+# LOG MANIFEST
+# ==========================================
+def new_batch():
+    """[rows, first_ts, last_ts, tickers] written since a file's last flush."""
+    return [0, None, None, set()]
+
+def _manifest_entry(previous=None):
+    entry = {"size": 0, "rows": 0, "first_ts": None, "last_ts": None, "tickers": set()}
+    if previous:
+        entry.update(previous)
+        entry["tickers"] = set(previous.get("tickers") or ())
+    return entry
+
+def scan_csv_lines(handle, entry, ticker_col):
+    """Fold the complete rows read from a binary handle into entry; returns the bytes consumed."""
+    consumed = 0
+    for line in handle:
+        if not line.endswith(b"\n"):
+            break  # half-written row, picked up by the next writer flush
+        consumed += len(line)
+        if not line.strip():
+            continue
+        fields = line.split(b",", (ticker_col or 0) + 1)
+        timestamp = fields[0].decode('utf-8', errors='ignore')
+        entry["rows"] += 1
+        if entry["first_ts"] is None:
+            entry["first_ts"] = timestamp
+        entry["last_ts"] = timestamp
+        if ticker_col is not None and len(fields) > ticker_col and fields[ticker_col]:
+            entry["tickers"].add(fields[ticker_col].decode('utf-8', errors='ignore'))
+    return consumed
+
+def scan_journal_bytes(data, entry):
+    """Fold the complete records of a journal (or its tail) into entry; returns the bytes consumed."""
+    offset = 0
+    end = len(data)
+    while offset + _JOURNAL_LEN.size <= end:
+        if data[offset:offset + len(JOURNAL_MAGIC)] == JOURNAL_MAGIC:
+            offset += len(JOURNAL_MAGIC)
+            continue
+        (length,) = _JOURNAL_LEN.unpack_from(data, offset)
+        body_at = offset + _JOURNAL_LEN.size
+        if length < _JOURNAL_HEADER.size or body_at + length > end:
+            break
+        kind, _, _, ts, _ = _JOURNAL_HEADER.unpack_from(data, body_at)
+        if kind == JOURNAL_TICKER:
+            entry["tickers"].add(data[body_at + _JOURNAL_HEADER.size:body_at + length].decode('utf-8'))
+        timestamp = datetime.fromtimestamp(ts).isoformat()
+        entry["rows"] += 1
+        if entry["first_ts"] is None:
+            entry["first_ts"] = timestamp
+        entry["last_ts"] = timestamp
+        offset = body_at + length
+    return offset
+
+class LogManifest:
+    """
+    Summary of every log in LOG_DIR (size, row count, first/last timestamp
+    and ticker set), kept current by the writers rather than by listing the
+    directory: each flush reports the batch of whole rows it put on disk,
+    and rotation moves an entry onto its .gz. On start-up the previous
+    manifest is reloaded and only bytes it does not cover are scanned.
+    Journal "rows" count records.
+    """
+    def __init__(self, log_dir=LOG_DIR):
+        self.log_dir = log_dir
+        self.path = os.path.join(log_dir, MANIFEST_NAME)
+        self.entries = {} # {name: {"size", "rows", "first_ts", "last_ts", "tickers": set}}
+        self.lock = threading.Lock()
+        self.dirty = False
+        self.changed = threading.Event() # set when a file appears or is rotated
+
+    def load(self):
+        """Rebuild the entries from the last manifest plus whatever was written after it."""
+        try:
+            with open(self.path) as f:
+                previous = json.load(f).get("entries") or {}
+        except (OSError, ValueError):
+            previous = {}
+        try:
+            names = sorted(os.listdir(self.log_dir))
+        except OSError:
+            names = []
+        entries = {}
+        for name in names:
+            if not name.endswith(MANIFEST_SUFFIXES):
+                continue
+            path = os.path.join(self.log_dir, name)
+            try:
+                entries[name] = self._catch_up(path, previous.get(name))
+            except Exception as e:
+                print(f"Error indexing {name} for the manifest: {e}")
+        with self.lock:
+            self.entries = entries
+            self.dirty = True
+        self.changed.set()
+        scanned = sum(1 for name in entries if previous.get(name, {}).get("size") != entries[name]["size"])
+        print(f"Manifest loaded: {len(entries)} files, {scanned} rescanned")
+
+    def _catch_up(self, path, previous):
+        size = os.path.getsize(path)
+        if previous and previous.get("size") == size:
+            return _manifest_entry(previous)
+        # Live files only ever grow, and recorded sizes sit on a row boundary,
+        # so a file that outgrew its entry needs only its new tail scanned.
+        resume = bool(previous) and not path.endswith(".gz") and previous.get("size", 0) <= size
+        entry = _manifest_entry(previous if resume else None)
+        offset = entry["size"] if resume else 0
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, 'rb') as f:
+            if path.endswith((".bin", ".bin.gz")):
+                f.seek(offset)
+                consumed = scan_journal_bytes(f.read(), entry)
+            else:
+                header = f.readline()
+                columns = header.decode('utf-8', errors='ignore').strip().split(',')
+                ticker_col = columns.index("market_ticker") if "market_ticker" in columns else None
+                if offset:
+                    f.seek(offset)
+                else:
+                    offset = len(header)
+                consumed = scan_csv_lines(f, entry, ticker_col)
+        entry["size"] = size if path.endswith(".gz") else offset + consumed
+        return entry
+
+    def record(self, path, size, rows=0, first_ts=None, last_ts=None, tickers=()):
+        """Fold a flushed batch of rows into the file's entry."""
+        name = os.path.basename(path)
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is None:
+                entry = self.entries[name] = _manifest_entry()
+                self.changed.set()
+            entry["size"] = size
+            entry["rows"] += rows
+            if entry["first_ts"] is None:
+                entry["first_ts"] = first_ts
+            if last_ts is not None:
+                entry["last_ts"] = last_ts
+            entry["tickers"].update(tickers)
+            self.dirty = True
+
+    def rotated(self, src, dst):
+        """src has just been appended to dst by gzip_append."""
+        size = os.path.getsize(dst)
+        with self.lock:
+            old = self.entries.pop(os.path.basename(src), None) or _manifest_entry()
+            entry = self.entries.setdefault(os.path.basename(dst), _manifest_entry())
+            entry["size"] = size
+            entry["rows"] += old["rows"]
+            if entry["first_ts"] is None:
+                entry["first_ts"] = old["first_ts"]
+            if old["last_ts"] is not None:
+                entry["last_ts"] = old["last_ts"]
+            entry["tickers"].update(old["tickers"])
+            self.dirty = True
+        self.changed.set()
+
+    def save(self):
+        """Write manifest.json if anything changed since the last save."""
+        with self.lock:
+            if not self.dirty:
+                return
+            entries = {
+                name: dict(entry, tickers=sorted(entry["tickers"]))
+                for name, entry in sorted(self.entries.items())
+            }
+            self.dirty = False
+        manifest = {
+            "last_updated": datetime.now().isoformat(),
+            "files": [name for name in entries if name.endswith('.csv')],
+            # Rotated logs: {name: size in bytes}
+            "compressed": {name: entry["size"] for name, entry in entries.items() if name.endswith('.gz')},
+            "entries": entries,
+        }
+        # Write to temp file then rename for atomicity
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(temp_path, self.path)
+
+# ==========================================
+# CSV WRITER POOL
+# ==========================================
+class CsvWriterPool:
+    """
+    Keeps one append handle per CSV open and batches rows in its buffer,
+    flushing a file after CSV_FLUSH_ROWS rows, and everything on the flush
+    interval, on day rollover and on shutdown. Files read live
+    (CSV_LIVE_PREFIXES) are also flushed on the shorter live interval.
+    Readers tailing the CSVs already hold back partial lines, so a flush may
+    land mid-row. Each explicit flush reports the rows it completed to the
+    manifest.
+    """
+    def __init__(self, flush_rows=CSV_FLUSH_ROWS, max_open=CSV_MAX_OPEN_FILES, manifest=None):
+        self.flush_rows = flush_rows
+        self.max_open = max_open
+        self.manifest = manifest
+        self.files = {} # {filename: [file, csv_writer, pending_rows, ticker_col, batch, live]}, oldest use first
+        self.day = datetime.now().date()
+
+    def _open(self, filename, header):
+        while len(self.files) >= self.max_open:
+            self._close(next(iter(self.files)))
+        f = open(filename, 'a', newline='', buffering=CSV_BUFFER_BYTES)
+        writer = csv.writer(f)
+        if f.tell() == 0:
+            writer.writerow(header)
+            f.flush()
+            print(f"Created new log file: {filename}")
+            if self.manifest is not None:
+                self.manifest.record(filename, f.tell())
+        ticker_col = header.index("market_ticker") if "market_ticker" in header else None
+        live = os.path.basename(filename).startswith(CSV_LIVE_PREFIXES)
+        entry = [f, writer, 0, ticker_col, new_batch(), live]
+        self.files[filename] = entry
+        return entry
+
+    def _flush_entry(self, filename, entry):
+        entry[0].flush()
+        if self.manifest is not None and entry[2]:
+            _, first, last, tickers = entry[4]
+            self.manifest.record(filename, entry[0].tell(), entry[2], first, last, tickers)
+            entry[4] = new_batch()
+        entry[2] = 0
+
+    def _close(self, filename):
+        entry = self.files.pop(filename, None)
+        if entry is None:
+            return
+        try:
+            self._flush_entry(filename, entry)
+            entry[0].close()
+        except Exception as e:
+            print(f"Error closing {filename}: {e}")
+
+    def writerow(self, filename, header, row):
+        today = datetime.now().date()
+        if today != self.day:
+            # Yesterday's markets stop trading; release their handles.
+            self.close()
+            self.day = today
+        entry = self.files.pop(filename, None)
+        if entry is None:
+            entry = self._open(filename, header)
+        self.files[filename] = entry
+        entry[1].writerow(row)
+        entry[2] += 1
+        batch = entry[4]
+        if batch[1] is None:
+            batch[1] = row[0]
+        batch[2] = row[0]
+        if entry[3] is not None and row[entry[3]]:
+            batch[3].add(row[entry[3]])
+        if entry[2] >= self.flush_rows:
+            self._flush_entry(filename, entry)
+
+    def flush(self, live_only=False):
+        for filename, entry in list(self.files.items()):
+            if not entry[2] or (live_only and not entry[5]):
+                continue
+            try:
+                self._flush_entry(filename, entry)
+            except Exception as e:
+                print(f"Error flushing {filename}: {e}")
+                self._close(filename)
+
+    def close(self):
+        for filename in list(self.files):
+            self._close(filename)
+
+# ==========================================
+# DISK WRITER
+# ==========================================
+class DiskWriter:
+    """
+    Owns the CSV pool and the book journal and runs every write on one
+    background thread fed by a bounded queue, so a slow disk never stalls
+    the websocket receive loop. Jobs run in submission order.
+
+    submit() never blocks: once the queue is full, jobs wait in order in
+    an overflow on the event loop side, and drain() (awaited by the
+    receive loop) feeds them in from a worker thread. Back-pressure thus
+    pauses reading the socket without freezing the loop, so keepalives and
+    the other tasks keep running.
+    """
+    def __init__(self, writers, journal=None, maxsize=WRITE_QUEUE_MAX, name="disk-writer"):
+        self.writers = writers
+        self.journal = journal
+        self.queue = queue.Queue(maxsize)
+        self.overflow = collections.deque()
+        self.drain_lock = asyncio.Lock()
+        self.stalls = 0
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, fn, *args):
+        job = (fn, args)
+        if not self.overflow:
+            try:
+                self.queue.put_nowait(job)
+                return
+            except queue.Full:
+                # Losing rows is worse than a late read; hold them, but say so.
+                self.stalls += 1
+                if self.stalls == 1 or self.stalls % 1000 == 0:
+                    print(f"WARNING: disk writer queue full ({self.stalls} stalls)")
+        self.overflow.append(job)
+
+    async def drain(self):
+        """Wait until every overflowed job is on the queue, without blocking the event loop."""
+        async with self.drain_lock:
+            while self.overflow:
+                # The job stays at the head until queued, so later submits line up behind it.
+                await asyncio.to_thread(self.queue.put, self.overflow[0])
+                self.overflow.popleft()
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                break
+            fn, args = job
+            try:
+                fn(*args)
+            except Exception as e:
+                print(f"Error in disk writer ({fn.__name__}): {e}")
+        self.writers.close()
+        if self.journal is not None:
+            self.journal.close()
+
+    def _flush(self):
+        self.writers.flush()
+        if self.journal is not None:
+            self.journal.flush()
+
+    def _flush_live(self):
+        self.writers.flush(live_only=True)
+
+    def flush(self, live_only=False):
+        self.submit(self._flush_live if live_only else self._flush)
+
+    def close(self):
+        """Drain every queued write, then close all files."""
+        while self.overflow:
+            self.queue.put(self.overflow.popleft())
+        self.queue.put(None)
+        self.thread.join()
+
+# ==========================================
+# LOG ROTATION
+# ==========================================
+def market_date_of(filename):
+    """market_data_KXHIGHNY-25DEC05.csv -> date(2025, 12, 5), None if there is no date code."""
+    code = filename.split('.', 1)[0].rsplit('-', 1)[-1]
+    try:
+        return datetime.strptime(code, "%y%b%d").date()
+    except ValueError:
+        return None
+
+def gzip_append(src, dst, frame_rows=None):
+    """
+    Append src to dst (creating it) as independent gzip members, then remove
+    src. With frame_rows set, src is a CSV: members hold frame_rows lines each,
+    the header gets its own member and is dropped when dst already exists.
+    The result keeps src's mtime so caches keyed on it stay valid.
+    """
+    mtime = os.stat(src).st_mtime
+    tmp = dst + ".tmp"
+    if os.path.exists(dst):
+        shutil.copyfile(dst, tmp)
+        new_file = False
+    else:
+        new_file = True
+    with open(src, 'rb') as f_in, open(tmp, 'ab') as f_out:
+        if frame_rows is None:
+            f_out.write(gzip.compress(f_in.read(), mtime=0))
+        else:
+            header = f_in.readline()
+            if new_file:
+                f_out.write(gzip.compress(header, mtime=0))
+            while True:
+                lines = [line for line in (f_in.readline() for _ in range(frame_rows)) if line]
+                if not lines:
+                    break
+                f_out.write(gzip.compress(b"".join(lines), mtime=0))
+        f_out.flush()
+        os.fsync(f_out.fileno())
+    os.utime(tmp, (mtime, mtime))
+    os.replace(tmp, dst)
+    os.remove(src)
+    for sidecar in (src + ".idx", dst + ".idx"):
+        if os.path.exists(sidecar):
+            os.remove(sidecar)
+
+def rotate_closed_logs(shard, log_dir=LOG_DIR):
+    """
+    Compress the shard's settled market-date CSVs and past-day journals.
+    Runs on the shard's writer thread, so no write can race the rotation.
+    """
+    today = datetime.now().date()
+    cutoff = today - timedelta(days=ROTATE_AFTER_DAYS)
+    now = time.time()
+    csv_prefixes = tuple(f"{prefix}{shard.series}-" for prefix in ROTATE_PREFIXES)
+    journal_prefix = f"book_journal_{shard.series}_"
+    for name in sorted(os.listdir(log_dir)):
+        path = os.path.join(log_dir, name)
+        try:
+            if name.startswith(csv_prefixes) and name.endswith(".csv"):
+                market_date = market_date_of(name)
+                if market_date is None or market_date > cutoff:
+                    continue
+                if now - os.path.getmtime(path) < ROTATE_IDLE_S:
+                    continue
+                shard.writers._close(path)
+                gzip_append(path, path + ".gz", frame_rows=ROTATE_FRAME_ROWS)
+                if shard.manifest is not None:
+                    shard.manifest.rotated(path, path + ".gz")
+            elif name.startswith(journal_prefix) and name.endswith(".bin"):
+                try:
+                    day = datetime.strptime(name[len(journal_prefix):-4], "%Y-%m-%d").date()
+                except ValueError:
+                    continue
+                if day >= today:
+                    continue
+                if shard.journal is not None and shard.journal.day == day:
+                    shard.journal.close()
+                gzip_append(path, path + ".gz")
+                if shard.manifest is not None:
+                    shard.manifest.rotated(path, path + ".gz")
+            else:
+                continue
+            print(f"Rotated {name} -> {name}.gz ({os.path.getsize(path + '.gz')} bytes)")
+        except Exception as e:
+            print(f"Error rotating {name}: {e}")
+
+# ==========================================
+# SERIES SHARDS
+# ==========================================
+def series_of(ticker):
+    """KXHIGHNY-23DEC04-T40 -> KXHIGHNY"""
+    return ticker.split('-', 1)[0] if ticker else "UNKNOWN"
+
+class SeriesShard:
+    """
+    Per-series slice of the logger: its own books, CSV pool, journal and
+    writer thread, so a busy series never queues behind another one's disk
+    writes, plus throughput counters for the stats report.
+    """
+    def __init__(self, series, journal=False, manifest=None):
+        self.series = series
+        self.manifest = manifest
+        self.books = {} # {ticker: {'yes': BookSide, 'no': BookSide}}
+        self.writers = CsvWriterPool(manifest=manifest)
+        self.journal = BookJournal(series=series, manifest=manifest) if journal else None
+        self.disk = DiskWriter(self.writers, self.journal, name=f"disk-writer-{series}")
+        self.counts = {"snapshots": 0, "deltas": 0, "rows": 0, "gaps": 0}
+        self.counts_since = time.time()
+
+    def take_counts(self):
+        """Return (counts, seconds) since the last call and reset them."""
+        now = time.time()
+        counts, elapsed = self.counts, now - self.counts_since
+        self.counts = dict.fromkeys(counts, 0)
+        self.counts_since = now
+        return counts, elapsed
+
 # ==========================================
 # LOGGER LOGIC
 # ==========================================
 class GranularLogger:
-    def __init__(self):
-        self.books = {} # {ticker: {'yes': {price: qty}, 'no': {price: qty}}}
+    def __init__(self, tick_bus=None, journal=False, series=None, manifest=None):
+        self.tick_bus = tick_bus
+        self.journal = journal
+        self.manifest = manifest
+        self.series = list(series or SERIES)
+        self.shards = {} # {series: SeriesShard}
+        for name in self.series:
+            self.shard_for(name)
+        self.books = {} # {ticker: {'yes': BookSide, 'no': BookSide}}, shared with each shard's books
         self.last_logged_state = {} # {ticker: (best_yes_bid, best_yes_qty, best_no_bid, best_no_qty)}
         self.last_trade_price = {} # {ticker: last_trade_price_cents}
         self.last_ladder_log = {} # {ticker: last_log_ts}
+        self.ladder_sent = {} # {ticker: ({price: qty} yes, {price: qty} no)} as last written to the stream
+        self.ladder_keyframe_at = {} # {ticker: ts of its last keyframe}
+        self.ladder_dirty = set() # tickers whose book changed since the last stream row
+        self.ladder_file_at = {} # {stream filename: [ts of its last row, shard]}
         
         if not os.path.exists(LOG_DIR):
             os.makedirs(LOG_DIR)
             print(f"Created log directory: {LOG_DIR}")
 
+    def shard_for(self, ticker):
+        series = series_of(ticker)
+        shard = self.shards.get(series)
+        if shard is None:
+            shard = SeriesShard(series, journal=self.journal, manifest=self.manifest)
+            self.shards[series] = shard
+        return shard
+
+    def new_book(self, ticker):
+        book = new_book()
+        self.books[ticker] = book
+        self.shard_for(ticker).books[ticker] = book
+        return book
+
     def get_log_file(self, ticker):
         """
         Generate filename based on the market's date code.
@@ -82,26 +871,27 @@ class GranularLogger:
         except Exception:
             return os.path.join(LOG_DIR, "market_data_misc.csv")
 
-    def init_csv(self, ticker):
-        """Ensure CSV exists with headers for this market group."""
-        filename = self.get_log_file(ticker)
-        if not os.path.exists(filename):
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    "timestamp", 
-                    "market_ticker", 
-                    "best_yes_bid", 
-                    "best_yes_bid_qty",
-                    "best_no_bid", 
-                    "best_no_bid_qty",
-                    "implied_no_ask", # 100 - best_yes_bid
-                    "implied_no_ask_size", # qty at best yes bid
-                    "implied_yes_ask", # 100 - best_no_bid
-                    "implied_yes_ask_size", # qty at best no bid
-                    "last_trade_price"
-                ])
-            print(f"Created new log file: {filename}")
+    def get_gap_file(self, ticker):
+        parts = ticker.split('-')
+        market_date_code = f"{parts[0]}-{parts[1]}" if len(parts) >= 2 else "UNKNOWN"
+        return os.path.join(LOG_DIR, f"book_gaps_{market_date_code}.csv")
+
+    def log_gap(self, event, ticker, sid=None, expected_seq=None, received_seq=None):
+        """Mark the start (GAP) or end (RESYNC) of an interval where the book is suspect."""
+        now = time.time()
+        shard = self.shard_for(ticker)
+        if event == "GAP":
+            shard.counts["gaps"] += 1
+        shard.disk.submit(shard.writers.writerow, self.get_gap_file(ticker), GAP_CSV_HEADER, [
+            datetime.fromtimestamp(now).isoformat(),
+            event,
+            ticker,
+            sid,
+            expected_seq,
+            received_seq
+        ])
+        if event == "GAP" and shard.journal is not None:
+            shard.disk.submit(shard.journal.gap, now, ticker, expected_seq or 0, received_seq or 0)
 
     def get_ladder_file(self, ticker):
         try:
@@ -115,18 +905,53 @@ class GranularLogger:
         except Exception:
             return os.path.join(LOG_DIR, "orderbook_ladder_misc.csv")
 
-    def init_ladder_csv(self, ticker):
-        filename = self.get_ladder_file(ticker)
-        if not os.path.exists(filename):
-            with open(filename, 'w', newline='') as f:
-                writer = csv.writer(f)
-                writer.writerow([
-                    "timestamp",
-                    "market_ticker",
-                    "yes_bids",
-                    "no_bids"
-                ])
-            print(f"Created ladder log file: {filename}")
+    def get_ladder_stream_file(self, ticker):
+        parts = ticker.split('-')
+        market_date_code = f"{parts[0]}-{parts[1]}" if len(parts) >= 2 else "UNKNOWN"
+        return os.path.join(LOG_DIR, f"ladder_stream_{market_date_code}.csv")
+
+    def stream_ladder(self, ticker, now):
+        """Write a keyframe or the levels that changed since the ticker's last stream row."""
+        book = self.books.get(ticker)
+        if not book:
+            return
+        yes = dict(book['yes'].top(MAX_PRICE))
+        no = dict(book['no'].top(MAX_PRICE))
+        sent = self.ladder_sent.get(ticker)
+        if sent is None or now - self.ladder_keyframe_at.get(ticker, 0.0) >= LADDER_KEYFRAME_S:
+            kind = "K"
+            yes_levels = sorted(yes.items(), reverse=True)
+            no_levels = sorted(no.items(), reverse=True)
+            self.ladder_keyframe_at[ticker] = now
+        else:
+            kind = "D"
+            yes_levels = [(p, yes.get(p, 0)) for p in sorted(yes.keys() | sent[0].keys(), reverse=True) if yes.get(p, 0) != sent[0].get(p, 0)]
+            no_levels = [(p, no.get(p, 0)) for p in sorted(no.keys() | sent[1].keys(), reverse=True) if no.get(p, 0) != sent[1].get(p, 0)]
+            if not yes_levels and not no_levels:
+                return
+        self.ladder_sent[ticker] = (yes, no)
+        filename = self.get_ladder_stream_file(ticker)
+        shard = self.shard_for(ticker)
+        self.ladder_file_at[filename] = [now, shard]
+        shard.disk.submit(write_ladder_stream_row, shard.writers, filename, datetime.fromtimestamp(now).isoformat(), ticker, kind, yes_levels, no_levels)
+
+    def flush_ladder_stream(self, now=None):
+        """Emit pending ladder changes, plus heartbeats for silent files of current market dates."""
+        now = time.time() if now is None else now
+        dirty, self.ladder_dirty = self.ladder_dirty, set()
+        for ticker in dirty:
+            self.stream_ladder(ticker, now)
+        today = datetime.fromtimestamp(now).date()
+        for filename, entry in list(self.ladder_file_at.items()):
+            if now - entry[0] < LADDER_HEARTBEAT_S:
+                continue
+            market_date = market_date_of(os.path.basename(filename))
+            if market_date is not None and market_date < today:
+                # Settled date: let the file go idle so it can be rotated.
+                del self.ladder_file_at[filename]
+                continue
+            entry[0] = now
+            entry[1].disk.submit(write_ladder_stream_row, entry[1].writers, filename, datetime.fromtimestamp(now).isoformat(), "", "H", None, None)
 
     def log_ladder(self, ticker):
         if LADDER_DEPTH <= 0:
@@ -134,25 +959,14 @@ class GranularLogger:
         book = self.books.get(ticker)
         if not book:
             return
-        yes_levels = sorted(book['yes'].items(), key=lambda x: x[0], reverse=True)[:LADDER_DEPTH]
-        no_levels = sorted(book['no'].items(), key=lambda x: x[0], reverse=True)[:LADDER_DEPTH]
+        yes_levels = book['yes'].top(LADDER_DEPTH)
+        no_levels = book['no'].top(LADDER_DEPTH)
         filename = self.get_ladder_file(ticker)
-        self.init_ladder_csv(ticker)
-        try:
-            with open(filename, 'a', newline='') as f:
-                writer = csv.writer(f)
-                timestamp = datetime.now().isoformat()
-                writer.writerow([
-                    timestamp,
-                    ticker,
-                    json.dumps(yes_levels),
-                    json.dumps(no_levels)
-                ])
-        except Exception as e:
-            print(f"Error writing ladder CSV: {e}")
+        shard = self.shard_for(ticker)
+        shard.disk.submit(write_ladder_row, shard.writers, filename, datetime.now().isoformat(), ticker, yes_levels, no_levels)
 
     def maybe_log_ladder(self, ticker, spread_cents):
-        if LADDER_DEPTH <= 0:
+        if LADDER_DEPTH <= 0 or LADDER_MODE != "snapshot":
             return
         if LADDER_TRIGGER_SPREAD > 0 and spread_cents < LADDER_TRIGGER_SPREAD:
             return
@@ -169,13 +983,11 @@ class GranularLogger:
         if not book: return
 
         # Calculate Best Yes Bid
-        yes_bids = book['yes'].keys()
-        best_yes_bid = max(yes_bids) if yes_bids else 0
+        best_yes_bid = book['yes'].best
         best_yes_bid_qty = book['yes'].get(best_yes_bid, 0) if best_yes_bid else 0
         
         # Calculate Best No Bid
-        no_bids = book['no'].keys()
-        best_no_bid = max(no_bids) if no_bids else 0
+        best_no_bid = book['no'].best
         best_no_bid_qty = book['no'].get(best_no_bid, 0) if best_no_bid else 0
 
         # Check if state changed
@@ -208,31 +1020,59 @@ class GranularLogger:
         spread_cents = implied_yes_ask - best_yes_bid if best_yes_bid > 0 else 0
         self.maybe_log_ladder(ticker, spread_cents)
 
+        timestamp = datetime.now().isoformat()
+        last_trade = self.last_trade_price.get(ticker)
+
+        # Publish first so subscribers never wait on the disk write
+        if self.tick_bus is not None:
+            self.tick_bus.publish({
+                "timestamp": timestamp,
+                "market_ticker": ticker,
+                "best_yes_bid": best_yes_bid,
+                "best_yes_bid_qty": best_yes_bid_qty,
+                "best_no_bid": best_no_bid,
+                "best_no_bid_qty": best_no_bid_qty,
+                "implied_no_ask": implied_no_ask,
+                "implied_no_ask_size": implied_no_ask_size,
+                "implied_yes_ask": implied_yes_ask,
+                "implied_yes_ask_size": implied_yes_ask_size,
+                "last_trade_price": last_trade,
+            })
+
         # Log to CSV
         filename = self.get_log_file(ticker)
-        self.init_csv(ticker) # Ensure file exists
-        
-        try:
-            with open(filename, 'a', newline='') as f:
-                writer = csv.writer(f)
-                timestamp = datetime.now().isoformat()
-                last_trade = self.last_trade_price.get(ticker)
-                writer.writerow([
-                    timestamp,
-                    ticker,
-                    best_yes_bid,
-                    best_yes_bid_qty,
-                    best_no_bid,
-                    best_no_bid_qty,
-                    implied_no_ask,
-                    implied_no_ask_size,
-                    implied_yes_ask,
-                    implied_yes_ask_size,
-                    last_trade
-                ])
-            # print(f"Logged {ticker}: YesBid={best_yes_bid}, NoBid={best_no_bid}")
-        except Exception as e:
-            print(f"Error writing to CSV: {e}")
+        shard = self.shard_for(ticker)
+        shard.counts["rows"] += 1
+        shard.disk.submit(shard.writers.writerow, filename, MARKET_CSV_HEADER, [
+            timestamp,
+            ticker,
+            best_yes_bid,
+            best_yes_bid_qty,
+            best_no_bid,
+            best_no_bid_qty,
+            implied_no_ask,
+            implied_no_ask_size,
+            implied_yes_ask,
+            implied_yes_ask_size,
+            last_trade
+        ])
+        # print(f"Logged {ticker}: YesBid={best_yes_bid}, NoBid={best_no_bid}")
+
+    def flush(self, live_only=False):
+        for shard in self.shards.values():
+            shard.disk.flush(live_only)
+
+    def backlogged(self):
+        return any(shard.disk.overflow for shard in self.shards.values())
+
+    async def drain(self):
+        """Back-pressure: wait for room in every shard's write queue."""
+        for shard in list(self.shards.values()):
+            await shard.disk.drain()
+
+    def close(self):
+        for shard in self.shards.values():
+            shard.disk.close()
 
     def update_last_trade_prices(self, market_info: dict):
         """Cache last trade prices (in cents) from the markets endpoint."""
@@ -247,37 +1087,42 @@ class GranularLogger:
     def update_book(self, ticker, side, price, qty):
         """Update the internal order book."""
         if ticker not in self.books:
-            self.books[ticker] = {'yes': {}, 'no': {}}
+            self.new_book(ticker)
             
-        price = int(price)
-        
-        if qty <= 0:
-            if price in self.books[ticker][side]:
-                del self.books[ticker][side][price]
-        else:
-            self.books[ticker][side][price] = qty
+        self.books[ticker][side].set(int(price), qty)
+        self.ladder_dirty.add(ticker)
             
         self.log_state(ticker)
 
-    def handle_snapshot(self, msg):
+    def handle_snapshot(self, msg, seq=None):
         ticker = msg.get("market_ticker")
         if not ticker: return
         
-        self.books[ticker] = {'yes': {}, 'no': {}}
+        self.new_book(ticker)
+        shard = self.shard_for(ticker)
+        shard.counts["snapshots"] += 1
         
         for p, q in msg.get("yes", []):
             try:
-                self.books[ticker]['yes'][int(float(p))] = q
+                self.books[ticker]['yes'].set(int(float(p)), q)
             except: pass
             
         for p, q in msg.get("no", []):
             try:
-                self.books[ticker]['no'][int(float(p))] = q
+                self.books[ticker]['no'].set(int(float(p)), q)
             except: pass
+
+        if shard.journal is not None:
+            book = self.books[ticker]
+            shard.disk.submit(shard.journal.snapshot, time.time(), ticker, book['yes'].top(MAX_PRICE), book['no'].top(MAX_PRICE), seq)
+
+        # A (re)snapshot replaces the book, so the stream restarts it with a keyframe
+        self.ladder_sent.pop(ticker, None)
+        self.ladder_dirty.add(ticker)
             
         self.log_state(ticker)
 
-    def handle_delta(self, msg):
+    def handle_delta(self, msg, seq=None):
         ticker = msg.get("market_ticker")
         if not ticker: return
         
@@ -286,78 +1131,267 @@ class GranularLogger:
         side = msg.get("side")
         
         if ticker not in self.books:
-             self.books[ticker] = {'yes': {}, 'no': {}}
+             self.new_book(ticker)
+        shard = self.shard_for(ticker)
+        shard.counts["deltas"] += 1
         
-        current_qty = self.books[ticker][side].get(price, 0)
+        if shard.journal is not None:
+            shard.disk.submit(shard.journal.delta, time.time(), ticker, side, int(price), delta, seq)
+
+        current_qty = self.books[ticker][side].get(int(price), 0)
         new_qty = current_qty + delta
         
         self.update_book(ticker, side, price, new_qty)
 
+def write_ladder_row(writers, filename, timestamp, ticker, yes_levels, no_levels):
+    """Runs on the disk writer thread."""
+    writers.writerow(filename, LADDER_CSV_HEADER, [
+        timestamp,
+        ticker,
+        json.dumps(yes_levels),
+        json.dumps(no_levels)
+    ])
+
+def write_ladder_stream_row(writers, filename, timestamp, ticker, kind, yes_levels, no_levels):
+    """Runs on the disk writer thread."""
+    writers.writerow(filename, LADDER_STREAM_CSV_HEADER, [
+        timestamp,
+        ticker,
+        kind,
+        json.dumps(yes_levels, separators=(',', ':')) if yes_levels is not None else "",
+        json.dumps(no_levels, separators=(',', ':')) if no_levels is not None else ""
+    ])
+
 # ==========================================
 # MAIN LOOP
 # ==========================================
-def fetch_active_markets():
-    """Fetch ALL active KXHIGHNY market tickers and their last trade prices."""
+def fetch_active_markets(series_list=None):
+    """Fetch ALL active market tickers of each series and their last trade prices."""
     markets_out = {}
-    try:
-        print("Fetching active KXHIGHNY markets...")
-        response = requests.get(f"{API_URL}/markets", params={"series_ticker": "KXHIGHNY", "status": "open"})
-        if response.status_code == 200:
-            data = response.json()
-            markets = data.get("markets", [])
-            for market in markets:
-                ticker = market.get("ticker")
-                if not ticker:
-                    continue
-                markets_out[ticker] = market.get("last_price")
-            print(f"Found {len(markets_out)} active markets.")
-        else:
-            print(f"Error fetching markets: {response.status_code}")
-    except Exception as e:
-        print(f"Error fetching markets: {e}")
+    for series in series_list or SERIES:
+        try:
+            print(f"Fetching active {series} markets...")
+            response = requests.get(
+                f"{API_URL}/markets",
+                params={"series_ticker": series, "status": "open"},
+                timeout=HTTP_TIMEOUT_S,
+            )
+            if response.status_code == 200:
+                data = response.json()
+                markets = data.get("markets", [])
+                found = 0
+                for market in markets:
+                    ticker = market.get("ticker")
+                    if not ticker:
+                        continue
+                    markets_out[ticker] = market.get("last_price")
+                    found += 1
+                print(f"Found {found} active {series} markets.")
+            else:
+                print(f"Error fetching {series} markets: {response.status_code}")
+        except Exception as e:
+            print(f"Error fetching {series} markets: {e}")
     return markets_out
 
-async def subscribe_to_tickers(websocket, tickers):
-    if not tickers: return
-    print(f"Subscribing to {len(tickers)} tickers...")
-    req_id = 1
-    for ticker in tickers:
-        msg = {"id": req_id, "cmd": "subscribe", "params": {"channels": ["orderbook_delta"], "market_ticker": ticker}}
-        await websocket.send(json.dumps(msg))
-        req_id += 1
-        await asyncio.sleep(0.05) # Rate limit protection
-
-def update_manifest():
-    """Write a JSON manifest of available log files for the dashboard."""
-    try:
-        files = [f for f in os.listdir(LOG_DIR) if f.endswith('.csv')]
-        manifest = {
-            "last_updated": datetime.now().isoformat(),
-            "files": sorted(files)
-        }
-        # Write to temp file then rename for atomicity
-        temp_path = os.path.join(LOG_DIR, "manifest.json.tmp")
-        final_path = os.path.join(LOG_DIR, "manifest.json")
-        
-        with open(temp_path, "w") as f:
-            json.dump(manifest, f)
-        
-        os.replace(temp_path, final_path)
-    except Exception as e:
-        print(f"Error updating manifest: {e}")
+class SequenceTracker:
+    """
+    Per-subscription (sid) sequence check. Kalshi numbers the messages on
+    each sid consecutively, so anything other than last + 1 means a lost or
+    reordered message, and every market on that sid may hold a bad book.
+    """
+    def __init__(self):
+        self.last_seq = {} # {sid: seq}
+        self.sid_tickers = {} # {sid: {ticker}}
+
+    def reset(self):
+        self.last_seq.clear()
+        self.sid_tickers.clear()
+
+    def check(self, sid, seq, ticker):
+        """Record a message; returns the expected seq on a break, else None."""
+        if sid is None or seq is None:
+            return None
+        if ticker:
+            self.sid_tickers.setdefault(sid, set()).add(ticker)
+        last = self.last_seq.get(sid)
+        if last is None or seq > last:
+            self.last_seq[sid] = seq
+        if last is not None and seq != last + 1:
+            return last + 1
+        return None
+
+    def forget(self, sid):
+        """Drop a sid's state; returns the tickers seen on it."""
+        self.last_seq.pop(sid, None)
+        return self.sid_tickers.pop(sid, set())
+
+class SubscriptionManager:
+    """
+    Tracks which markets we want (desired), which the server has confirmed
+    (active, and under which sid) and which subscribe commands are still
+    awaiting an ack. sync() sends the difference as batched multi-ticker
+    commands, so a reconnect resubscribes everything in one round trip, and
+    drops markets that are no longer desired from their subscriptions.
+    """
+    def __init__(self):
+        self.desired = set()
+        self.active = set()
+        self.sids = {} # {sid: {ticker}}
+        self.pending = {} # {req_id: (sent_ts, tickers)}
+        self.next_id = 1
+
+    def reset(self):
+        """Forget server-side state after a disconnect; desired markets are kept."""
+        self.active.clear()
+        self.sids.clear()
+        self.pending.clear()
+
+    def _take_id(self):
+        req_id = self.next_id
+        self.next_id += 1
+        return req_id
+
+    def pending_tickers(self):
+        now = time.time()
+        for req_id, (sent_ts, tickers) in list(self.pending.items()):
+            if now - sent_ts > SUBSCRIBE_ACK_TIMEOUT_S:
+                print(f"Subscribe {req_id} not acknowledged, will resend {len(tickers)} tickers")
+                del self.pending[req_id]
+        out = set()
+        for _, tickers in self.pending.values():
+            out |= tickers
+        return out
+
+    async def sync(self, websocket):
+        await self._drop_undesired(websocket)
+        missing = sorted(self.desired - self.active - self.pending_tickers())
+        if not missing:
+            return
+        print(f"Subscribing to {len(missing)} tickers...")
+        for i in range(0, len(missing), SUBSCRIBE_BATCH_SIZE):
+            batch = missing[i:i + SUBSCRIBE_BATCH_SIZE]
+            req_id = self._take_id()
+            msg = {"id": req_id, "cmd": "subscribe", "params": {"channels": ["orderbook_delta"], "market_tickers": batch}}
+            self.pending[req_id] = (time.time(), set(batch))
+            await websocket.send(json.dumps(msg))
+
+    async def _drop_undesired(self, websocket):
+        """Unsubscribe markets that left desired (settled or delisted)."""
+        removed = self.active - self.desired
+        if not removed:
+            return
+        print(f"Unsubscribing from {len(removed)} tickers...")
+        for sid, tickers in list(self.sids.items()):
+            gone = tickers & removed
+            if not gone:
+                continue
+            if gone == tickers:
+                msg = {"id": self._take_id(), "cmd": "unsubscribe", "params": {"sids": [sid]}}
+                del self.sids[sid]
+            else:
+                msg = {"id": self._take_id(), "cmd": "update_subscription",
+                       "params": {"sids": [sid], "market_tickers": sorted(gone), "action": "delete_markets"}}
+                tickers -= gone
+            await websocket.send(json.dumps(msg))
+        # A market with no known sid cannot be named to the server; it is only forgotten here.
+        self.active -= removed
+
+    async def resubscribe(self, websocket, sid, tickers=()):
+        """
+        Replace a subscription whose stream broke with a fresh one. The server
+        handles the unsubscribe before the new subscribe, so each market's new
+        orderbook_snapshot arrives after every delta of the old sid and the
+        rebuilt book is in stream order with the deltas that follow it.
+        tickers adds markets seen on the sid whose ack did not name it.
+        """
+        tickers = self.sids.pop(sid, set()) | set(tickers)
+        await websocket.send(json.dumps({"id": self._take_id(), "cmd": "unsubscribe", "params": {"sids": [sid]}}))
+        self.active -= tickers
+        await self.sync(websocket)
 
-async def manifest_updater():
-    """Periodically update the manifest file in the background."""
+    def handle_ack(self, data):
+        entry = self.pending.pop(data.get("id"), None)
+        if entry is not None:
+            self.active |= entry[1]
+            sid = data.get("msg", {}).get("sid")
+            if sid is not None:
+                self.sids.setdefault(sid, set()).update(entry[1])
+            print(f"Subscribe {data.get('id')} acknowledged: {len(entry[1])} tickers ({len(self.active)} active)")
+
+    def handle_error(self, data):
+        # Failed tickers become missing again and are retried on the next sync.
+        entry = self.pending.pop(data.get("id"), None)
+        if entry is not None:
+            print(f"Subscribe {data.get('id')} rejected for {len(entry[1])} tickers")
+
+    def mark_active(self, ticker, sid=None):
+        if sid is not None:
+            self.sids.setdefault(sid, set()).add(ticker)
+        if ticker in self.active:
+            return
+        self.active.add(ticker)
+        for req_id, (_, tickers) in list(self.pending.items()):
+            tickers.discard(ticker)
+            if not tickers:
+                del self.pending[req_id]
+
+async def manifest_updater(manifest):
+    """Write manifest.json as soon as a file appears or rotates, and otherwise every interval."""
     print("Manifest updater started.")
     while True:
+        await asyncio.to_thread(manifest.changed.wait, MANIFEST_INTERVAL_S)
+        manifest.changed.clear()
         try:
-            update_manifest()
+            await asyncio.to_thread(manifest.save)
         except Exception as e:
             print(f"Manifest update error: {e}")
-        await asyncio.sleep(10)
 
-async def run_logger():
-    logger = GranularLogger()
+async def csv_flusher(logger):
+    """Flush buffered rows: live-tailed CSVs every live interval, everything else every flush interval."""
+    last_full = time.monotonic()
+    while True:
+        await asyncio.sleep(CSV_LIVE_FLUSH_INTERVAL_S)
+        now = time.monotonic()
+        if now - last_full >= CSV_FLUSH_INTERVAL_S:
+            last_full = now
+            logger.flush()
+        else:
+            logger.flush(live_only=True)
+        # Overflow from timer-driven writes must not wait for the next message
+        if logger.backlogged():
+            await logger.drain()
+
+async def ladder_streamer(logger):
+    """Write coalesced ladder changes every LADDER_DELTA_INTERVAL_S."""
+    while True:
+        await asyncio.sleep(LADDER_DELTA_INTERVAL_S)
+        logger.flush_ladder_stream()
+
+async def log_rotator(logger):
+    """Periodically hand each series' settled logs to its writer thread for compression."""
+    while True:
+        for shard in list(logger.shards.values()):
+            shard.disk.submit(rotate_closed_logs, shard)
+        await asyncio.sleep(ROTATE_CHECK_S)
+
+async def stats_reporter(logger):
+    """Print per-series message and row rates."""
+    while True:
+        await asyncio.sleep(STATS_INTERVAL_S)
+        for series, shard in sorted(logger.shards.items()):
+            counts, elapsed = shard.take_counts()
+            rates = ", ".join(f"{name}={count / max(elapsed, 1e-9):.1f}/s" for name, count in counts.items())
+            print(f"STATS [{series}] {rates} books={len(shard.books)} queued={shard.disk.queue.qsize() + len(shard.disk.overflow)}")
+
+async def run_logger(series=None):
+    series = list(series or SERIES)
+    print(f"Recording series: {', '.join(series)}")
+    tick_bus = TickBus(TICK_BUS_PATH)
+    await tick_bus.start()
+    # Catch the manifest up with the directory before any writer touches it
+    manifest = LogManifest(LOG_DIR)
+    await asyncio.to_thread(manifest.load)
+    logger = GranularLogger(tick_bus=tick_bus, journal=BOOK_JOURNAL_ENABLED, series=series, manifest=manifest)
     
     # Load Private Key
     try:
@@ -369,8 +1403,47 @@ async def run_logger():
         return
 
     # Start Manifest Updater (only once)
-    asyncio.create_task(manifest_updater())
+    asyncio.create_task(manifest_updater(manifest))
+    asyncio.create_task(csv_flusher(logger))
+    asyncio.create_task(stats_reporter(logger))
+    asyncio.create_task(log_rotator(logger))
+    if LADDER_MODE == "stream":
+        asyncio.create_task(ladder_streamer(logger))
 
+    try:
+        await _logger_loop(logger, private_key)
+    finally:
+        logger.close()
+        manifest.save()
+        print("CSV writers flushed and closed.")
+
+async def refresh_markets(websocket, logger, subscriptions):
+    market_info = await asyncio.to_thread(fetch_active_markets, logger.series)
+    logger.update_last_trade_prices(market_info)
+    desired = set(market_info)
+    found_series = {series_of(ticker) for ticker in desired}
+    # An empty answer for a series is treated as a failed fetch, not "no markets".
+    desired |= {ticker for ticker in subscriptions.desired if series_of(ticker) not in found_series}
+    new_tickers = desired - subscriptions.desired
+    if new_tickers and subscriptions.desired:
+        print(f"New markets found: {new_tickers}")
+    closed_tickers = subscriptions.desired - desired
+    if closed_tickers:
+        print(f"Markets closed: {closed_tickers}")
+    subscriptions.desired = desired
+    await subscriptions.sync(websocket)
+
+async def market_discovery(websocket, logger, subscriptions):
+    """Periodically subscribe to newly listed markets and drop closed ones without blocking the receive loop."""
+    while True:
+        await asyncio.sleep(MARKET_DISCOVERY_INTERVAL_S)
+        print("Checking for new markets...")
+        await refresh_markets(websocket, logger, subscriptions)
+
+async def _logger_loop(logger, private_key):
+    subscriptions = SubscriptionManager()
+    sequences = SequenceTracker()
+    resyncing = set()
     while True:
         try:
             # Connect
@@ -380,48 +1453,66 @@ async def run_logger():
             async with websockets.connect(WS_URL, additional_headers=ws_headers) as websocket:
                 print("Connected to WebSocket.")
                 
-                # Initial Subscription
-                market_info = fetch_active_markets()
-                subscribed_tickers = set(market_info)
-                logger.update_last_trade_prices(market_info)
-                await subscribe_to_tickers(websocket, subscribed_tickers)
-                
-                # Monitor Loop
-                last_check_time = time.time()
+                # Resubscribe last known markets in one batch before the REST refresh
+                subscriptions.reset()
+                sequences.reset()
+                await subscriptions.sync(websocket)
+                await refresh_markets(websocket, logger, subscriptions)
                 
-                async for message in websocket:
-                    # print(f"DEBUG: Msg received: {len(message)} bytes")
-                    try:
-                        data = json.loads(message)
-                        msg_type = data.get("type")
-                        msg = data.get("msg", {})
-                        
-                        print(f"DEBUG: Type={msg_type} Ticker={msg.get('market_ticker')}")
-
-                        if msg_type == "orderbook_snapshot":
-                            logger.handle_snapshot(msg)
-                        elif msg_type == "orderbook_delta":
-                            logger.handle_delta(msg)
-                        elif msg_type == "error":
-                            print(f"ERROR MSG: {data}")
-                        elif msg_type == "subscription_status":
-                             print(f"SUB STATUS: {data}")
-                        
-                        # Periodically check for new markets (every 5 mins)
-                        if time.time() - last_check_time > 300:
-                            print("Checking for new markets...")
-                            market_info = fetch_active_markets()
-                            current_tickers = set(market_info)
-                            logger.update_last_trade_prices(market_info)
-                            new_tickers = current_tickers - subscribed_tickers
-                            if new_tickers:
-                                print(f"New markets found: {new_tickers}")
-                                await subscribe_to_tickers(websocket, new_tickers)
-                                subscribed_tickers.update(new_tickers)
-                            last_check_time = time.time()
-                            
-                    except Exception as e:
-                        print(f"Error processing message: {e}")
+                discovery = asyncio.create_task(market_discovery(websocket, logger, subscriptions))
+                try:
+                    # Monitor Loop: decode and update books only; disk writes go to the writer thread
+                    async for message in websocket:
+                        try:
+                            data = json.loads(message)
+                            msg_type = data.get("type")
+                            msg = data.get("msg", {})
+
+                            if msg_type in ("orderbook_snapshot", "orderbook_delta"):
+                                sid = data.get("sid")
+                                ticker = msg.get("market_ticker")
+                                expected = sequences.check(sid, data.get("seq"), ticker)
+                                if expected is not None:
+                                    seen = sequences.forget(sid)
+                                    suspect = seen - resyncing
+                                    print(f"Sequence gap on sid {sid}: expected {expected}, got {data.get('seq')}; resubscribing {len(suspect)} markets")
+                                    for suspect_ticker in suspect:
+                                        logger.log_gap("GAP", suspect_ticker, sid, expected, data.get("seq"))
+                                    if suspect:
+                                        # Books stay suspect until the resubscribe's snapshot replaces them
+                                        resyncing.update(suspect)
+                                        await subscriptions.resubscribe(websocket, sid, seen)
+
+                            if msg_type == "orderbook_snapshot":
+                                ticker = msg.get("market_ticker")
+                                subscriptions.mark_active(ticker, data.get("sid"))
+                                logger.handle_snapshot(msg, data.get("seq"))
+                                if ticker in resyncing:
+                                    resyncing.discard(ticker)
+                                    logger.log_gap("RESYNC", ticker, data.get("sid"))
+                            elif msg_type == "orderbook_delta":
+                                logger.handle_delta(msg, data.get("seq"))
+                            elif msg_type == "error":
+                                print(f"ERROR MSG: {data}")
+                                subscriptions.handle_error(data)
+                            elif msg_type in ("subscribed", "subscription_status"):
+                                subscriptions.handle_ack(data)
+                            elif msg_type == "unsubscribed":
+                                sequences.forget(data.get("sid"))
+                                print(f"Subscription {data.get('sid')} closed")
+                            elif msg_type == "ok":
+                                print(f"Subscription {data.get('sid')} updated")
+                            else:
+                                print(f"DEBUG: Type={msg_type} Ticker={msg.get('market_ticker')}")
+
+                        except Exception as e:
+                            print(f"Error processing message: {e}")
+
+                        # Back-pressure: stop reading until the writers have room
+                        if logger.backlogged():
+                            await logger.drain()
+                finally:
+                    discovery.cancel()
                         
         except Exception as e:
             print(f"Connection lost or error: {e}")
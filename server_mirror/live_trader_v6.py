@@ -29,6 +29,7 @@ _ensure_import_path()
 # NOTE: On the VM, live_trader_v4.py sits next to this file.
 # Locally, it may live under server_mirror/; _ensure_import_path() handles that.
 from live_trader_v4 import (  # type: ignore  # noqa: E402
+    LOG_DIR,
     LiveTraderV4,
     ComplexStrategy,
     calculate_convex_fee,
@@ -39,6 +40,11 @@ from live_trader_v4 import (  # type: ignore  # noqa: E402
 import numpy as np  # noqa: E402
 import pandas as pd  # noqa: E402
 
+try:
+    from unified_engine.file_watch import DirectoryWatcher  # noqa: E402
+except ImportError:
+    DirectoryWatcher = None
+
 
 class InventoryAwareMarketMakerV6(ComplexStrategy):
     """Backtester-parity MM sizing + gating.
@@ -507,6 +513,7 @@ class LiveTraderV6(LiveTraderV4):
         return out_path
 
     def run(self):
+        watcher = None
         try:
             mode = "PAPER" if self.paper else "LIVE"
             print(f"=== Live Trader V6 ({mode}) ===", flush=True)
@@ -528,6 +535,10 @@ class LiveTraderV6(LiveTraderV4):
             self._apply_inventory_cap()
             self.update_status_file("STARTING")
 
+            # Wake as soon as the logger appends to market_logs instead of a fixed 1s sleep.
+            log_dir = os.path.expanduser(f"~/{LOG_DIR}")
+            watcher = DirectoryWatcher(log_dir, poll_s=1.0) if DirectoryWatcher else None
+
             while True:
                 if not self.check_control_flag():
                     self.update_status_file("PAUSED")
@@ -564,7 +575,10 @@ class LiveTraderV6(LiveTraderV4):
                     for row in all_new_ticks:
                         self.on_tick(row)
 
-                time.sleep(1)
+                if watcher is not None:
+                    watcher.wait(timeout=1.0)
+                else:
+                    time.sleep(1)
         except Exception as e:
             import traceback
 
@@ -575,6 +589,10 @@ class LiveTraderV6(LiveTraderV4):
                 f.write(datetime.now().strftime("%Y-%m-%d %H:%M:%S") + "\n")
                 f.write(traceback.format_exc())
             raise
+        finally:
+            # The inotify fd would otherwise outlive run() on a crash or Ctrl-C.
+            if watcher is not None:
+                watcher.close()
 
 
 def main() -> None:
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
+from bisect import bisect_left, insort
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Any
 
 import math
+import random
 import time
 import base64
 import json
@@ -23,6 +25,16 @@ def calculate_convex_fee(price: float, qty: int) -> float:
     return math.ceil(raw_fee * 100) / 100.0
 
 
+def iso_to_epoch(value: str | None) -> float | None:
+    """Epoch seconds for an API timestamp such as an order's created_time."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        return None
+
+
 def sign_pss_text(private_key, text: str) -> str:
     message = text.encode('utf-8')
     signature = private_key.sign(
@@ -57,8 +69,23 @@ class BaseAdapter:
         return None
 
     def get_open_orders(self, ticker: str, market_state: dict, current_time: datetime) -> list[dict]:
+        """Resting orders for ticker in the API's shape.
+
+        created_ts, when present, is the order's creation time in epoch
+        seconds, converted once when the order is created or synced; the
+        engine's quote-lifetime and max-age checks only compare numbers.
+        """
         raise NotImplementedError
 
+    def orders_version(self, ticker: str) -> int | None:
+        """Counter that changes whenever the ticker's open orders may have changed.
+
+        The engine reuses its view of a ticker's orders while this is unchanged.
+        None (the default) means the adapter cannot tell, so the view is rebuilt
+        every tick.
+        """
+        return None
+
     def cancel_order(self, order_id: str | None) -> None:
         raise NotImplementedError
 
@@ -85,7 +112,16 @@ class SimAdapter(BaseAdapter):
     ):
         self.cash = float(initial_cash)
         self.positions: dict[str, dict[str, Any]] = initial_positions or {}
-        self.open_orders: list[dict[str, Any]] = []
+        # Resting orders by id (placement order) and by ticker, so a tick or a
+        # cancel only touches the orders it concerns.
+        self._open_by_id: dict[str, dict[str, Any]] = {}
+        self._open_by_ticker: dict[str, dict[str, dict[str, Any]]] = {}
+        # Per (ticker, side): (limit price, placement seq, order) sorted ascending,
+        # so the orders an ask can cross are a suffix found by bisect.
+        self._price_ladder: dict[tuple[str, str], list[tuple[float, int, dict[str, Any]]]] = {}
+        self._open_seq: dict[str, int] = {}
+        self._open_count = 0
+        self._orders_version: dict[str, int] = {}
         self.trades: list[dict[str, Any]] = []
         self.order_history: list[dict[str, Any]] = []
         self._order_id = 0
@@ -98,9 +134,9 @@ class SimAdapter(BaseAdapter):
         # Or just linear approx if P is small: P_sec = P_min / 60
         self._fill_prob_per_sec = float(fill_prob_per_min) / 60.0
         
-        # Deterministic Simulation
-        import random
-        random.seed(42)
+        # Deterministic Simulation: each adapter owns its generator, so engines
+        # replayed side by side (run_backtests) never share or reseed draws.
+        self._rng = random.Random(42)
 
     def _sample_fill_latency(self) -> float:
         if self._fill_latency_sampler:
@@ -114,6 +150,58 @@ class SimAdapter(BaseAdapter):
         self._order_id += 1
         return f"SIM_{self._order_id}"
 
+    @property
+    def open_orders(self) -> list[dict[str, Any]]:
+        """Every resting order, oldest first."""
+        return list(self._open_by_id.values())
+
+    @staticmethod
+    def _limit_price(order: dict[str, Any]) -> float:
+        return float(order["yes_price"] if order["side"] == "yes" else order["no_price"])
+
+    def _add_open(self, order: dict[str, Any]) -> None:
+        order_id = order["order_id"]
+        self._open_by_id[order_id] = order
+        self._open_by_ticker.setdefault(order["ticker"], {})[order_id] = order
+        self._orders_version[order["ticker"]] = self._orders_version.get(order["ticker"], 0) + 1
+        self._open_count += 1
+        seq = self._open_count
+        self._open_seq[order_id] = seq
+        insort(
+            self._price_ladder.setdefault((order["ticker"], order["side"]), []),
+            (self._limit_price(order), seq, order),
+        )
+
+    def _remove_open(self, order: dict[str, Any]) -> None:
+        order_id = order["order_id"]
+        if self._open_by_id.pop(order_id, None) is None:
+            return
+        self._orders_version[order["ticker"]] = self._orders_version.get(order["ticker"], 0) + 1
+        by_id = self._open_by_ticker.get(order["ticker"])
+        if by_id is not None:
+            by_id.pop(order_id, None)
+            if not by_id:
+                del self._open_by_ticker[order["ticker"]]
+        key = (order["ticker"], order["side"])
+        ladder = self._price_ladder.get(key)
+        if ladder is not None:
+            idx = bisect_left(ladder, (self._limit_price(order), self._open_seq.pop(order_id)))
+            del ladder[idx]
+            if not ladder:
+                del self._price_ladder[key]
+
+    def _crossable_orders(self, ticker: str, market_state: dict) -> list[dict[str, Any]]:
+        """Resting orders whose limit reaches the current ask on their side, oldest first."""
+        crossable = []
+        for side, ask_key in (("yes", "yes_ask"), ("no", "no_ask")):
+            ask = market_state.get(ask_key)
+            ladder = self._price_ladder.get((ticker, side))
+            if ask is None or not ladder:
+                continue
+            crossable.extend(ladder[bisect_left(ladder, (float(ask),)):])
+        crossable.sort(key=lambda entry: entry[1])
+        return [entry[2] for entry in crossable]
+
     def process_tick(self, ticker: str, market_state: dict, current_time: datetime) -> None:
         # Track last mid price for settlement
         ya = market_state.get("yes_ask")
@@ -129,16 +217,20 @@ class SimAdapter(BaseAdapter):
 
     def get_open_orders(self, ticker: str, market_state: dict, current_time: datetime) -> list[dict]:
         self._fill_resting_orders(ticker, market_state, current_time)
-        return [o for o in self.open_orders if o.get("ticker") == ticker]
+        return list(self._open_by_ticker.get(ticker, {}).values())
+
+    def orders_version(self, ticker: str) -> int | None:
+        return self._orders_version.get(ticker, 0)
 
     def cancel_order(self, order_id: str | None) -> None:
         if order_id is None:
             return
-        for o in self.open_orders:
-            if o.get("order_id") == order_id:
-                o["status"] = "canceled"
-                o["remaining_count"] = 0
-        self.open_orders = [o for o in self.open_orders if o.get("remaining_count", 0) > 0]
+        order = self._open_by_id.get(order_id)
+        if order is None:
+            return
+        order["status"] = "canceled"
+        order["remaining_count"] = 0
+        self._remove_open(order)
 
     def place_order(self, order, market_state: dict, current_time: datetime) -> OrderResult:
         side = "yes" if order.action == "BUY_YES" else "no"
@@ -189,7 +281,7 @@ class SimAdapter(BaseAdapter):
             )
             return OrderResult(ok=True, filled=filled, status="executed")
 
-        self.open_orders.append(new_order)
+        self._add_open(new_order)
         if self._diag_log:
             self._diag_log(
                 "ORDER",
@@ -238,12 +330,11 @@ class SimAdapter(BaseAdapter):
             lp = float(last_price)
             
             # Check probability first (Throttle)
-            import random
             # Use fill_prob_per_min directly as a "capture rate" for observed trades
             # Since this is called per tick, and ticks are frequent, we need to be careful.
             # But wait, fill_prob_per_min was converted to fill_prob_per_sec.
             # Let's use fill_prob_per_sec as the probability to capture THIS specific trade.
-            if self._fill_prob_per_sec > 0 and random.random() < self._fill_prob_per_sec:
+            if self._fill_prob_per_sec > 0 and self._rng.random() < self._fill_prob_per_sec:
                 # If we are buying YES at P, and a trade happens at <= P, we might have been filled.
                 if side == "yes":
                     if lp <= price:
@@ -368,15 +459,19 @@ class SimAdapter(BaseAdapter):
         return True
 
     def _fill_resting_orders(self, ticker: str, market_state: dict, current_time: datetime) -> None:
-        remaining = []
-        for order in self.open_orders:
-            if order.get("ticker") != ticker:
-                remaining.append(order)
-                continue
+        resting = self._open_by_ticker.get(ticker)
+        if not resting:
+            return
+        if self._fill_prob_per_sec > 0 and market_state.get("last_price") is not None:
+            # Every order takes a draw for a throttled passive fill, so all are visited.
+            candidates = list(resting.values())
+        else:
+            # Only an ask at or below the limit can fill; the rest are skipped.
+            candidates = self._crossable_orders(ticker, market_state)
+        for order in candidates:
             filled = self._maybe_fill(order, market_state, current_time)
-            if not filled and order.get("remaining_count", 0) > 0:
-                remaining.append(order)
-        self.open_orders = remaining
+            if filled or order.get("remaining_count", 0) <= 0:
+                self._remove_open(order)
 
     def get_positions(self) -> dict[str, dict[str, Any]]:
         return self.positions
@@ -444,6 +539,8 @@ class LiveAdapter(BaseAdapter):
         
         self._open_orders_cache = {} # {ticker: (timestamp, orders)}
         self._orders_cache_ttl = 2.0
+        # Bumped on every cache refill or invalidation (see orders_version).
+        self._orders_version = 0
         
         # Track session trades
         self.trades = []
@@ -561,15 +658,23 @@ class LiveAdapter(BaseAdapter):
                         "remaining_count": int(rc) if rc is not None else 0,
                         "status": o.get("status"),
                         "created_time": o.get("created_time"),
+                        "created_ts": iso_to_epoch(o.get("created_time")),
                     })
                 self._open_orders_cache[ticker] = (time.time(), orders)
+                self._orders_version += 1
                 return orders
         except Exception as e:
             if self._diag_log:
                 self._diag_log("ERROR", msg=f"Get orders failed: {e}")
         
+        self._orders_version += 1
         return []
 
+    def orders_version(self, ticker: str) -> int | None:
+        # A refetch hands back a new list even when nothing changed, so this
+        # only stays put while the cached list is being served.
+        return self._orders_version
+
     def get_open_orders_all(self) -> list[dict]:
         path = "/trade-api/v2/portfolio/orders"
         headers = create_headers(self.private_key, "GET", path)
@@ -596,6 +701,7 @@ class LiveAdapter(BaseAdapter):
             self._session.delete(API_URL + path, headers=headers)
             # Invalidate cache? Hard to know which ticker.
             self._open_orders_cache = {} # Clear all to be safe
+            self._orders_version += 1
         except Exception:
             pass
 
@@ -682,6 +788,7 @@ class LiveAdapter(BaseAdapter):
                 if resp.status_code == 201:
                     if ticker in self._open_orders_cache:
                         del self._open_orders_cache[ticker]
+                        self._orders_version += 1
                     if self._diag_log:
                         self._diag_log(
                             "ORDER_ACCEPTED",
@@ -0,0 +1,598 @@
+"""Single-strategy unified backtest, factored out of run_unified_backtest.py.
+
+BacktestRun owns one strategy + SimAdapter + UnifiedEngine and the
+famine/abundance gate, shadow restart sim, settlement and equity tracking
+that go with it. Callers own the tick loop: feed warmup ticks to
+on_warmup_tick() and simulated ticks to on_tick(), then read result().
+run_backtests() drives many runs from a single tick stream so each tick is
+decoded once no matter how many strategies consume it.
+"""
+
+from __future__ import annotations
+
+import importlib
+import os
+import time as time_module
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, time
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+from .adapters import SimAdapter
+from .engine import UnifiedEngine
+from .profiling import PhaseProfiler
+
+try:
+    from server_mirror.backtesting.engine import parse_market_date_from_ticker
+except ImportError:
+    from backtesting.engine import parse_market_date_from_ticker
+
+
+GENERIC_V3_DEFAULT_KWARGS = {
+    "risk_pct": 0.8,
+    "max_notional_pct": 0.10,
+    "margin_cents": 8.0,
+    "tightness_percentile": 10,
+    "scaling_factor": 2.0,
+    "max_inventory": 150,
+    "max_loss_pct": 0.03,
+}
+
+
+@dataclass
+class BacktestConfig:
+    start_ts: datetime
+    end_ts: datetime
+    strategy: str = "hb_notional_010"
+    strategy_kwargs: dict[str, Any] | None = None
+    label: str = ""
+    initial_cash: float = 2.12
+    min_requote_interval: float = 1.0
+    warmup_hours: int = 0
+    day_boundary_hour: int = 0
+    trade_all_day: bool = False
+    max_loss_pct: float | None = None
+    famine_days: int = 0
+    abundance_days: int = 0
+    famine_daily_pct: float = 0.0
+    abundance_daily_pct: float = 0.0
+    resume_restart_mode: str = "off"
+    resume_restart_pct: float = 0.0
+    fill_prob_per_min: float = 0.0
+    profile: bool = False
+
+    @property
+    def warmup_start_ts(self) -> datetime:
+        return self.start_ts - timedelta(hours=self.warmup_hours)
+
+
+@dataclass
+class BacktestResult:
+    label: str
+    strategy: str
+    final_equity: float
+    final_cash: float
+    trade_count: int
+    # [(day, last equity of that day)], days split at day_boundary_hour.
+    daily_equity: list[tuple[str, float]] = field(default_factory=list)
+    wall_time: float = 0.0
+    ticks: int = 0
+
+
+def resolve_strategy_factory(name: str) -> Callable[..., Any]:
+    if ":" in name:
+        # Dynamic loading: module:function
+        module_name, func_name = name.split(":")
+        return getattr(importlib.import_module(module_name), func_name)
+    try:
+        import server_mirror.backtesting.strategies.v3_variants as v3_variants
+    except ImportError:
+        import backtesting.strategies.v3_variants as v3_variants
+    return getattr(v3_variants, name)
+
+
+def default_strategy_kwargs(name: str) -> dict[str, Any]:
+    if name == "generic_v3":
+        return dict(GENERIC_V3_DEFAULT_KWARGS)
+    return {}
+
+
+def forward_price(market_state: dict) -> float | None:
+    ya = market_state.get("yes_ask")
+    yb = market_state.get("yes_bid")
+    if ya is not None and yb is not None:
+        return (float(ya) + float(yb)) / 2.0
+    if ya is not None:
+        return float(ya)
+    if yb is not None:
+        return float(yb)
+    return None
+
+
+def compute_holdings(adapter: SimAdapter) -> float:
+    holdings = 0.0
+    positions = adapter.get_positions()
+    for ticker, pos in positions.items():
+        yes_qty = int(pos.get("yes") or 0)
+        no_qty = int(pos.get("no") or 0)
+        last_price = adapter.last_prices.get(ticker, 50.0)
+        holdings += yes_qty * (last_price / 100.0)
+        holdings += no_qty * ((100.0 - last_price) / 100.0)
+    return holdings
+
+
+class _GatedStrategy:
+    def __init__(self, base, gate):
+        self._base = base
+        self._gate = gate
+        self.name = getattr(base, "name", "gated")
+
+    def __getattr__(self, item):
+        return getattr(self._base, item)
+
+    def on_market_update(self, *args, **kwargs):
+        if not self._gate["enabled"]:
+            return []
+        return self._base.on_market_update(*args, **kwargs)
+
+
+class BacktestRun:
+    def __init__(
+        self,
+        config: BacktestConfig,
+        initial_positions: dict[str, dict] | None = None,
+        *,
+        decision_log: Callable[[dict], None] | None = None,
+        record_history: bool = True,
+        verbose: bool = False,
+        quiet: bool = False,
+        log: Callable[[str], None] | None = None,
+    ) -> None:
+        self.config = config
+        self.initial_positions = initial_positions or {}
+        self.record_history = record_history
+        self.verbose = verbose
+        self.quiet = quiet
+        self._log = log or (lambda message: None)
+
+        self._strategy_factory = resolve_strategy_factory(config.strategy)
+        if config.strategy_kwargs:
+            self.strategy_kwargs = dict(config.strategy_kwargs)
+        else:
+            self.strategy_kwargs = default_strategy_kwargs(config.strategy)
+        self.base_strategy = self.build_strategy()
+
+        self.adapter = SimAdapter(
+            initial_cash=config.initial_cash,
+            initial_positions=self.initial_positions,
+            diag_log=None,
+            fill_prob_per_min=config.fill_prob_per_min,
+        )
+        # Seed initial prices from snapshot cost basis to avoid equity spikes
+        for ticker, pos in self.initial_positions.items():
+            yes_qty = int(pos.get("yes") or 0)
+            no_qty = int(pos.get("no") or 0)
+            cost = float(pos.get("cost") or 0.0)
+            if yes_qty > 0:
+                # Price in cents
+                self.adapter.last_prices[ticker] = (cost / yes_qty) * 100.0
+            elif no_qty > 0:
+                # Price in cents (implied YES price)
+                self.adapter.last_prices[ticker] = 100.0 - ((cost / no_qty) * 100.0)
+
+        self.engine = UnifiedEngine(
+            strategy=self.base_strategy,
+            adapter=self.adapter,
+            min_requote_interval=config.min_requote_interval,
+            diag_log=None,
+            decision_log=decision_log,
+            profiler=PhaseProfiler() if config.profile else None,
+        )
+
+        self.famine_enabled = config.famine_days > 0 and config.abundance_days > 0
+        self.resume_on_restart = config.resume_restart_mode != "off"
+        self.gate_state = {
+            "enabled": True,
+            "current_day": None,
+            "day_start_equity": None,
+            "last_day_equity": None,
+            "neg_streak": 0,
+            "pos_streak": 0,
+        }
+        self.shadow_state = {
+            "day": None,
+            "start_equity": None,
+            "last_equity": None,
+            "adapter": None,
+            "engine": None,
+        }
+        self.strategy = self.base_strategy
+        if self.famine_enabled:
+            self.strategy = _GatedStrategy(self.base_strategy, self.gate_state)
+            self.engine.strategy = self.strategy
+
+        self.equity_history: list[dict] = []
+        self.equity_breakdowns: list[dict] = []
+        self.daily_equity: dict[str, float] = {}
+        self.settled_dates: set[tuple[str, Any]] = set()
+        self.warmup_count = 0
+        self.tick_count = 0
+        self.finished = False
+        self._last_breakdown_date = None
+        self._started_perf = time_module.perf_counter()
+
+    @property
+    def label(self) -> str:
+        return self.config.label or self.config.strategy
+
+    def build_strategy(self):
+        try:
+            strat = self._strategy_factory(**self.strategy_kwargs)
+        except TypeError:
+            strat = self._strategy_factory()
+
+        if self.config.max_loss_pct is not None:
+            try:
+                if hasattr(strat, "mm") and hasattr(strat.mm, "max_loss_pct"):
+                    strat.mm.max_loss_pct = float(self.config.max_loss_pct)
+                if hasattr(strat, "max_loss_pct"):
+                    strat.max_loss_pct = float(self.config.max_loss_pct)
+            except (TypeError, ValueError):
+                pass
+
+        if self.config.trade_all_day:
+            self._log("Disabling time constraints (trade-all-day)...")
+            strat.active_hours = list(range(24))
+        return strat
+
+    def _trading_day(self, t: datetime):
+        if self.config.day_boundary_hour:
+            return (t - timedelta(hours=self.config.day_boundary_hour)).date()
+        return t.date()
+
+    def missing_price_tickers(self) -> list[str]:
+        return [t for t in self.initial_positions if t not in self.adapter.last_prices]
+
+    def seed_forward_prices(self, forward_ticks: Iterable[dict]) -> None:
+        """Price snapshot positions that never ticked during warmup from their first later tick."""
+        remaining = set(self.missing_price_tickers())
+        if not remaining:
+            return
+        for tick in forward_ticks:
+            ticker = tick["ticker"]
+            if ticker not in remaining:
+                continue
+            price = forward_price(tick["market_state"])
+            if price is not None:
+                self.adapter.last_prices[ticker] = price
+                self._log(f"  Found forward price for {ticker}: {price}")
+                remaining.discard(ticker)
+                if not remaining:
+                    break
+
+    def on_warmup_tick(self, tick: dict) -> None:
+        t = tick["time"]
+        self.warmup_count += 1
+        if self.warmup_count % 10000 == 0:
+            if self.verbose and not self.quiet:
+                print(f"Warmup processed {self.warmup_count} ticks... Current: {t}")
+
+        portfolios_inventories = {"MM": {"YES": 0, "NO": 0}}
+        active_orders = []
+        spendable_cash = self.config.initial_cash
+
+        self.adapter.process_tick(tick["ticker"], tick["market_state"], t)
+
+        self.strategy.on_market_update(
+            tick["ticker"],
+            tick["market_state"],
+            t,
+            portfolios_inventories,
+            active_orders,
+            spendable_cash,
+        )
+
+    def record_equity(self, record_ts: datetime) -> float:
+        adapter = self.adapter
+        cash_val = adapter.get_cash()
+        holdings_val = compute_holdings(adapter)
+        equity_val = cash_val + holdings_val
+        self.daily_equity[self._trading_day(record_ts).isoformat()] = equity_val
+        if not self.record_history:
+            return equity_val
+        self.equity_history.append(
+            {
+                "date": record_ts.isoformat(),
+                "equity": equity_val,
+                "cash": cash_val,
+                "holdings": holdings_val,
+            }
+        )
+        # Record breakdown once per day (on the first tick of each day)
+        current_date = record_ts.date()
+        if self._last_breakdown_date is None or current_date > self._last_breakdown_date:
+            positions = adapter.get_positions()
+            for ticker, pos in positions.items():
+                yes_qty = int(pos.get("yes") or 0)
+                no_qty = int(pos.get("no") or 0)
+                last_price = adapter.last_prices.get(ticker, 50.0)
+                value = (yes_qty * (last_price / 100.0)) + (no_qty * ((100.0 - last_price) / 100.0))
+                self.equity_breakdowns.append(
+                    {
+                        "date": current_date.isoformat(),
+                        "ticker": ticker,
+                        "yes_qty": yes_qty,
+                        "no_qty": no_qty,
+                        "last_price": last_price,
+                        "value": value,
+                        "cash": cash_val,
+                        "equity": equity_val,
+                    }
+                )
+            self._last_breakdown_date = current_date
+        return equity_val
+
+    def _reset_shadow(self) -> None:
+        self.shadow_state["day"] = None
+        self.shadow_state["start_equity"] = None
+        self.shadow_state["last_equity"] = None
+        self.shadow_state["adapter"] = None
+        self.shadow_state["engine"] = None
+
+    def _update_gate(self, t: datetime, equity_val: float) -> None:
+        config = self.config
+        gate_state = self.gate_state
+        shadow_state = self.shadow_state
+        day = self._trading_day(t)
+        if gate_state["current_day"] is None:
+            gate_state["current_day"] = day
+            gate_state["day_start_equity"] = equity_val
+            gate_state["last_day_equity"] = equity_val
+            return
+        if day == gate_state["current_day"]:
+            gate_state["last_day_equity"] = equity_val
+            return
+
+        # Day rolled over: evaluate previous day performance
+        start_eq = gate_state["day_start_equity"]
+        end_eq = gate_state["last_day_equity"]
+        if start_eq and end_eq is not None:
+            daily_pct = ((end_eq / start_eq) - 1.0) * 100.0
+            if daily_pct <= config.famine_daily_pct:
+                gate_state["neg_streak"] += 1
+                gate_state["pos_streak"] = 0
+            elif daily_pct >= config.abundance_daily_pct:
+                gate_state["pos_streak"] += 1
+                gate_state["neg_streak"] = 0
+            else:
+                gate_state["neg_streak"] = 0
+                gate_state["pos_streak"] = 0
+
+        if gate_state["enabled"] and gate_state["neg_streak"] >= config.famine_days:
+            gate_state["enabled"] = False
+            if not self.quiet:
+                print(f"[FAMINE] Pausing at {t} after {gate_state['neg_streak']} losing days")
+            for order in list(self.adapter.open_orders):
+                self.adapter.cancel_order(order.get("order_id"))
+        elif (
+            (not gate_state["enabled"])
+            and (not self.resume_on_restart)
+            and gate_state["pos_streak"] >= config.abundance_days
+        ):
+            gate_state["enabled"] = True
+            if not self.quiet:
+                print(f"[ABUNDANCE] Resuming at {t} after {gate_state['pos_streak']} winning days")
+            gate_state["neg_streak"] = 0
+            gate_state["pos_streak"] = 0
+
+        if self.resume_on_restart and not gate_state["enabled"] and config.resume_restart_mode == "eod":
+            start_eq = shadow_state["start_equity"]
+            end_eq = shadow_state["last_equity"]
+            if start_eq and end_eq is not None:
+                restart_pct = ((end_eq / start_eq) - 1.0) * 100.0
+                if restart_pct >= config.resume_restart_pct:
+                    gate_state["enabled"] = True
+                    gate_state["neg_streak"] = 0
+                    gate_state["pos_streak"] = 0
+                    if not self.quiet:
+                        print(f"[RESTART] Resuming at {t} (EOD restart ROI {restart_pct:.2f}%)")
+
+        gate_state["current_day"] = day
+        gate_state["day_start_equity"] = equity_val
+        gate_state["last_day_equity"] = equity_val
+        if self.resume_on_restart and not gate_state["enabled"]:
+            shadow_state["day"] = day
+            shadow_state["start_equity"] = self.adapter.get_cash()
+            shadow_state["last_equity"] = shadow_state["start_equity"]
+            shadow_adapter = SimAdapter(initial_cash=shadow_state["start_equity"])
+            shadow_engine = UnifiedEngine(
+                strategy=self.build_strategy(),
+                adapter=shadow_adapter,
+                min_requote_interval=config.min_requote_interval,
+                diag_log=None,
+                decision_log=None,
+            )
+            shadow_state["adapter"] = shadow_adapter
+            shadow_state["engine"] = shadow_engine
+        else:
+            self._reset_shadow()
+
+    def _step_shadow(self, tick: dict) -> None:
+        config = self.config
+        shadow_engine = self.shadow_state.get("engine")
+        shadow_adapter = self.shadow_state.get("adapter")
+        if shadow_engine is None or shadow_adapter is None:
+            return
+        t = tick["time"]
+        shadow_engine.on_tick(
+            ticker=tick["ticker"],
+            market_state=tick["market_state"],
+            current_time=t,
+            tick_seq=tick.get("seq"),
+            tick_source=tick.get("source_file"),
+            tick_row=tick.get("source_row"),
+        )
+        shadow_equity = shadow_adapter.get_cash() + compute_holdings(shadow_adapter)
+        self.shadow_state["last_equity"] = shadow_equity
+        if config.resume_restart_mode == "intraday":
+            start_eq = self.shadow_state["start_equity"]
+            if start_eq and ((shadow_equity / start_eq) - 1.0) * 100.0 >= config.resume_restart_pct:
+                self.gate_state["enabled"] = True
+                self.gate_state["neg_streak"] = 0
+                self.gate_state["pos_streak"] = 0
+                self._reset_shadow()
+                if not self.quiet:
+                    print(f"[RESTART] Resuming at {t} (intraday restart ROI >= {config.resume_restart_pct:.2f}%)")
+
+    def _settle_expired(self, t: datetime) -> None:
+        adapter = self.adapter
+        for ticker in list(adapter.positions.keys()):
+            m_dt = parse_market_date_from_ticker(ticker)
+            if m_dt:
+                settle_dt = datetime.combine(m_dt.date() + timedelta(days=1), time(5, 0, 0))
+                if t >= settle_dt and (ticker, m_dt.date()) not in self.settled_dates:
+                    last_price = adapter.last_prices.get(ticker, 50.0)
+                    settle_price = 100.0 if last_price >= 50.0 else 0.0
+
+                    if self.verbose and not self.quiet:
+                        print(f"*** SETTLING {ticker} at {t} (Price: {settle_price}) ***")
+                    payout = adapter.settle_market(ticker, settle_price, t)
+                    if self.verbose and not self.quiet:
+                        print(f"*** Payout: ${payout:.2f} | New Cash: ${adapter.cash:.2f} ***")
+                    self.settled_dates.add((ticker, m_dt.date()))
+
+    def on_tick(self, tick: dict) -> None:
+        t = tick["time"]
+        equity_val = self.record_equity(t)
+        if self.famine_enabled:
+            self._update_gate(t, equity_val)
+
+        self.tick_count += 1
+        self.engine.on_tick(
+            ticker=tick["ticker"],
+            market_state=tick["market_state"],
+            current_time=t,
+            tick_seq=tick.get("seq"),
+            tick_source=tick.get("source_file"),
+            tick_row=tick.get("source_row"),
+        )
+
+        if self.resume_on_restart and not self.gate_state["enabled"]:
+            self._step_shadow(tick)
+
+        self._settle_expired(t)
+
+    def feed(self, tick: dict) -> bool:
+        """Route one time-ordered tick; returns False once past end_ts."""
+        t = tick["time"]
+        if t < self.config.warmup_start_ts:
+            return True
+        if t > self.config.end_ts:
+            return False
+        if t < self.config.start_ts:
+            self.on_warmup_tick(tick)
+        else:
+            self.on_tick(tick)
+        return True
+
+    def final_holdings(self) -> list[tuple[str, str, float, float]]:
+        """[(ticker, position text, mark price, value)] marked at the last seen prices."""
+        holdings = []
+        for ticker, pos in self.adapter.get_positions().items():
+            yes_qty = pos.get("yes", 0)
+            no_qty = pos.get("no", 0)
+            last_yes_price = self.adapter.last_prices.get(ticker, 0.0)
+            if yes_qty > 0:
+                mark_price = last_yes_price
+                val = yes_qty * (mark_price / 100.0)
+                pos_str = f"{yes_qty} YES"
+            else:
+                mark_price = 100.0 - last_yes_price
+                val = no_qty * (mark_price / 100.0)
+                pos_str = f"{no_qty} NO"
+            holdings.append((ticker, pos_str, mark_price, val))
+        return holdings
+
+    def result(self) -> BacktestResult:
+        final_cash = self.adapter.get_cash()
+        total_mtm = sum(value for _, _, _, value in self.final_holdings())
+        return BacktestResult(
+            label=self.label,
+            strategy=self.config.strategy,
+            final_equity=final_cash + total_mtm,
+            final_cash=final_cash,
+            trade_count=len(self.adapter.trades),
+            daily_equity=list(self.daily_equity.items()),
+            wall_time=time_module.perf_counter() - self._started_perf,
+            ticks=self.tick_count,
+        )
+
+    def write_outputs(self, out_dir: str | os.PathLike) -> Path:
+        import pandas as pd
+
+        out_path = Path(out_dir)
+        out_path.mkdir(parents=True, exist_ok=True)
+        pd.DataFrame(self.adapter.trades).to_csv(out_path / "unified_trades.csv", index=False)
+        if self.equity_history:
+            pd.DataFrame(self.equity_history).to_csv(out_path / "equity_history.csv", index=False)
+        if self.equity_breakdowns:
+            pd.DataFrame(self.equity_breakdowns).to_csv(out_path / "equity_breakdown.csv", index=False)
+        if self.engine.profiler is not None:
+            self.engine.profiler.write(out_path)
+        return out_path / "unified_trades.csv"
+
+
+def seed_forward_prices(runs: Sequence[BacktestRun], forward_ticks: Iterable[dict]) -> None:
+    """seed_forward_prices for several runs sharing one start_ts, in a single scan."""
+    pending = [run for run in runs if run.missing_price_tickers()]
+    if not pending:
+        return
+    remaining = {id(run): set(run.missing_price_tickers()) for run in pending}
+    for tick in forward_ticks:
+        ticker = tick["ticker"]
+        price = None
+        for run in pending:
+            missing = remaining[id(run)]
+            if ticker not in missing:
+                continue
+            if price is None:
+                price = forward_price(tick["market_state"])
+                if price is None:
+                    break
+            run.adapter.last_prices[ticker] = price
+            missing.discard(ticker)
+        pending = [run for run in pending if remaining[id(run)]]
+        if not pending:
+            break
+
+
+def run_backtests(
+    runs: Sequence[BacktestRun],
+    ticks: Iterable[dict],
+    *,
+    on_error: Callable[[BacktestRun, BaseException], None] | None = None,
+) -> None:
+    """Feed one time-ordered tick stream to every run.
+
+    Runs may have different windows; each ignores ticks outside its own and
+    the loop stops once all of them are past end_ts. With on_error set, a run
+    that raises is reported and dropped instead of aborting the others.
+    """
+    active = list(runs)
+    for tick in ticks:
+        finished = False
+        for run in active:
+            try:
+                if not run.feed(tick):
+                    run.finished = True
+                    finished = True
+            except Exception as exc:
+                if on_error is None:
+                    raise
+                on_error(run, exc)
+                run.finished = True
+                finished = True
+        if finished:
+            active = [run for run in active if not run.finished]
+            if not active:
+                break
@@ -0,0 +1,204 @@
+"""Reader and deterministic replay for GranularLogger's binary book journal.
+
+granular_logger.py appends every orderbook snapshot and delta it receives
+to book_journal_<series>_YYYY-MM-DD.bin. The record layout is defined next to
+BookJournal in granular_logger.py and mirrored here (the logger is deployed
+as a single file, so the constants are duplicated rather than imported).
+Replaying each series' records in file order, with the series merged by
+timestamp, rebuilds the exact full-depth books the logger held at any point
+in time. Past days rotated to .bin.gz are read transparently.
+"""
+
+from __future__ import annotations
+
+import gzip
+import heapq
+import struct
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable, Sequence
+
+from .log_files import is_compressed, list_log_files, log_parts, logical_path
+
+JOURNAL_MAGIC = b"KBJ1"
+JOURNAL_TICKER = 0
+JOURNAL_SNAPSHOT = 1
+JOURNAL_DELTA = 2
+JOURNAL_GAP = 3
+JOURNAL_PATTERN = "book_journal_*.bin"
+_JOURNAL_PREFIX = "book_journal_"
+_LEN = struct.Struct("<I")
+_HEADER = struct.Struct("<BQQdH")
+_LEVEL = struct.Struct("<Bi")
+_DELTA = struct.Struct("<BBi")
+_GAP = struct.Struct("<QQ")
+_SIDES = ("yes", "no")
+
+
+@dataclass
+class JournalRecord:
+    kind: int
+    seq: int
+    exchange_seq: int | None
+    ts: float
+    ticker: str
+    side: str | None = None
+    price: int = 0
+    delta: int = 0
+    yes: list[tuple[int, int]] | None = None
+    no: list[tuple[int, int]] | None = None
+    expected_seq: int | None = None
+
+    @property
+    def time(self) -> datetime:
+        return datetime.fromtimestamp(self.ts)
+
+
+def journal_files(log_dir: str) -> list[Path]:
+    files = []
+    for path in list_log_files(log_dir, JOURNAL_PATTERN):
+        files.extend(log_parts(path))
+    return files
+
+
+def _read_levels(body: bytes, offset: int, count: int) -> tuple[list[tuple[int, int]], int]:
+    levels = []
+    for _ in range(count):
+        levels.append(_LEVEL.unpack_from(body, offset))
+        offset += _LEVEL.size
+    return levels, offset
+
+
+def iter_journal_records(path: str | Path) -> Iterable[JournalRecord]:
+    """Yield snapshot, delta and gap records from one journal file in write order.
+
+    Ticker definition records are consumed internally. A truncated final
+    record (logger killed mid-write) ends the file.
+    """
+    with (gzip.open(path, "rb") if is_compressed(Path(path)) else open(path, "rb")) as f:
+        data = f.read()
+    tickers: dict[int, str] = {}
+    offset = 0
+    end = len(data)
+    while offset + _LEN.size <= end:
+        if data[offset : offset + len(JOURNAL_MAGIC)] == JOURNAL_MAGIC:
+            # Each logger start appends a new segment with fresh ticker ids.
+            tickers = {}
+            offset += len(JOURNAL_MAGIC)
+            continue
+        (length,) = _LEN.unpack_from(data, offset)
+        body_start = offset + _LEN.size
+        if length < _HEADER.size or body_start + length > end:
+            break
+        body = data[body_start : body_start + length]
+        offset = body_start + length
+        kind, seq, exchange_seq, ts, ticker_id = _HEADER.unpack_from(body, 0)
+        payload_at = _HEADER.size
+        if kind == JOURNAL_TICKER:
+            tickers[ticker_id] = body[payload_at:].decode("utf-8")
+            continue
+        ticker = tickers.get(ticker_id)
+        if ticker is None:
+            continue
+        record = JournalRecord(kind, seq, exchange_seq or None, ts, ticker)
+        if kind == JOURNAL_SNAPSHOT:
+            n_yes, n_no = body[payload_at], body[payload_at + 1]
+            record.yes, at = _read_levels(body, payload_at + 2, n_yes)
+            record.no, _ = _read_levels(body, at, n_no)
+        elif kind == JOURNAL_DELTA:
+            side, record.price, record.delta = _DELTA.unpack_from(body, payload_at)
+            record.side = _SIDES[side]
+        elif kind == JOURNAL_GAP:
+            record.expected_seq, _ = _GAP.unpack_from(body, payload_at)
+        else:
+            continue
+        yield record
+
+
+def journal_series(path: str | Path) -> str:
+    """Series a journal file belongs to: book_journal_<series>_YYYY-MM-DD.bin -> <series>."""
+    name = logical_path(Path(path)).name
+    if name.startswith(_JOURNAL_PREFIX) and name.endswith(".bin"):
+        return name[len(_JOURNAL_PREFIX) : -len(".bin")].rpartition("_")[0] or name
+    return name
+
+
+def iter_journal(paths: Sequence[str | Path]) -> Iterable[JournalRecord]:
+    """Records from every file, merged across series by timestamp.
+
+    Each series is its own file per day, written in time order; the paths of
+    one series are read in the order given (journal_files lists them by day,
+    oldest part first) and the series are interleaved by ts, so a reader
+    that stops at a time has seen every series up to it.
+    """
+    by_series: dict[str, list[str | Path]] = {}
+    for path in paths:
+        by_series.setdefault(journal_series(path), []).append(path)
+    streams = [
+        (record for path in series_paths for record in iter_journal_records(path))
+        for series_paths in by_series.values()
+    ]
+    if len(streams) == 1:
+        return streams[0]
+    return heapq.merge(*streams, key=lambda record: record.ts)
+
+
+class BookReplay:
+    """Full-depth books rebuilt by applying journal records in order.
+
+    A GAP record (the logger saw a sequence break) marks the ticker suspect
+    until its next snapshot, which comes from the logger resubscribing it.
+    """
+
+    def __init__(self) -> None:
+        self.books: dict[str, dict[str, dict[int, int]]] = {}
+        self.suspect: set[str] = set()
+        self.gaps: list[tuple[float, str]] = []
+        self.last_ts: float | None = None
+
+    def apply(self, record: JournalRecord) -> None:
+        if record.kind == JOURNAL_GAP:
+            self.suspect.add(record.ticker)
+            self.gaps.append((record.ts, record.ticker))
+        elif record.kind == JOURNAL_SNAPSHOT:
+            self.suspect.discard(record.ticker)
+            self.books[record.ticker] = {
+                "yes": {p: q for p, q in record.yes or () if q > 0},
+                "no": {p: q for p, q in record.no or () if q > 0},
+            }
+        elif record.kind == JOURNAL_DELTA:
+            book = self.books.setdefault(record.ticker, {"yes": {}, "no": {}})
+            side = book[record.side]
+            qty = side.get(record.price, 0) + record.delta
+            if qty > 0:
+                side[record.price] = qty
+            else:
+                side.pop(record.price, None)
+        self.last_ts = record.ts
+
+    def best_bid(self, ticker: str, side: str) -> tuple[int, int] | None:
+        levels = self.books.get(ticker, {}).get(side)
+        if not levels:
+            return None
+        price = max(levels)
+        return price, levels[price]
+
+    def ladder(self, ticker: str, side: str, depth: int | None = None) -> list[tuple[int, int]]:
+        levels = self.books.get(ticker, {}).get(side) or {}
+        return sorted(levels.items(), reverse=True)[:depth]
+
+
+def replay_books(
+    paths: Sequence[str | Path],
+    *,
+    until: datetime | None = None,
+) -> BookReplay:
+    """Rebuild every book as of `until` (inclusive), or the end of the journal."""
+    replay = BookReplay()
+    until_ts = until.timestamp() if until is not None else None
+    for record in iter_journal(paths):
+        if until_ts is not None and record.ts > until_ts:
+            break
+        replay.apply(record)
+    return replay
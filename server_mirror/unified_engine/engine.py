@@ -1,10 +1,11 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import datetime
 from zoneinfo import ZoneInfo
 from typing import Iterable
 import math
+import time
 
 
 @dataclass
@@ -18,6 +19,20 @@ class Order:
     time: datetime | None = None
 
 
+@dataclass
+class _OrderView:
+    """One ticker's open orders as the strategy sees them, built once per orders_version."""
+
+    version: int | None = None
+    active_orders: list[dict] = field(default_factory=list)
+    pending_yes: int = 0
+    pending_no: int = 0
+    open_count: int = 0
+    buy_orders: int = 0
+    sell_orders: int = 0
+    oldest_created: float | None = None
+
+
 class UnifiedEngine:
     LOCAL_TZ = ZoneInfo("America/Los_Angeles")
 
@@ -41,6 +56,7 @@ class UnifiedEngine:
         diag_every: int = 1,
         decision_log=None,
         trade_log=None,
+        profiler=None,
     ):
         self.strategy = strategy
         self.adapter = adapter
@@ -68,6 +84,13 @@ class UnifiedEngine:
         self._stale_seq = 0
         self.metric_interval_s = 30.0
         self._last_metric_ts: dict[str, float] = {}
+        # Per-ticker order views and inventories, reused while the adapter's
+        # orders_version is unchanged. Strategies that set shared_order_view
+        # get these objects directly and must treat them as read-only.
+        self._order_views: dict[str, _OrderView] = {}
+        self._inventories: dict[str, dict[str, dict[str, int]]] = {}
+        # Optional profiling.PhaseProfiler; None keeps on_tick untimed.
+        self.profiler = profiler
 
     def _now_local_naive(self) -> datetime:
         return datetime.now(self.LOCAL_TZ).replace(tzinfo=None)
@@ -79,14 +102,9 @@ class UnifiedEngine:
             return value
         return value.astimezone(self.LOCAL_TZ).replace(tzinfo=None)
 
-    def _parse_time(self, value: str | None) -> datetime | None:
-        if not value:
-            return None
-        try:
-            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
-        except Exception:
-            return None
-        return self._ensure_local_naive(parsed)
+    def _epoch(self, value: datetime) -> float:
+        """Epoch seconds for a local naive tick time, comparable with order created_ts."""
+        return value.replace(tzinfo=self.LOCAL_TZ).timestamp()
 
     def _fee_cents_approx(self, price_cents: float) -> float:
         p = float(price_cents) / 100.0
@@ -245,83 +263,47 @@ class UnifiedEngine:
             }
         )
 
-    def on_tick(
-        self,
-        *,
-        ticker: str,
-        market_state: dict,
-        current_time: datetime,
-        tick_seq: int | None = None,
-        tick_source: str | None = None,
-        tick_row: int | None = None,
-    ) -> None:
-        current_time = self._ensure_local_naive(current_time) or current_time
-        self.adapter.process_tick(ticker, market_state, current_time)
-
-        if self.trade_live_window_s > 0:
-            lag_s = (self._now_local_naive() - current_time).total_seconds()
-            if lag_s > self.trade_live_window_s:
-                self._stale_seq += 1
-                if self.diag_log and (self._stale_seq % self.diag_every == 0):
-                    self.diag_log(
-                        "STALE_TICK",
-                        tick_ts=current_time,
-                        ticker=ticker,
-                        lag_s=round(lag_s, 3),
-                        window_s=self.trade_live_window_s,
-                        source=tick_source,
-                        row=tick_row,
-                    )
-                if not self.allow_warmup_old_ticks:
-                    return
-                try:
-                    self.strategy.on_market_update(
-                        ticker,
-                        market_state,
-                        current_time,
-                        {ticker: {"yes": 0, "no": 0}},
-                        [],
-                        0.0,
-                    )
-                except Exception:
-                    pass
-                return
+    def _has_stale_order(self, view: _OrderView) -> bool:
+        if self.max_order_age_s <= 0 or view.oldest_created is None:
+            return False
+        return time.time() - view.oldest_created > self.max_order_age_s
 
-        open_orders = self.adapter.get_open_orders(ticker, market_state, current_time)
-        active_orders = []
+    def _build_order_view(self, ticker: str, open_orders: list[dict], current_time: datetime) -> _OrderView:
+        """Map the adapter's open orders to strategy actions, cancelling any past max_order_age_s."""
+        view = _OrderView(open_count=len(open_orders))
+        active_orders = view.active_orders
         pending_yes = 0
         pending_no = 0
-        now_wall = self._now_local_naive()
+        now_wall = time.time()
         for o in open_orders:
+            api_action = (o.get("action") or "").lower()
+            if api_action == "buy":
+                view.buy_orders += 1
+            elif api_action == "sell":
+                view.sell_orders += 1
             status = (o.get("status") or "").lower()
             remaining = int(o.get("remaining_count") or 0)
             if remaining <= 0:
                 continue
             if status in ("executed", "cancelled", "canceled", "expired", "rejected"):
                 continue
-            if self.max_order_age_s > 0:
-                created = o.get("created_time")
-                if created:
-                    try:
-                        created_ts = self._parse_time(str(created))
-                        if created_ts is not None:
-                            age_s = (now_wall - created_ts).total_seconds()
-                        else:
-                            age_s = None
-                        if age_s is not None and age_s > self.max_order_age_s:
-                            self.adapter.cancel_order(o.get("order_id"))
-                            self._record_action(ticker, current_time.timestamp())
-                            if self.diag_log:
-                                self.diag_log(
-                                    "STALE_ORDER_CANCEL",
-                                    tick_ts=current_time,
-                                    ticker=ticker,
-                                    order_id=o.get("order_id"),
-                                    age_s=round(age_s, 1),
-                                )
-                            continue
-                    except Exception:
-                        pass
+            created_ts = o.get("created_ts")
+            if self.max_order_age_s > 0 and created_ts is not None:
+                age_s = now_wall - created_ts
+                if age_s > self.max_order_age_s:
+                    self.adapter.cancel_order(o.get("order_id"))
+                    self._record_action(ticker, current_time.timestamp())
+                    if self.diag_log:
+                        self.diag_log(
+                            "STALE_ORDER_CANCEL",
+                            tick_ts=current_time,
+                            ticker=ticker,
+                            order_id=o.get("order_id"),
+                            age_s=round(age_s, 1),
+                        )
+                    continue
+                if view.oldest_created is None or created_ts < view.oldest_created:
+                    view.oldest_created = created_ts
             side = (o.get("side") or "yes").lower()
             action = (o.get("action") or "buy").lower()
             price = o.get("yes_price") if side == "yes" else o.get("no_price")
@@ -370,16 +352,109 @@ class UnifiedEngine:
                     "api_action": action,
                     "api_side": side,
                     "created_time": o.get("created_time"),
+                    "created_ts": created_ts,
                 }
             )
 
+        view.pending_yes = pending_yes
+        view.pending_no = pending_no
+        # Read after the stale cancels above, which the view already leaves out.
+        view.version = self.adapter.orders_version(ticker)
+        return view
+
+    def on_tick(
+        self,
+        *,
+        ticker: str,
+        market_state: dict,
+        current_time: datetime,
+        tick_seq: int | None = None,
+        tick_source: str | None = None,
+        tick_row: int | None = None,
+    ) -> None:
+        profiler = self.profiler
+        if profiler is None:
+            self._on_tick(ticker, market_state, current_time, tick_seq, tick_source, tick_row, None)
+            return
+        started = profiler.now()
+        try:
+            self._on_tick(ticker, market_state, current_time, tick_seq, tick_source, tick_row, profiler)
+        finally:
+            profiler.end_tick(started)
+
+    def _on_tick(
+        self,
+        ticker: str,
+        market_state: dict,
+        current_time: datetime,
+        tick_seq: int | None,
+        tick_source: str | None,
+        tick_row: int | None,
+        prof,
+    ) -> None:
+        if prof is not None:
+            mark = prof.now()
+        current_time = self._ensure_local_naive(current_time) or current_time
+        self.adapter.process_tick(ticker, market_state, current_time)
+        if prof is not None:
+            mark = prof.lap("process_tick", mark)
+
+        if self.trade_live_window_s > 0:
+            lag_s = (self._now_local_naive() - current_time).total_seconds()
+            if lag_s > self.trade_live_window_s:
+                self._stale_seq += 1
+                if self.diag_log and (self._stale_seq % self.diag_every == 0):
+                    self.diag_log(
+                        "STALE_TICK",
+                        tick_ts=current_time,
+                        ticker=ticker,
+                        lag_s=round(lag_s, 3),
+                        window_s=self.trade_live_window_s,
+                        source=tick_source,
+                        row=tick_row,
+                    )
+                if not self.allow_warmup_old_ticks:
+                    return
+                try:
+                    self.strategy.on_market_update(
+                        ticker,
+                        market_state,
+                        current_time,
+                        {ticker: {"yes": 0, "no": 0}},
+                        [],
+                        0.0,
+                    )
+                except Exception:
+                    pass
+                return
+
+        open_orders = self.adapter.get_open_orders(ticker, market_state, current_time)
+        view = self._order_views.get(ticker)
+        version = self.adapter.orders_version(ticker)
+        if view is None or version is None or view.version != version or self._has_stale_order(view):
+            view = self._build_order_view(ticker, open_orders, current_time)
+            self._order_views[ticker] = view
+        pending_yes = view.pending_yes
+        pending_no = view.pending_no
+
         positions = self.adapter.get_positions()
         pos = positions.get(ticker, {"yes": 0, "no": 0})
-        mm_inv = {
-            "yes": int(pos.get("yes") or 0) + pending_yes,
-            "no": int(pos.get("no") or 0) + pending_no,
-        }
-        portfolios_inventories = {ticker: mm_inv}
+        pos_yes = int(pos.get("yes") or 0)
+        pos_no = int(pos.get("no") or 0)
+        if getattr(self.strategy, "shared_order_view", False):
+            active_orders = view.active_orders
+            portfolios_inventories = self._inventories.get(ticker)
+            if portfolios_inventories is None:
+                portfolios_inventories = self._inventories[ticker] = {ticker: {}}
+            mm_inv = portfolios_inventories[ticker]
+            mm_inv["yes"] = pos_yes + pending_yes
+            mm_inv["no"] = pos_no + pending_no
+        else:
+            active_orders = [dict(o) for o in view.active_orders]
+            mm_inv = {"yes": pos_yes + pending_yes, "no": pos_no + pending_no}
+            portfolios_inventories = {ticker: mm_inv}
+        if prof is not None:
+            mark = prof.lap("get_open_orders", mark)
 
         if self.min_requote_interval > 0:
             last_req = self.last_requote_time.get(ticker, 0.0)
@@ -398,6 +473,8 @@ class UnifiedEngine:
             active_orders,
             cash,
         )
+        if prof is not None:
+            mark = prof.lap("strategy", mark)
 
         # Periodic per-ticker metric line to make audit/debugging easy.
         if self.diag_log:
@@ -408,22 +485,20 @@ class UnifiedEngine:
                 times = self._action_times.get(ticker, [])
                 cutoff = now_ts - 60.0
                 actions_last_60s = len([t for t in times if t >= cutoff])
-                buy_orders = sum(1 for o in open_orders if (o.get("action") or "").lower() == "buy")
-                sell_orders = sum(1 for o in open_orders if (o.get("action") or "").lower() == "sell")
                 self.diag_log(
                     "METRIC",
                     tick_ts=current_time,
                     ticker=ticker,
                     cash=round(cash, 2),
-                    pos_yes=int(pos.get("yes") or 0),
-                    pos_no=int(pos.get("no") or 0),
+                    pos_yes=pos_yes,
+                    pos_no=pos_no,
                     pending_yes=pending_yes,
                     pending_no=pending_no,
                     net_inv=int(mm_inv.get("yes") or 0) - int(mm_inv.get("no") or 0),
                     actions_last_60s=actions_last_60s,
-                    open_orders=len(open_orders),
-                    buy_orders=buy_orders,
-                    sell_orders=sell_orders,
+                    open_orders=view.open_count,
+                    buy_orders=view.buy_orders,
+                    sell_orders=view.sell_orders,
                     recent_open_reject=self._recent_open_reject(ticker, now_ts),
                 )
                 self._last_metric_ts[ticker] = now_ts
@@ -439,8 +514,6 @@ class UnifiedEngine:
                     desired=len(desired_orders),
                 )
 
-        pos_yes = int(pos.get("yes") or 0)
-        pos_no = int(pos.get("no") or 0)
         if desired_orders is None:
             self._emit_decision(
                 tick_time=current_time,
@@ -457,7 +530,11 @@ class UnifiedEngine:
                 pending_no=pending_no,
                 market_state=market_state,
             )
+            if prof is not None:
+                prof.lap("logging", mark)
             return
+        if prof is not None:
+            mark = prof.lap("logging", mark)
 
         self.last_requote_time[ticker] = current_time.timestamp()
 
@@ -469,6 +546,8 @@ class UnifiedEngine:
                 desired.append(Order(**payload))
             else:
                 desired.append(o)
+        if prof is not None:
+            mark = prof.lap("reconcile", mark)
         self._emit_decision(
             tick_time=current_time,
             tick_seq=tick_seq,
@@ -484,24 +563,22 @@ class UnifiedEngine:
             pending_no=pending_no,
             market_state=market_state,
         )
+        if prof is not None:
+            mark = prof.lap("logging", mark)
 
         kept_ids = set()
         unsatisfied: list[Order] = []
+        tick_epoch = self._epoch(current_time)
         
         for want in desired:
             matched = False
-            for existing in active_orders:
+            for existing in view.active_orders:
                 if existing["id"] in kept_ids:
                     continue
                 
                 is_close_existing = existing.get("api_action") == "sell"
-                created_at = self._parse_time(existing.get("created_time"))
-                order_age_s = None
-                if created_at:
-                    try:
-                        order_age_s = (current_time - created_at).total_seconds()
-                    except Exception:
-                        order_age_s = None
+                created_at = existing["created_ts"]
+                order_age_s = tick_epoch - created_at if created_at is not None else None
 
                 # Check for Match (Action must match)
                 if existing["action"] == want.action:
@@ -592,17 +669,17 @@ class UnifiedEngine:
         elif net_inv < 0:
             close_action = "BUY_YES"  # close NO via SELL NO
 
-        for existing in active_orders:
+        for existing in view.active_orders:
             if existing["id"] in kept_ids:
                 continue
             if close_action and existing.get("action") == close_action:
                 # Keep the exit order alive while inventory remains.
                 continue
-            created_at = self._parse_time(existing.get("created_time"))
+            created_at = existing["created_ts"]
             if (
                 self.min_quote_lifetime_s > 0
                 and created_at is not None
-                and (current_time - created_at).total_seconds() < self.min_quote_lifetime_s
+                and tick_epoch - created_at < self.min_quote_lifetime_s
             ):
                 continue
             if not self._can_take_action(ticker, current_time.timestamp()):
@@ -641,6 +718,8 @@ class UnifiedEngine:
                 continue
             if not self._can_take_action(ticker, now_ts):
                 continue
+            if prof is not None:
+                mark = prof.lap("reconcile", mark)
             self._emit_trade(
                 tick_time=current_time,
                 tick_seq=tick_seq,
@@ -658,10 +737,14 @@ class UnifiedEngine:
                 market_state=market_state,
                 order_source=getattr(order, "source", None),
             )
+            if prof is not None:
+                mark = prof.lap("logging", mark)
             result = self.adapter.place_order(order, market_state, current_time)
             self._record_action(ticker, now_ts)
             if not is_close and (not result or not getattr(result, "ok", False)):
                 self._last_open_reject[ticker] = now_ts
+        if prof is not None:
+            prof.lap("reconcile", mark)
 
     def run(self, ticks: Iterable[dict]) -> None:
         count = 0
@@ -677,3 +760,16 @@ class UnifiedEngine:
                 tick_source=tick.get("source_file"),
                 tick_row=tick.get("source_row"),
             )
+
+    def on_tick_batch(self, batch) -> None:
+        """Replay a tick_sources.TickBatch; per-tick dicts are only built for the strategy."""
+        source_file = batch.source_file
+        for ts, ticker, market_state, seq, row in batch.rows():
+            self.on_tick(
+                ticker=ticker,
+                market_state=market_state,
+                current_time=ts,
+                tick_seq=seq,
+                tick_source=source_file,
+                tick_row=row,
+            )
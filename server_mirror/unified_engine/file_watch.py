@@ -0,0 +1,118 @@
+"""Wake-on-write directory watching for follow-mode tailers.
+
+On Linux DirectoryWatcher uses inotify through ctypes, so a tailer wakes as
+soon as a log file in the directory is appended to or created. Anywhere
+inotify is unavailable, wait() falls back to sleeping poll_s like the old
+polling loops.
+"""
+
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+_EVENT = struct.Struct("iIII")
+_libc = None
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        if not sys.platform.startswith("linux"):
+            _libc = False
+        else:
+            try:
+                libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+                libc.inotify_init1.argtypes = [ctypes.c_int]
+                libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+                _libc = libc
+            except (OSError, AttributeError):
+                _libc = False
+    return _libc or None
+
+
+class DirectoryWatcher:
+    def __init__(self, directory: str | os.PathLike, *, poll_s: float = 0.5, use_inotify: bool = True) -> None:
+        self.directory = Path(directory)
+        self.poll_s = float(poll_s)
+        self._fd: int | None = None
+        if use_inotify:
+            self._open()
+
+    @property
+    def event_driven(self) -> bool:
+        return self._fd is not None
+
+    def _open(self) -> None:
+        libc = _load_libc()
+        if libc is None or not self.directory.is_dir():
+            return
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return
+        if libc.inotify_add_watch(fd, os.fsencode(self.directory), WATCH_MASK) < 0:
+            os.close(fd)
+            return
+        self._fd = fd
+
+    def wait(self, timeout: float | None = None) -> set[str] | None:
+        """Block until files in the directory change.
+
+        Returns the changed file names, or None when the caller should rescan
+        everything (polling fallback, timeout or inotify queue overflow).
+        """
+        if self._fd is None:
+            time.sleep(self.poll_s if timeout is None else min(self.poll_s, timeout))
+            return None
+        try:
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+        except InterruptedError:
+            return None
+        if not ready:
+            return None
+        names: set[str] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 65536)
+            except BlockingIOError:
+                break
+            if not data:
+                break
+            offset = 0
+            while offset + _EVENT.size <= len(data):
+                _, mask, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset : offset + length].split(b"\0", 1)[0]
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    return None
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def __enter__(self) -> "DirectoryWatcher":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,73 @@
+"""Transparent access to market logs that the logger has rotated into gzip.
+
+Once a market date has settled, GranularLogger rewrites its CSVs as
+<name>.csv.gz: a multi-member gzip with the header in the first member and
+one member per block of rows after it, so readers can seek straight to any
+member. A straggler row written after rotation lands in a fresh plain
+<name>.csv until the next rotation appends it to the .gz.
+
+Readers keep addressing a log by its logical .csv path (so source_file
+names, tick store entries and caches do not change when a file is rotated)
+and see the .gz followed by any plain remainder as one file.
+"""
+
+from __future__ import annotations
+
+import gzip
+import io
+from pathlib import Path
+from typing import Iterable, TextIO
+
+COMPRESSED_SUFFIX = ".gz"
+
+
+def compressed_path(path: Path) -> Path:
+    return path.with_name(path.name + COMPRESSED_SUFFIX)
+
+
+def is_compressed(path: Path) -> bool:
+    return path.name.endswith(COMPRESSED_SUFFIX)
+
+
+def logical_path(path: Path) -> Path:
+    if is_compressed(path):
+        return path.with_name(path.name[: -len(COMPRESSED_SUFFIX)])
+    return path
+
+
+def list_log_files(log_dir: str | Path, file_pattern: str) -> list[Path]:
+    """Logical paths of every log matching file_pattern, plain or rotated, sorted by name."""
+    log_path = Path(log_dir)
+    names = {p.name for p in log_path.glob(file_pattern)}
+    names.update(logical_path(p).name for p in log_path.glob(file_pattern + COMPRESSED_SUFFIX))
+    return [log_path / name for name in sorted(names)]
+
+
+def log_parts(path: Path) -> list[Path]:
+    """Existing on-disk parts of a logical log, oldest rows first."""
+    return [part for part in (compressed_path(path), path) if part.exists()]
+
+
+def log_mtime(path: Path) -> float | None:
+    mtimes = []
+    for part in log_parts(path):
+        try:
+            mtimes.append(part.stat().st_mtime)
+        except OSError:
+            continue
+    return max(mtimes) if mtimes else None
+
+
+def open_part(part: Path) -> TextIO:
+    if is_compressed(part):
+        return io.TextIOWrapper(gzip.open(part, "rb"), encoding="utf-8", newline="")
+    return part.open("r", newline="")
+
+
+def iter_log_lines(path: Path) -> Iterable[str]:
+    """Lines of a logical log across its parts; only the first part's header is kept."""
+    for part_idx, part in enumerate(log_parts(path)):
+        with open_part(part) as handle:
+            if part_idx > 0:
+                handle.readline()
+            yield from handle
@@ -0,0 +1,249 @@
+"""Sparse time -> byte-offset index sidecars for market_data_*.csv files.
+
+`<file>.csv.idx` is a small JSON document with one entry every
+INDEX_EVERY_ROWS rows. It is extended incrementally as the CSV grows, so
+range-bounded backtests can seek straight to the warmup start instead of
+parsing the file from the top.
+
+Rotated `<file>.csv.gz` logs get a `<file>.csv.gz.idx` built in one pass,
+with an entry at every gzip member boundary; offsets there are compressed
+byte offsets where a fresh gzip reader can start.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import zlib
+from bisect import bisect_left
+from datetime import datetime
+from pathlib import Path
+
+from .log_files import is_compressed
+
+INDEX_SUFFIX = ".idx"
+INDEX_VERSION = 1
+INDEX_EVERY_ROWS = 1000
+
+
+def index_path_for(path: Path) -> Path:
+    return path.with_name(path.name + INDEX_SUFFIX)
+
+
+def _parse_line_time(line: bytes) -> datetime | None:
+    raw = line.split(b",", 1)[0].strip()
+    if not raw:
+        return None
+    try:
+        return datetime.fromisoformat(raw.decode("utf-8", errors="ignore"))
+    except ValueError:
+        return None
+
+
+def _from_iso(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+def _to_iso(value: datetime | None) -> str | None:
+    return value.isoformat() if value else None
+
+
+def _empty_index(header: bytes) -> dict:
+    return {
+        "version": INDEX_VERSION,
+        "every": INDEX_EVERY_ROWS,
+        "header": header.decode("utf-8", errors="ignore"),
+        "data_offset": len(header),
+        "indexed_bytes": len(header),
+        "indexed_rows": 0,
+        "min_ts": None,
+        "last_ts": None,
+        "max_ts": None,
+        "monotonic": True,
+        # [max_ts_before_row, byte_offset, row_idx]
+        "entries": [],
+    }
+
+
+def _load_index(path: Path) -> dict | None:
+    try:
+        with open(index_path_for(path), "r", encoding="utf-8") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if index.get("version") != INDEX_VERSION or index.get("every") != INDEX_EVERY_ROWS:
+        return None
+    return index
+
+
+def _save_index(path: Path, index: dict) -> None:
+    final_path = index_path_for(path)
+    temp_path = final_path.with_name(final_path.name + ".tmp")
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index, f)
+        os.replace(temp_path, final_path)
+    except OSError:
+        # Read-only log dirs still get an in-memory index for this run.
+        pass
+
+
+def _update_gzip_index(path: Path) -> dict | None:
+    """Index a rotated log once; rotated files only change by whole appended members."""
+    try:
+        size = path.stat().st_size
+        index = _load_index(path)
+        if index is not None and index.get("compressed") and int(index.get("indexed_bytes") or 0) == size:
+            return index
+        header = None
+        entries = []
+        row_idx = 0
+        min_ts = max_ts = last_ts = None
+        monotonic = True
+        tail = b""
+        decomp = zlib.decompressobj(31)
+        member_start = 0
+        consumed = 0
+        with path.open("rb") as handle:
+            while True:
+                data = handle.read(1 << 20)
+                if not data:
+                    break
+                while data:
+                    out = decomp.decompress(data)
+                    lines = (tail + out).split(b"\n")
+                    tail = lines.pop()
+                    for line in lines:
+                        if header is None:
+                            header = line + b"\n"
+                            continue
+                        if not line.strip(b"\r"):
+                            continue
+                        ts = _parse_line_time(line)
+                        if ts is not None:
+                            if last_ts is not None and ts < last_ts:
+                                monotonic = False
+                            last_ts = ts
+                            if min_ts is None or ts < min_ts:
+                                min_ts = ts
+                            if max_ts is None or ts > max_ts:
+                                max_ts = ts
+                        row_idx += 1
+                    if not decomp.eof:
+                        consumed += len(data)
+                        break
+                    used = len(data) - len(decomp.unused_data)
+                    member_start = consumed + used
+                    consumed = member_start
+                    data = decomp.unused_data
+                    decomp = zlib.decompressobj(31)
+                    if header is not None and not tail and member_start < size:
+                        # Next member starts on a row boundary: a reader can resume here.
+                        entries.append([_to_iso(max_ts), member_start, row_idx])
+        if header is None:
+            return None
+    except (OSError, zlib.error):
+        return None
+
+    index = _empty_index(header)
+    index.update(
+        {
+            "compressed": True,
+            "data_offset": 0,
+            "indexed_bytes": size,
+            "indexed_rows": row_idx,
+            "min_ts": _to_iso(min_ts),
+            "last_ts": _to_iso(last_ts),
+            "max_ts": _to_iso(max_ts),
+            "monotonic": monotonic,
+            "entries": entries,
+        }
+    )
+    _save_index(path, index)
+    return index
+
+
+def update_index(path: Path) -> dict | None:
+    """Load the sidecar for `path`, extend it over any appended rows and save it."""
+    if is_compressed(path):
+        return _update_gzip_index(path)
+    try:
+        size = path.stat().st_size
+        with path.open("rb") as handle:
+            header = handle.readline()
+            if not header.endswith(b"\n"):
+                return None
+            index = _load_index(path)
+            if (
+                index is None
+                or index.get("header") != header.decode("utf-8", errors="ignore")
+                or int(index.get("indexed_bytes") or 0) > size
+            ):
+                index = _empty_index(header)
+            offset = int(index["indexed_bytes"])
+            if offset >= size:
+                return index
+
+            handle.seek(offset)
+            row_idx = int(index["indexed_rows"])
+            min_ts = _from_iso(index["min_ts"])
+            max_ts = _from_iso(index["max_ts"])
+            last_ts = _from_iso(index["last_ts"])
+            monotonic = bool(index["monotonic"])
+            entries = index["entries"]
+            while True:
+                line = handle.readline()
+                if not line.endswith(b"\n"):
+                    # Partial trailing row: index it once the writer finishes it.
+                    break
+                if not line.strip(b"\r\n"):
+                    # csv.DictReader skips blank lines without counting them.
+                    offset += len(line)
+                    continue
+                if row_idx % INDEX_EVERY_ROWS == 0:
+                    entries.append([_to_iso(max_ts), offset, row_idx])
+                ts = _parse_line_time(line)
+                if ts is not None:
+                    if last_ts is not None and ts < last_ts:
+                        monotonic = False
+                    last_ts = ts
+                    if min_ts is None or ts < min_ts:
+                        min_ts = ts
+                    if max_ts is None or ts > max_ts:
+                        max_ts = ts
+                offset += len(line)
+                row_idx += 1
+    except OSError:
+        return None
+
+    index.update(
+        {
+            "indexed_bytes": offset,
+            "indexed_rows": row_idx,
+            "min_ts": _to_iso(min_ts),
+            "last_ts": _to_iso(last_ts),
+            "max_ts": _to_iso(max_ts),
+            "monotonic": monotonic,
+        }
+    )
+    _save_index(path, index)
+    return index
+
+
+def seek_point(index: dict, start_ts: datetime | None) -> tuple[int, int]:
+    """Return (byte_offset, row_idx) of the last indexed row with every earlier row < start_ts."""
+    entries = index.get("entries") or []
+    data_offset = int(index.get("data_offset") or 0)
+    if start_ts is None or not entries:
+        return data_offset, 0
+    # Entry i records the max timestamp of all rows before it, so every row
+    # ahead of an entry whose max is < start_ts can be skipped safely.
+    keys = [datetime.fromisoformat(e[0]) if e[0] else datetime.min for e in entries]
+    pos = bisect_left(keys, start_ts) - 1
+    if pos < 0:
+        return data_offset, 0
+    return int(entries[pos][1]), int(entries[pos][2])
+
+
+def index_time_bounds(index: dict) -> tuple[datetime | None, datetime | None]:
+    return _from_iso(index.get("min_ts")), _from_iso(index.get("max_ts"))
@@ -0,0 +1,146 @@
+"""Opt-in per-phase timing for UnifiedEngine.on_tick.
+
+With UnifiedEngine(profiler=PhaseProfiler(...)) every tick's wall time is
+split into the phases the engine marks (adapter.process_tick, open orders and
+inventory, the strategy call, decision/trade logging, reconcile) and the
+whole tick. Each phase feeds a log-bucketed histogram (8 buckets per power of
+two, so percentiles are within 12.5%), which keeps recording to a few integer
+updates and its memory constant however long the run. write() dumps p50 /
+p99 / max per phase plus ticks/sec to engine_profile.json.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from time import perf_counter_ns
+
+PROFILE_FILE = "engine_profile.json"
+PHASES = ("process_tick", "get_open_orders", "strategy", "logging", "reconcile")
+_SUB_BITS = 3
+_SUB = 1 << _SUB_BITS
+
+
+def _bucket(ns: int) -> int:
+    if ns < 2 * _SUB:
+        return max(ns, 0)
+    shift = ns.bit_length() - _SUB_BITS - 1
+    return (shift << _SUB_BITS) + (ns >> shift)
+
+
+def _bucket_floor(bucket: int) -> int:
+    if bucket < 2 * _SUB:
+        return bucket
+    shift = (bucket >> _SUB_BITS) - 1
+    return (_SUB + (bucket & (_SUB - 1))) << shift
+
+
+class PhaseHistogram:
+    def __init__(self) -> None:
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns: int) -> None:
+        bucket = _bucket(ns)
+        self.counts[bucket] = self.counts.get(bucket, 0) + 1
+        self.count += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile_ns(self, q: float) -> int:
+        """Upper edge of the bucket holding the q-quantile, capped at the max seen."""
+        if not self.count:
+            return 0
+        rank = max(1, int(q * self.count + 0.5))
+        seen = 0
+        for bucket in sorted(self.counts):
+            seen += self.counts[bucket]
+            if seen >= rank:
+                return min(_bucket_floor(bucket + 1) - 1, self.max_ns)
+        return self.max_ns
+
+    def summary(self, engine_ns: int) -> dict:
+        return {
+            "count": self.count,
+            "total_s": round(self.total_ns / 1e9, 6),
+            "share": round(self.total_ns / engine_ns, 4) if engine_ns else 0.0,
+            "mean_us": round(self.total_ns / self.count / 1e3, 3) if self.count else 0.0,
+            "p50_us": round(self.percentile_ns(0.50) / 1e3, 3),
+            "p99_us": round(self.percentile_ns(0.99) / 1e3, 3),
+            "max_us": round(self.max_ns / 1e3, 3),
+            # [bucket lower edge in us, ticks]; the bucket spans up to the next edge.
+            "histogram": [
+                [round(_bucket_floor(bucket) / 1e3, 3), self.counts[bucket]] for bucket in sorted(self.counts)
+            ],
+        }
+
+
+class PhaseProfiler:
+    """Collects UnifiedEngine phase timings; see the module docstring.
+
+    A phase may be lapped several times in one tick (logging is split around
+    reconcile); the tick's total for the phase is one histogram sample.
+    With write_every_s > 0 the profile is rewritten that often from end_tick,
+    for long-running live / follow sessions.
+    """
+
+    def __init__(self, out_dir: str | os.PathLike | None = None, *, write_every_s: float = 0.0) -> None:
+        self.path = Path(out_dir) / PROFILE_FILE if out_dir is not None else None
+        self.write_every_ns = int(float(write_every_s) * 1e9)
+        self.tick = PhaseHistogram()
+        self.phases = {phase: PhaseHistogram() for phase in PHASES}
+        self._pending: dict[str, int] = {}
+        self._first_ns: int | None = None
+        self._last_ns = 0
+        self._last_write_ns = perf_counter_ns()
+
+    now = staticmethod(perf_counter_ns)
+
+    def lap(self, phase: str, since: int) -> int:
+        now = perf_counter_ns()
+        self._pending[phase] = self._pending.get(phase, 0) + (now - since)
+        return now
+
+    def end_tick(self, started: int) -> None:
+        now = perf_counter_ns()
+        if self._first_ns is None:
+            self._first_ns = started
+        self._last_ns = now
+        self.tick.record(now - started)
+        if self._pending:
+            for phase, ns in self._pending.items():
+                self.phases[phase].record(ns)
+            self._pending.clear()
+        if self.write_every_ns and self.path is not None and now - self._last_write_ns >= self.write_every_ns:
+            self.write()
+
+    def summary(self) -> dict:
+        wall_s = (self._last_ns - self._first_ns) / 1e9 if self._first_ns is not None else 0.0
+        engine_ns = self.tick.total_ns
+        return {
+            "ticks": self.tick.count,
+            "wall_s": round(wall_s, 6),
+            "ticks_per_s": round(self.tick.count / wall_s, 1) if wall_s > 0 else 0.0,
+            "engine_s": round(engine_ns / 1e9, 6),
+            "engine_ticks_per_s": round(self.tick.count / (engine_ns / 1e9), 1) if engine_ns else 0.0,
+            "phases": {
+                "tick": self.tick.summary(engine_ns),
+                **{phase: hist.summary(engine_ns) for phase, hist in self.phases.items()},
+            },
+        }
+
+    def write(self, out_dir: str | os.PathLike | None = None) -> Path | None:
+        path = Path(out_dir) / PROFILE_FILE if out_dir is not None else self.path
+        if path is None:
+            return None
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp, path)
+        self._last_write_ns = perf_counter_ns()
+        return path
@@ -14,7 +14,14 @@ import pandas as pd
 
 from unified_engine.adapters import SimAdapter, create_headers, API_URL
 from unified_engine.engine import UnifiedEngine
-from unified_engine.tick_sources import iter_ticks_from_live_log, iter_ticks_from_market_logs
+from unified_engine.profiling import PROFILE_FILE, PhaseProfiler
+from unified_engine.tick_sources import (
+    iter_tick_batches_from_live_log,
+    iter_ticks_from_live_log,
+    iter_ticks_from_market_logs,
+)
+from unified_engine.tick_store import iter_ticks_from_tick_store
+from unified_engine.tick_bus import TICK_BUS_SOCKET, iter_ticks_from_tick_bus
 
 
 def _load_strategy(spec: str, **kwargs):
@@ -215,6 +222,11 @@ def main() -> int:
     parser.add_argument("--strategy", default="backtesting.strategies.v3_variants:recommended_live_strategy")
     parser.add_argument("--log-dir", default=os.path.join("vm_logs", "market_logs"))
     parser.add_argument("--tick-log", default="", help="Optional live tick CSV (live_ticks_*.csv)")
+    parser.add_argument(
+        "--tick-bus",
+        default="",
+        help="Subscribe to the logger's tick bus socket instead of tailing CSVs ('auto' = <log-dir>/tick_bus.sock)",
+    )
     parser.add_argument("--use-ingest", action="store_true", help="Use ingest_timestamp from live tick logs")
     parser.add_argument("--follow", action="store_true", help="Follow live tick log for new rows")
     parser.add_argument("--snapshot", default="", help="Optional snapshot JSON for starting state")
@@ -245,6 +257,10 @@ def main() -> int:
     parser.add_argument("--fill-latency-seed", type=int, default=0, help="Seed for latency sampling")
     parser.add_argument("--strategy-kwargs", default="{}", help="JSON dict of kwargs for strategy factory")
     parser.add_argument("--file-pattern", default="market_data_*.csv", help="Glob pattern for market logs")
+    parser.add_argument("--stream-ticks", action="store_true", help="Heap-merge market logs instead of load-all-then-sort (non-follow)")
+    parser.add_argument("--tick-store", default="", help="Columnar tick store dir for non-follow replay ('auto' = <log-dir>/tick_store)")
+    parser.add_argument("--profile", action="store_true", help="Time each engine phase per tick and write out_dir/engine_profile.json")
+    parser.add_argument("--profile-every-s", type=float, default=60.0, help="Rewrite the profile this often in live/follow/tick-bus mode (0 = only at exit)")
     args = parser.parse_args()
 
     diag_log = _build_diag_logger(args.diag_log)
@@ -329,7 +345,31 @@ def main() -> int:
     if args.snapshot:
         _seed_from_snapshot(adapter, strategy, args.snapshot)
 
-    if args.tick_log:
+    start_ts = None
+    if args.start_ts:
+        start_raw = args.start_ts.replace("T", " ").replace("_", " ")
+        try:
+            start_ts = datetime.strptime(start_raw, "%Y-%m-%d %H:%M:%S.%f")
+        except ValueError:
+            start_ts = datetime.strptime(start_raw, "%Y-%m-%d %H:%M:%S")
+
+    end_ts = None
+    if args.end_ts:
+        end_raw = args.end_ts.replace("T", " ").replace("_", " ")
+        try:
+            end_ts = datetime.strptime(end_raw, "%Y-%m-%d %H:%M:%S.%f")
+        except ValueError:
+            end_ts = datetime.strptime(end_raw, "%Y-%m-%d %H:%M:%S")
+
+    tick_batches = None
+    if args.tick_bus:
+        tick_bus_path = os.path.join(args.log_dir, TICK_BUS_SOCKET) if args.tick_bus == "auto" else args.tick_bus
+        print(f"DEBUG: Subscribing to tick bus: {tick_bus_path}")
+        ticks = iter_ticks_from_tick_bus(tick_bus_path, diag_log=diag_log, heartbeat_s=args.diag_heartbeat_s)
+    elif args.tick_log and not args.follow:
+        tick_batches = iter_tick_batches_from_live_log(args.tick_log, use_ingest=args.use_ingest)
+        ticks = []
+    elif args.tick_log:
         ticks = iter_ticks_from_live_log(
             args.tick_log,
             use_ingest=args.use_ingest,
@@ -337,6 +377,15 @@ def main() -> int:
             diag_log=diag_log,
             heartbeat_s=args.diag_heartbeat_s,
         )
+    elif args.tick_store and not args.follow:
+        print(f"DEBUG: Using tick store: {args.tick_store} (CSV fallback from {args.log_dir})")
+        ticks = iter_ticks_from_tick_store(
+            args.log_dir,
+            store_dir=None if args.tick_store == "auto" else args.tick_store,
+            file_pattern=args.file_pattern,
+            start_ts=start_ts,
+            end_ts=end_ts,
+        )
     else:
         print(f"DEBUG: iter_ticks_from_market_logs imported from: {iter_ticks_from_market_logs.__module__}")
         print(f"DEBUG: Using log_dir: {args.log_dir}")
@@ -349,24 +398,11 @@ def main() -> int:
             skip_file=args.skip_file or None,
             skip_rows=max(0, int(args.skip_rows)),
             file_pattern=args.file_pattern,
+            stream=args.stream_ticks,
+            start_ts=None if args.follow else start_ts,
+            end_ts=None if args.follow else end_ts,
         )
 
-    start_ts = None
-    if args.start_ts:
-        start_raw = args.start_ts.replace("T", " ").replace("_", " ")
-        try:
-            start_ts = datetime.strptime(start_raw, "%Y-%m-%d %H:%M:%S.%f")
-        except ValueError:
-            start_ts = datetime.strptime(start_raw, "%Y-%m-%d %H:%M:%S")
-
-    end_ts = None
-    if args.end_ts:
-        end_raw = args.end_ts.replace("T", " ").replace("_", " ")
-        try:
-            end_ts = datetime.strptime(end_raw, "%Y-%m-%d %H:%M:%S.%f")
-        except ValueError:
-            end_ts = datetime.strptime(end_raw, "%Y-%m-%d %H:%M:%S")
-
     filtered_ticks = _filter_ticks(ticks, start_ts, end_ts)
 
     engine = UnifiedEngine(
@@ -382,6 +418,10 @@ def main() -> int:
         diag_every=args.diag_every,
         decision_log=decision_log,
         trade_log=trade_log,
+        profiler=PhaseProfiler(
+            args.out_dir,
+            write_every_s=args.profile_every_s if (args.live or args.follow or args.tick_bus) else 0.0,
+        ) if args.profile else None,
     )
 
     out_dir = Path(args.out_dir)
@@ -564,6 +604,23 @@ def main() -> int:
     status_every_ticks = max(1, int(args.status_every_ticks))
     # Run loop with periodic updates
     count = 0
+    if tick_batches is not None:
+        # Columnar replay: hand the engine whole slices, cut at status boundaries.
+        for batch in tick_batches:
+            batch = batch.between(start_ts, end_ts)
+            lo = 0
+            while lo < len(batch):
+                hi = min(len(batch), lo + status_every_ticks - (count % status_every_ticks))
+                piece = batch.slice(lo, hi)
+                if diag_log:
+                    first = args.diag_every - (count % args.diag_every) - 1
+                    for i in range(first, len(piece), args.diag_every):
+                        diag_log("TICK_IN", tick_ts=piece.times[i].item(), ticker=piece.tickers[piece.ticker_codes[i]])
+                engine.on_tick_batch(piece)
+                count += len(piece)
+                if count % status_every_ticks == 0:
+                    _write_status()
+                lo = hi
     for tick in filtered_ticks:
         if "KXHIGHNY-26JAN09-B49.5" in tick['ticker'] and "05:05:26" in str(tick['time']):
             print(f"DEBUG: LOOP TICK: {tick['time']}")
@@ -593,6 +650,9 @@ def main() -> int:
     print("Wrote:", out_dir / "unified_trades.csv")
     print("Wrote:", out_dir / "unified_orders.csv")
     print("Wrote:", out_dir / "unified_positions.json")
+    if engine.profiler is not None:
+        engine.profiler.write()
+        print("Wrote:", out_dir / PROFILE_FILE)
     return 0
 
 
@@ -0,0 +1,206 @@
+"""In-process parameter sweeps over the unified backtest.
+
+Variants run in a ProcessPoolExecutor. Each worker imports the strategy
+code and loads the snapshot once, then replays every variant it is handed
+straight from the shared memory-mapped tick cache, so a sweep pays neither
+per-variant interpreter start-up nor log parsing. A worker can also take a
+batch of variants and drive all of their engines from one pass over the
+ticks, so each tick is decoded once per batch rather than once per variant.
+"""
+
+from __future__ import annotations
+
+import copy
+import json
+import os
+import time as time_module
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Sequence
+
+from .backtest import BacktestConfig, BacktestRun, run_backtests, seed_forward_prices
+from .tick_cache import default_cache_dir, ensure_tick_cache, iter_ticks_from_tick_cache
+
+
+@dataclass
+class SweepResult:
+    label: str
+    strategy: str
+    status: str
+    final_equity: float = 0.0
+    trade_count: int = 0
+    daily_equity: list[tuple[str, float]] = field(default_factory=list)
+    wall_time: float = 0.0
+    out_dir: str | None = None
+    error: str | None = None
+
+
+def variant_dir_name(label: str) -> str:
+    return label.replace(" ", "_").replace("(", "").replace(")", "")
+
+
+_worker_state: dict = {}
+
+
+def _init_worker(snapshot_path: str | None, tick_cache: str) -> None:
+    positions = {}
+    if snapshot_path:
+        with open(snapshot_path, "r", encoding="utf-8") as f:
+            positions = json.load(f).get("positions", {})
+    _worker_state["positions"] = positions
+    _worker_state["tick_cache"] = tick_cache
+
+
+def _failed(config: BacktestConfig, out_dir: str | None, wall_time: float, error: str) -> SweepResult:
+    return SweepResult(
+        label=config.label or config.strategy,
+        strategy=config.strategy,
+        status="FAIL",
+        wall_time=wall_time,
+        out_dir=out_dir,
+        error=error,
+    )
+
+
+def run_variants(
+    configs: Sequence[BacktestConfig],
+    initial_positions: dict,
+    tick_cache: str,
+    out_dirs: Sequence[str | None] | None = None,
+) -> list[SweepResult]:
+    """Replay several variants side by side in a single pass over the tick cache.
+
+    wall_time is the duration of the shared pass, not a per-variant cost.
+    """
+    started = time_module.perf_counter()
+    out_dirs = list(out_dirs) if out_dirs is not None else [None] * len(configs)
+    results: list[SweepResult | None] = [None] * len(configs)
+    runs: list[BacktestRun] = []
+    run_slots: dict[int, int] = {}
+    for idx, (config, out_dir) in enumerate(zip(configs, out_dirs)):
+        try:
+            run = BacktestRun(
+                config,
+                copy.deepcopy(initial_positions),
+                record_history=out_dir is not None,
+                quiet=True,
+            )
+        except Exception:
+            results[idx] = _failed(config, out_dir, 0.0, traceback.format_exc())
+            continue
+        run_slots[id(run)] = idx
+        runs.append(run)
+
+    def _on_error(run: BacktestRun, exc: BaseException) -> None:
+        idx = run_slots[id(run)]
+        error = "".join(traceback.format_exception(type(exc), exc, exc.__traceback__))
+        results[idx] = _failed(run.config, out_dirs[idx], time_module.perf_counter() - started, error)
+
+    if runs:
+        starts = sorted({run.config.start_ts for run in runs})
+        for start_ts in starts:
+            group = [run for run in runs if run.config.start_ts == start_ts]
+            seed_forward_prices(group, iter_ticks_from_tick_cache(tick_cache, start_ts=start_ts))
+        first_ts = min(run.config.warmup_start_ts for run in runs)
+        last_ts = max(run.config.end_ts for run in runs)
+        run_backtests(
+            runs,
+            iter_ticks_from_tick_cache(tick_cache, start_ts=first_ts, end_ts=last_ts),
+            on_error=_on_error,
+        )
+
+    wall_time = time_module.perf_counter() - started
+    for run in runs:
+        idx = run_slots[id(run)]
+        if results[idx] is not None:
+            continue
+        try:
+            if out_dirs[idx] is not None:
+                run.write_outputs(out_dirs[idx])
+            result = run.result()
+        except Exception:
+            results[idx] = _failed(run.config, out_dirs[idx], wall_time, traceback.format_exc())
+            continue
+        results[idx] = SweepResult(
+            label=result.label,
+            strategy=result.strategy,
+            status="SUCCESS",
+            final_equity=result.final_equity,
+            trade_count=result.trade_count,
+            daily_equity=result.daily_equity,
+            wall_time=wall_time,
+            out_dir=out_dirs[idx],
+        )
+    return results
+
+
+def run_variant(
+    config: BacktestConfig,
+    initial_positions: dict,
+    tick_cache: str,
+    out_dir: str | None = None,
+) -> SweepResult:
+    return run_variants([config], initial_positions, tick_cache, [out_dir])[0]
+
+
+def _run_in_worker(configs: list[BacktestConfig], out_dirs: list[str | None]) -> list[SweepResult]:
+    return run_variants(configs, _worker_state["positions"], _worker_state["tick_cache"], out_dirs)
+
+
+def run_sweep(
+    configs: Sequence[BacktestConfig],
+    *,
+    snapshot_path: str | None = None,
+    log_dir: str | None = None,
+    tick_cache: str | None = None,
+    out_root: str | None = None,
+    workers: int | None = None,
+    engines_per_worker: int = 1,
+    on_result: Callable[[SweepResult], None] | None = None,
+) -> list[SweepResult]:
+    """Run every config across a process pool; results come back in input order.
+
+    The tick cache is (re)built from log_dir first when it is missing or stale.
+    engines_per_worker > 1 hands each task a batch of variants that share one
+    pass over the ticks. With out_root set, each variant also writes the usual
+    CSVs to out_root/<label>.
+    """
+    if tick_cache is None:
+        if log_dir is None:
+            raise ValueError("run_sweep needs a tick_cache or a log_dir to build one from")
+        tick_cache = str(default_cache_dir(log_dir))
+    if log_dir is not None:
+        ensure_tick_cache(log_dir, tick_cache)
+
+    out_dirs: list[str | None] = []
+    for config in configs:
+        out_dir = None
+        if out_root is not None:
+            out_dir = str(Path(out_root) / variant_dir_name(config.label or config.strategy))
+        out_dirs.append(out_dir)
+
+    batch_size = max(1, engines_per_worker)
+    batches = [list(range(i, min(i + batch_size, len(configs)))) for i in range(0, len(configs), batch_size)]
+    results: list[SweepResult | None] = [None] * len(configs)
+    workers = workers or min(len(batches), os.cpu_count() or 1) or 1
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(snapshot_path, str(tick_cache)),
+    ) as executor:
+        futures = {}
+        for batch in batches:
+            future = executor.submit(
+                _run_in_worker,
+                [configs[idx] for idx in batch],
+                [out_dirs[idx] for idx in batch],
+            )
+            futures[future] = batch
+        for future in as_completed(futures):
+            for idx, result in zip(futures[future], future.result()):
+                results[idx] = result
+                if on_result is not None:
+                    on_result(result)
+    return results
@@ -0,0 +1,85 @@
+"""Subscriber for the GranularLogger tick bus.
+
+granular_logger.py publishes every top-of-book row it logs as one JSON line
+on a Unix domain socket (KALSHI_TICK_BUS, default <log dir>/tick_bus.sock)
+before the CSV write. Subscribing here hands the engine the same ticks a
+follow-mode CSV tail would produce, without the disk and re-parse latency.
+"""
+
+from __future__ import annotations
+
+import json
+import socket
+import time
+from datetime import datetime
+from typing import Iterable
+
+from .tick_sources import _normalize_market_row, _row_to_tick
+
+TICK_BUS_SOCKET = "tick_bus.sock"
+
+
+def iter_ticks_from_tick_bus(
+    path: str,
+    *,
+    reconnect_s: float = 1.0,
+    diag_log=None,
+    heartbeat_s: float = 30.0,
+) -> Iterable[dict]:
+    """Yield ticks from the logger's bus forever, reconnecting whenever it restarts."""
+    seq = 0
+    last_tick_ts: datetime | None = None
+    last_heartbeat = time.time()
+
+    def _heartbeat() -> None:
+        nonlocal last_heartbeat
+        now = time.time()
+        if diag_log and (now - last_heartbeat) >= heartbeat_s:
+            diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="tick_bus")
+            last_heartbeat = now
+
+    while True:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path)
+        except OSError:
+            sock.close()
+            _heartbeat()
+            time.sleep(reconnect_s)
+            continue
+        if diag_log:
+            diag_log("TICK_BUS_CONNECTED", path=path)
+        sock.settimeout(heartbeat_s)
+        buffer = b""
+        with sock:
+            while True:
+                try:
+                    chunk = sock.recv(65536)
+                except socket.timeout:
+                    _heartbeat()
+                    continue
+                except OSError:
+                    break
+                if not chunk:
+                    break
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    if not line:
+                        continue
+                    try:
+                        message = json.loads(line)
+                    except ValueError:
+                        continue
+                    tick = _row_to_tick(_normalize_market_row(message), "timestamp")
+                    if not tick:
+                        continue
+                    seq += 1
+                    tick["seq"] = seq
+                    tick["source_file"] = TICK_BUS_SOCKET
+                    tick["source_row"] = message.get("seq")
+                    last_tick_ts = tick["time"]
+                    yield tick
+        if diag_log:
+            diag_log("TICK_BUS_DISCONNECTED", path=path)
+        time.sleep(reconnect_s)
@@ -0,0 +1,150 @@
+"""Shared, memory-mapped tick history for grid sweeps.
+
+A sweep parses the market history once into a single time-sorted set of
+.npy columns (same layout as a tick_store entry plus "source_order").
+Every backtest worker then np.load()s the columns with mmap_mode="r", so
+all processes share the OS page cache instead of re-parsing the CSVs.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from .log_files import list_log_files, log_mtime
+from .tick_store import (
+    PRICE_COLUMNS,
+    _epoch_ns,
+    _store_sources,
+    default_store_dir,
+    iter_ticks_from_columns,
+    load_market_columns,
+)
+
+CACHE_DIRNAME = "tick_cache"
+CACHE_COLUMNS = ("time_ns", "ticker", "source_order", "source_row") + PRICE_COLUMNS
+
+
+def default_cache_dir(log_dir: str) -> Path:
+    return Path(log_dir) / CACHE_DIRNAME
+
+
+def build_tick_cache(
+    log_dir: str,
+    cache_dir: str,
+    *,
+    store_dir: str | None = None,
+    file_pattern: str = "market_data_*.csv",
+) -> Path:
+    columns, tickers, source_files = load_market_columns(
+        log_dir, store_dir=store_dir, file_pattern=file_pattern
+    )
+    cache_path = Path(cache_dir)
+    cache_path.mkdir(parents=True, exist_ok=True)
+    for name in CACHE_COLUMNS:
+        values = columns.get(name)
+        if values is None:
+            values = np.empty(0, dtype=np.int64 if name == "time_ns" else np.int32)
+        np.save(cache_path / f"{name}.npy", np.ascontiguousarray(values))
+    time_ns = columns.get("time_ns")
+    meta = {
+        "log_dir": str(log_dir),
+        "file_pattern": file_pattern,
+        "rows": int(len(time_ns)) if time_ns is not None else 0,
+        "tickers": tickers,
+        "source_files": source_files,
+        "built_at": datetime.now().isoformat(),
+    }
+    temp_path = cache_path / "meta.json.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temp_path, cache_path / "meta.json")
+    return cache_path
+
+
+def is_tick_cache_fresh(
+    log_dir: str,
+    cache_dir: str,
+    file_pattern: str = "market_data_*.csv",
+    *,
+    store_dir: str | None = None,
+) -> bool:
+    """True when the cache covers the same CSVs and tick store entries, none newer than it.
+
+    load_market_columns also reads store entries whose CSV is gone (pruned
+    after conversion), so the expected sources are the union of both.
+    """
+    meta_path = Path(cache_dir) / "meta.json"
+    if not meta_path.exists():
+        return False
+    built = meta_path.stat().st_mtime
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    files = list_log_files(log_dir, file_pattern)
+    store_entries = _store_sources(Path(store_dir) if store_dir else default_store_dir(log_dir), file_pattern)
+    if sorted({p.name for p in files} | set(store_entries)) != sorted(meta.get("source_files") or []):
+        return False
+    if not all((log_mtime(p) or 0.0) <= built for p in files):
+        return False
+    return all((entry / "meta.json").stat().st_mtime <= built for entry in store_entries.values())
+
+
+def ensure_tick_cache(
+    log_dir: str,
+    cache_dir: str,
+    *,
+    store_dir: str | None = None,
+    file_pattern: str = "market_data_*.csv",
+    rebuild: bool = False,
+) -> bool:
+    """Build the cache unless an up-to-date one exists; returns True if it was (re)built."""
+    if not rebuild and is_tick_cache_fresh(log_dir, cache_dir, file_pattern, store_dir=store_dir):
+        return False
+    build_tick_cache(log_dir, cache_dir, store_dir=store_dir, file_pattern=file_pattern)
+    return True
+
+
+def attach_tick_cache(cache_dir: str) -> tuple[dict[str, np.ndarray], list[str], list[str]]:
+    cache_path = Path(cache_dir)
+    with open(cache_path / "meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    columns = {name: np.load(cache_path / f"{name}.npy", mmap_mode="r") for name in CACHE_COLUMNS}
+    return columns, list(meta.get("tickers") or []), list(meta.get("source_files") or [])
+
+
+def tick_cache_time_bounds(cache_dir: str) -> tuple[datetime | None, datetime | None]:
+    columns, _, _ = attach_tick_cache(cache_dir)
+    time_ns = columns["time_ns"]
+    if len(time_ns) == 0:
+        return None, None
+    bounds = time_ns[[0, -1]].view("datetime64[ns]").astype("datetime64[us]").tolist()
+    return bounds[0], bounds[1]
+
+
+def iter_ticks_from_tick_cache(
+    cache_dir: str,
+    *,
+    start_ts: datetime | None = None,
+    end_ts: datetime | None = None,
+) -> Iterable[dict]:
+    columns, tickers, source_files = attach_tick_cache(cache_dir)
+    time_ns = columns["time_ns"]
+    lo = 0
+    hi = len(time_ns)
+    if start_ts is not None:
+        lo = int(np.searchsorted(time_ns, _epoch_ns(start_ts), side="left"))
+    if end_ts is not None:
+        hi = int(np.searchsorted(time_ns, _epoch_ns(end_ts), side="right"))
+    if hi <= lo:
+        return []
+    # Slicing a memmap is a view, so workers never copy the shared history.
+    window = {name: values[lo:hi] for name, values in columns.items()}
+    yield from iter_ticks_from_columns(window, tickers, source_files)
@@ -1,14 +1,27 @@
 from __future__ import annotations
 
 import csv
+import gzip
+import heapq
+import io
 import os
 import time
-from datetime import datetime
+from contextlib import ExitStack
+from dataclasses import dataclass
+from fnmatch import fnmatch
+from datetime import datetime, timezone
 from pathlib import Path
 from typing import Iterable
 
+import numpy as np
 import pandas as pd
 
+from .file_watch import DirectoryWatcher
+from .log_files import compressed_path, iter_log_lines, list_log_files, log_parts
+from .log_index import index_time_bounds, seek_point, update_index
+
+# Follow mode re-checks every file at least this often even without events.
+FOLLOW_RESCAN_S = 5.0
 
 
 def _build_market_state(row: dict) -> dict:
@@ -42,11 +55,19 @@ def _parse_time(value: str | None) -> datetime | None:
 def _peek_file_time_bounds(path: Path) -> tuple[datetime | None, datetime | None]:
     earliest = None
     latest = None
+    gz_path = compressed_path(path)
+    if gz_path.exists():
+        index = update_index(gz_path)
+        if index is not None:
+            earliest, latest = index_time_bounds(index)
+        if not path.exists():
+            return earliest, latest
+    rotated_earliest = earliest
     try:
         with path.open("r", newline="") as handle:
             reader = csv.DictReader(handle)
             for row in reader:
-                earliest = _parse_time(row.get("timestamp"))
+                earliest = rotated_earliest or _parse_time(row.get("timestamp"))
                 break
     except OSError:
         pass
@@ -61,9 +82,9 @@ def _peek_file_time_bounds(path: Path) -> tuple[datetime | None, datetime | None
         for line in reversed(tail):
             if not line.strip():
                 continue
-            ts_raw = line.split(",", 1)[0]
-            latest = _parse_time(ts_raw)
-            if latest:
+            ts = _parse_time(line.split(",", 1)[0])
+            if ts:
+                latest = ts
                 break
     except OSError:
         pass
@@ -71,6 +92,20 @@ def _peek_file_time_bounds(path: Path) -> tuple[datetime | None, datetime | None
     return earliest, latest
 
 
+def market_logs_time_bounds(
+    log_dir: str, file_pattern: str = "market_data_*.csv"
+) -> tuple[datetime | None, datetime | None]:
+    earliest = None
+    latest = None
+    for path in list_log_files(log_dir, file_pattern):
+        first_ts, last_ts = _peek_file_time_bounds(path)
+        if first_ts and (earliest is None or first_ts < earliest):
+            earliest = first_ts
+        if last_ts and (latest is None or last_ts > latest):
+            latest = last_ts
+    return earliest, latest
+
+
 def _row_to_tick(row: dict, ts_col: str) -> dict | None:
     ts = _parse_time(row.get(ts_col))
     if ts is None:
@@ -93,6 +128,119 @@ def _row_to_tick(row: dict, ts_col: str) -> dict | None:
     }
 
 
+def _normalize_market_row(row: dict) -> dict:
+    """Map a market_data_*.csv row (as written by GranularLogger) onto _row_to_tick fields."""
+    return {
+        "timestamp": row.get("timestamp"),
+        "ticker": row.get("market_ticker"),
+        "yes_ask": row.get("implied_yes_ask"),
+        "no_ask": row.get("implied_no_ask"),
+        "yes_bid": row.get("best_yes_bid"),
+        "no_bid": row.get("best_no_bid"),
+    }
+
+
+def _iter_market_file_rows(
+    path: Path,
+    file_idx: int,
+    *,
+    skip_file: str | None = None,
+    skip_rows: int = 0,
+    start_ts: datetime | None = None,
+    end_ts: datetime | None = None,
+) -> Iterable[dict]:
+    try:
+        with ExitStack() as stack:
+            parts = log_parts(path)
+            first_row = 0
+            stop_after_end = False
+            bounded = start_ts is not None or end_ts is not None
+            if parts == [path]:
+                handle = stack.enter_context(path.open("r", newline=""))
+                reader = csv.DictReader(handle)
+                if not reader.fieldnames:
+                    return
+                if bounded:
+                    index = update_index(path)
+                    if index is not None:
+                        offset, first_row = seek_point(index, start_ts)
+                        handle.seek(offset)
+                        stop_after_end = bool(index.get("monotonic"))
+            elif len(parts) == 1:
+                # Rotated log: restart decompression at the member nearest start_ts.
+                raw = stack.enter_context(parts[0].open("rb"))
+                handle = io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding="utf-8", newline="")
+                reader = csv.DictReader(handle)
+                if not reader.fieldnames:
+                    return
+                if bounded:
+                    index = update_index(parts[0])
+                    if index is not None:
+                        offset, first_row = seek_point(index, start_ts)
+                        if offset > 0:
+                            raw.seek(offset)
+                            handle = io.TextIOWrapper(gzip.GzipFile(fileobj=raw), encoding="utf-8", newline="")
+                            reader = csv.DictReader(handle, fieldnames=reader.fieldnames)
+                        stop_after_end = bool(index.get("monotonic"))
+            elif parts:
+                # Rotated log plus rows written after rotation: read both in order.
+                reader = csv.DictReader(iter_log_lines(path))
+                if not reader.fieldnames:
+                    return
+            else:
+                return
+            for row_idx, row in enumerate(reader, start=first_row):
+                if skip_rows > 0 and skip_file and skip_file in path.name:
+                    if row_idx < skip_rows:
+                        continue
+                ts = _parse_time(row.get("timestamp"))
+                if ts is None:
+                    continue
+                if start_ts is not None and ts < start_ts:
+                    continue
+                if end_ts is not None and ts > end_ts:
+                    if stop_after_end:
+                        return
+                    continue
+                yield {
+                    "time": ts,
+                    "ticker": row.get("market_ticker"),
+                    "yes_ask": _parse_float(row.get("implied_yes_ask")),
+                    "no_ask": _parse_float(row.get("implied_no_ask")),
+                    "yes_bid": _parse_float(row.get("best_yes_bid")),
+                    "no_bid": _parse_float(row.get("best_no_bid")),
+                    "last_price": _parse_float(row.get("last_trade_price")),
+                    "source_file": path.name,
+                    "source_order": file_idx,
+                    "source_row": row_idx,
+                }
+    except (OSError, EOFError):
+        return
+
+
+def _market_row_sort_key(row: dict) -> tuple:
+    return (row["time"], row["source_order"], row["source_row"])
+
+
+def _market_row_to_tick(row: dict, seq: int) -> dict:
+    return {
+        "time": row["time"],
+        "ticker": row["ticker"],
+        "market_state": _build_market_state(
+            {
+                "yes_ask": row["yes_ask"],
+                "no_ask": row["no_ask"],
+                "yes_bid": row["yes_bid"],
+                "no_bid": row["no_bid"],
+                "last_price": row["last_price"],
+            }
+        ),
+        "seq": seq,
+        "source_file": row["source_file"],
+        "source_row": row["source_row"],
+    }
+
+
 def iter_ticks_from_market_logs(
     log_dir: str,
     *,
@@ -104,61 +252,38 @@ def iter_ticks_from_market_logs(
     skip_file: str | None = None,
     skip_rows: int = 0,
     file_pattern: str = "market_data_*.csv",
+    stream: bool = False,
+    start_ts: datetime | None = None,
+    end_ts: datetime | None = None,
 ) -> Iterable[dict]:
     log_path = Path(log_dir)
     if not follow:
-        files = sorted(log_path.glob(file_pattern))
-        rows = []
-        for file_idx, path in enumerate(files):
-            try:
-                with path.open("r", newline="") as handle:
-                    reader = csv.DictReader(handle)
-                    if not reader.fieldnames:
-                        continue
-                    for row_idx, row in enumerate(reader):
-                        if skip_rows > 0 and skip_file and skip_file in path.name:
-                            if row_idx < skip_rows:
-                                continue
-                        ts = _parse_time(row.get("timestamp"))
-                        if ts is None:
-                            continue
-                        rows.append(
-                            {
-                                "time": ts,
-                                "ticker": row.get("market_ticker"),
-                                "yes_ask": _parse_float(row.get("implied_yes_ask")),
-                                "no_ask": _parse_float(row.get("implied_no_ask")),
-                                "yes_bid": _parse_float(row.get("best_yes_bid")),
-                                "no_bid": _parse_float(row.get("best_no_bid")),
-                                "last_price": _parse_float(row.get("last_trade_price")),
-                                "source_file": path.name,
-                                "source_order": file_idx,
-                                "source_row": row_idx,
-                            }
-                        )
-            except OSError:
-                continue
-        if not rows:
-            return []
-        rows.sort(key=lambda r: (r["time"], r["source_order"], r["source_row"]))
+        # start_ts/end_ts bound the replay; the .idx sidecars let each file
+        # seek close to start_ts instead of parsing from the first row.
+        files = list_log_files(log_path, file_pattern)
+        cursors = [
+            _iter_market_file_rows(
+                path,
+                file_idx,
+                skip_file=skip_file,
+                skip_rows=skip_rows,
+                start_ts=start_ts,
+                end_ts=end_ts,
+            )
+            for file_idx, path in enumerate(files)
+        ]
+        if stream:
+            # Bounded memory: each per-date file is already time-ordered, so a
+            # heap merge over one cursor per file yields the same order as the
+            # full sort below without holding the history in memory.
+            rows = heapq.merge(*cursors, key=_market_row_sort_key)
+        else:
+            rows = [row for cursor in cursors for row in cursor]
+            if not rows:
+                return []
+            rows.sort(key=_market_row_sort_key)
         for seq, row in enumerate(rows, start=1):
-            tick = {
-                "time": row["time"],
-                "ticker": row["ticker"],
-                "market_state": _build_market_state(
-                    {
-                        "yes_ask": row["yes_ask"],
-                        "no_ask": row["no_ask"],
-                        "yes_bid": row["yes_bid"],
-                        "no_bid": row["no_bid"],
-                        "last_price": row["last_price"],
-                    }
-                ),
-                "seq": seq,
-                "source_file": row["source_file"],
-                "source_row": row["source_row"],
-            }
-            yield tick
+            yield _market_row_to_tick(row, seq)
         return []
 
     file_offsets: dict[Path, int] = {}
@@ -239,26 +364,45 @@ def iter_ticks_from_market_logs(
             backfill_state[path] = {"first_ts": None, "last_ts": None, "rows": 0, "done": False}
 
     initial_files = set(log_path.glob(file_pattern))
+    # Handles stay open between wakes; the watcher wakes us on append/create
+    # (inotify) and only falls back to sleeping poll_s where that is missing.
+    file_handles: dict[Path, object] = {}
+    watcher = DirectoryWatcher(log_path, poll_s=poll_s)
+    changed: set[str] | None = None
 
-    while True:
-        files = sorted(log_path.glob(file_pattern))
-        for path in files:
-            if path not in file_offsets:
-                _init_file(path, start_at_end=(path in initial_files))
-                continue
-            with path.open("r", newline="") as handle:
-                handle.seek(file_offsets[path])
-                reader = csv.DictReader(handle, fieldnames=file_headers[path])
-                for row in reader:
-                    normalized = {
-                        "timestamp": row.get("timestamp"),
-                        "ticker": row.get("market_ticker"),
-                        "yes_ask": row.get("implied_yes_ask"),
-                        "no_ask": row.get("implied_no_ask"),
-                        "yes_bid": row.get("best_yes_bid"),
-                        "no_bid": row.get("best_no_bid"),
-                    }
-                    tick = _row_to_tick(normalized, "timestamp")
+    try:
+        while True:
+            if changed is None or any(
+                fnmatch(name, file_pattern) and (log_path / name) not in file_offsets for name in changed
+            ):
+                for path in sorted(log_path.glob(file_pattern)):
+                    if path not in file_offsets:
+                        _init_file(path, start_at_end=(path in initial_files))
+            for path in sorted(file_offsets):
+                pending = backfill_state.get(path)
+                if changed is not None and path.name not in changed and not (pending and not pending["done"]):
+                    continue
+                handle = file_handles.get(path)
+                if handle is None:
+                    try:
+                        handle = path.open("r", newline="")
+                    except OSError:
+                        continue
+                    handle.seek(file_offsets[path])
+                    file_handles[path] = handle
+                while True:
+                    position = handle.tell()
+                    line = handle.readline()
+                    if not line:
+                        break
+                    if not line.endswith("\n"):
+                        # Partial row still being written; re-read it on the next wake.
+                        handle.seek(position)
+                        break
+                    row = next(csv.DictReader([line], fieldnames=file_headers[path]), None)
+                    if row is None:
+                        continue
+                    tick = _row_to_tick(_normalize_market_row(row), "timestamp")
                     if tick:
                         seq += 1
                         tick["seq"] = seq
@@ -274,30 +418,160 @@ def iter_ticks_from_market_logs(
                         yield tick
                     file_rows[path] = file_rows.get(path, 0) + 1
                 file_offsets[path] = handle.tell()
-            state = backfill_state.get(path)
-            if state and not state.get("done"):
-                state["done"] = True
-                if ingest_log:
-                    ingest_log(
-                        {
-                            "event": "BACKFILL_COMPLETE",
-                            "wall_time": datetime.now().isoformat(),
-                            "file": path.name,
-                            "mode": "backfill",
-                            "backfill_first_ts": state.get("first_ts").isoformat()
-                            if state.get("first_ts")
-                            else "",
-                            "backfill_last_ts": state.get("last_ts").isoformat()
-                            if state.get("last_ts")
-                            else "",
-                            "backfill_rows": state.get("rows") or 0,
-                        }
-                    )
-        now = time.time()
-        if diag_log and (now - last_heartbeat) >= heartbeat_s:
-            diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="market_logs")
-            last_heartbeat = now
-        time.sleep(poll_s)
+                state = backfill_state.get(path)
+                if state and not state.get("done"):
+                    state["done"] = True
+                    if ingest_log:
+                        ingest_log(
+                            {
+                                "event": "BACKFILL_COMPLETE",
+                                "wall_time": datetime.now().isoformat(),
+                                "file": path.name,
+                                "mode": "backfill",
+                                "backfill_first_ts": state.get("first_ts").isoformat()
+                                if state.get("first_ts")
+                                else "",
+                                "backfill_last_ts": state.get("last_ts").isoformat()
+                                if state.get("last_ts")
+                                else "",
+                                "backfill_rows": state.get("rows") or 0,
+                            }
+                        )
+            now = time.time()
+            if diag_log and (now - last_heartbeat) >= heartbeat_s:
+                diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="market_logs")
+                last_heartbeat = now
+            changed = watcher.wait(timeout=min(heartbeat_s, FOLLOW_RESCAN_S))
+    finally:
+        watcher.close()
+        for handle in file_handles.values():
+            handle.close()
+
+
+LIVE_QUOTE_COLUMNS = ("yes_ask", "no_ask", "yes_bid", "no_bid")
+_BATCH_ROWS = 65536
+
+
+@dataclass
+class TickBatch:
+    """A time-sorted run of ticks from one file, kept as NumPy columns.
+
+    times are naive datetime64[us] (UTC wall clock when utc is set), quotes are
+    float64 with NaN for missing, and ticker_codes index into tickers.
+    """
+
+    times: np.ndarray
+    ticker_codes: np.ndarray
+    quotes: dict[str, np.ndarray]
+    source_rows: np.ndarray
+    tickers: list
+    source_file: str
+    seq_start: int = 1
+    utc: bool = False
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    def slice(self, start: int, stop: int) -> "TickBatch":
+        return TickBatch(
+            times=self.times[start:stop],
+            ticker_codes=self.ticker_codes[start:stop],
+            quotes={name: values[start:stop] for name, values in self.quotes.items()},
+            source_rows=self.source_rows[start:stop],
+            tickers=self.tickers,
+            source_file=self.source_file,
+            seq_start=self.seq_start + start,
+            utc=self.utc,
+        )
+
+    def between(self, start_ts: datetime | None, end_ts: datetime | None) -> "TickBatch":
+        lo = 0
+        hi = len(self.times)
+        if start_ts is not None:
+            lo = int(np.searchsorted(self.times, np.datetime64(start_ts.replace(tzinfo=None), "us"), side="left"))
+        if end_ts is not None:
+            hi = int(np.searchsorted(self.times, np.datetime64(end_ts.replace(tzinfo=None), "us"), side="right"))
+        return self.slice(lo, max(lo, hi))
+
+    def rows(self) -> Iterable[tuple]:
+        """Yield (time, ticker, market_state, seq, source_row), building only the market_state dict."""
+        times = self.times.tolist()
+        if self.utc:
+            times = [ts.replace(tzinfo=timezone.utc) for ts in times]
+        codes = self.ticker_codes.tolist()
+        rows = self.source_rows.tolist()
+        ya, na, yb, nb = (
+            [None if v != v else v for v in self.quotes[name].tolist()] for name in LIVE_QUOTE_COLUMNS
+        )
+        tickers = self.tickers
+        seq = self.seq_start
+        for i in range(len(times)):
+            yield (
+                times[i],
+                tickers[codes[i]],
+                {"yes_ask": ya[i], "no_ask": na[i], "yes_bid": yb[i], "no_bid": nb[i], "last_price": None},
+                seq + i,
+                rows[i],
+            )
+
+    def iter_ticks(self) -> Iterable[dict]:
+        for ts, ticker, market_state, seq, row in self.rows():
+            yield {
+                "time": ts,
+                "ticker": ticker,
+                "market_state": market_state,
+                "seq": seq,
+                "source_file": self.source_file,
+                "source_row": row,
+            }
+
+
+def iter_tick_batches_from_live_log(
+    path: str,
+    *,
+    use_ingest: bool = False,
+    batch_rows: int = _BATCH_ROWS,
+) -> Iterable[TickBatch]:
+    """Vectorised replay of a live tick CSV as time-sorted TickBatch chunks."""
+    df = pd.read_csv(path)
+    if df.empty:
+        return
+    if "tick_timestamp" in df.columns:
+        ts_col = "ingest_timestamp" if use_ingest else "tick_timestamp"
+    else:
+        ts_col = "timestamp"
+    parsed = pd.to_datetime(df[ts_col])
+    utc = parsed.dt.tz is not None
+    if utc:
+        parsed = parsed.dt.tz_convert("UTC").dt.tz_localize(None)
+    times = parsed.to_numpy(dtype="datetime64[us]")
+    valid = np.flatnonzero(~np.isnat(times))
+    # Stable sort keeps file order for equal timestamps.
+    order = valid[np.argsort(times[valid], kind="stable")]
+
+    codes, uniques = pd.factorize(df["ticker"])
+    tickers = list(uniques)
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(tickers), codes)
+        tickers.append(None)
+    quotes = {}
+    for name in LIVE_QUOTE_COLUMNS:
+        if name in df.columns:
+            quotes[name] = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64)[order]
+        else:
+            quotes[name] = np.full(len(order), np.nan)
+
+    batch = TickBatch(
+        times=times[order],
+        ticker_codes=codes.astype(np.int32)[order],
+        quotes=quotes,
+        source_rows=order.astype(np.int64),
+        tickers=tickers,
+        source_file=os.path.basename(path),
+        utc=utc,
+    )
+    for start in range(0, len(batch), batch_rows):
+        yield batch.slice(start, start + batch_rows)
 
 
 def iter_ticks_from_live_log(
@@ -315,83 +589,59 @@ def iter_ticks_from_live_log(
         last_heartbeat = time.time()
         seq = 0
         row_idx = 0
-        while not log_path.exists():
-            if diag_log and (time.time() - last_heartbeat) >= heartbeat_s:
-                diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="live_log")
-                last_heartbeat = time.time()
-            time.sleep(poll_s)
+        with DirectoryWatcher(log_path.parent, poll_s=poll_s) as watcher:
+            while not log_path.exists():
+                if diag_log and (time.time() - last_heartbeat) >= heartbeat_s:
+                    diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="live_log")
+                    last_heartbeat = time.time()
+                watcher.wait(timeout=min(heartbeat_s, FOLLOW_RESCAN_S))
 
-        with log_path.open("r", newline="") as handle:
-            reader = csv.DictReader(handle)
-            fieldnames = reader.fieldnames or []
-            if not fieldnames:
-                return []
-            if "tick_timestamp" in fieldnames:
-                ts_col = "ingest_timestamp" if use_ingest else "tick_timestamp"
-            else:
-                ts_col = "timestamp"
+            with log_path.open("r", newline="") as handle:
+                reader = csv.DictReader(handle)
+                fieldnames = reader.fieldnames or []
+                if not fieldnames:
+                    return []
+                if "tick_timestamp" in fieldnames:
+                    ts_col = "ingest_timestamp" if use_ingest else "tick_timestamp"
+                else:
+                    ts_col = "timestamp"
 
-            for row in reader:
-                tick = _row_to_tick(row, ts_col)
-                if tick:
-                    seq += 1
-                    tick["seq"] = seq
-                    tick["source_file"] = log_path.name
-                    tick["source_row"] = row_idx
-                    last_tick_ts = tick["time"]
-                    yield tick
-                row_idx += 1
-
-            while True:
-                position = handle.tell()
-                line = handle.readline()
-                if not line:
-                    now = time.time()
-                    if diag_log and (now - last_heartbeat) >= heartbeat_s:
-                        diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="live_log")
-                        last_heartbeat = now
-                    time.sleep(poll_s)
-                    handle.seek(position)
-                    continue
-                row = next(csv.DictReader([line], fieldnames=fieldnames))
-                if row.get(ts_col) in (None, "", ts_col):
-                    continue
-                tick = _row_to_tick(row, ts_col)
-                if tick:
-                    seq += 1
-                    tick["seq"] = seq
-                    tick["source_file"] = log_path.name
-                    tick["source_row"] = row_idx
-                    last_tick_ts = tick["time"]
-                    yield tick
-                row_idx += 1
-        return []
+                for row in reader:
+                    tick = _row_to_tick(row, ts_col)
+                    if tick:
+                        seq += 1
+                        tick["seq"] = seq
+                        tick["source_file"] = log_path.name
+                        tick["source_row"] = row_idx
+                        last_tick_ts = tick["time"]
+                        yield tick
+                    row_idx += 1
 
-    df = pd.read_csv(path)
-    if df.empty:
+                while True:
+                    position = handle.tell()
+                    line = handle.readline()
+                    if not line or not line.endswith("\n"):
+                        # Nothing new, or a row still being written: wait for the next append.
+                        now = time.time()
+                        if diag_log and (now - last_heartbeat) >= heartbeat_s:
+                            diag_log("FOLLOW_WAIT", tick_ts=last_tick_ts, source="live_log")
+                            last_heartbeat = now
+                        handle.seek(position)
+                        watcher.wait(timeout=min(heartbeat_s, FOLLOW_RESCAN_S))
+                        continue
+                    row = next(csv.DictReader([line], fieldnames=fieldnames), None)
+                    if row is None or row.get(ts_col) in (None, "", ts_col):
+                        continue
+                    tick = _row_to_tick(row, ts_col)
+                    if tick:
+                        seq += 1
+                        tick["seq"] = seq
+                        tick["source_file"] = log_path.name
+                        tick["source_row"] = row_idx
+                        last_tick_ts = tick["time"]
+                        yield tick
+                    row_idx += 1
         return []
-    if "tick_timestamp" in df.columns:
-        ts_col = "ingest_timestamp" if use_ingest else "tick_timestamp"
-    else:
-        ts_col = "timestamp"
-    df["_source_row"] = range(len(df))
-    df = df.rename(columns={ts_col: "time"})
-    df["time"] = pd.to_datetime(df["time"])
-    df = df.sort_values("time")
-    for seq, row in enumerate(df.itertuples(index=False), start=1):
-        tick = {
-            "time": row.time,
-            "ticker": row.ticker,
-            "market_state": _build_market_state(
-                {
-                    "yes_ask": row.yes_ask,
-                    "no_ask": row.no_ask,
-                    "yes_bid": row.yes_bid,
-                    "no_bid": row.no_bid,
-                }
-            ),
-            "seq": seq,
-            "source_file": os.path.basename(path),
-            "source_row": row._source_row,
-        }
-        yield tick
+
+    for batch in iter_tick_batches_from_live_log(path, use_ingest=use_ingest):
+        yield from batch.iter_ticks()
@@ -0,0 +1,316 @@
+"""Columnar tick store for market_data_*.csv replay.
+
+Each market-date CSV is converted once into a directory of typed NumPy
+columns so backtests skip csv/fromisoformat/float parsing on every run:
+
+    <store_dir>/<csv stem>/
+        time_ns.npy      int64  naive wall-clock epoch nanoseconds
+        ticker.npy       int16  code into meta.json "tickers"
+        yes_ask.npy ...  int16  cents, -1 = missing
+        source_row.npy   int32  row index in the source CSV
+        meta.json        written last; its mtime marks the conversion time
+
+Readers fall back to the CSV for any file newer than its converted copy.
+Rotated <name>.csv.gz logs are read through log_files under their .csv
+name, so rotating a file does not invalidate its store entry.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import os
+from datetime import datetime
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+from .log_files import iter_log_lines, list_log_files, log_mtime
+from .tick_sources import _build_market_state, _parse_float, _parse_time
+
+
+STORE_DIRNAME = "tick_store"
+STORE_VERSION = 1
+MISSING_PRICE = -1
+PRICE_COLUMNS = ("yes_ask", "no_ask", "yes_bid", "no_bid", "last_price")
+# Tick field -> market_data_*.csv column.
+CSV_COLUMNS = {
+    "yes_ask": "implied_yes_ask",
+    "no_ask": "implied_no_ask",
+    "yes_bid": "best_yes_bid",
+    "no_bid": "best_no_bid",
+    "last_price": "last_trade_price",
+}
+_EPOCH = datetime(1970, 1, 1)
+_CHUNK_ROWS = 65536
+
+
+def default_store_dir(log_dir: str) -> Path:
+    return Path(log_dir) / STORE_DIRNAME
+
+
+def _epoch_ns(ts: datetime) -> int:
+    if ts.tzinfo is not None:
+        ts = ts.replace(tzinfo=None)
+    delta = ts - _EPOCH
+    return ((delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds) * 1000
+
+
+def _price_cents(value: str | None) -> int:
+    parsed = _parse_float(value)
+    if parsed is None or parsed != parsed:
+        return MISSING_PRICE
+    return int(round(parsed))
+
+
+def read_csv_columns(path: Path) -> tuple[dict[str, np.ndarray], list[str]]:
+    """Parse one market_data CSV into store columns (same rows as the CSV tick source)."""
+    times: list[int] = []
+    codes: list[int] = []
+    rows: list[int] = []
+    prices: dict[str, list[int]] = {name: [] for name in PRICE_COLUMNS}
+    tickers: list[str] = []
+    ticker_codes: dict[str, int] = {}
+    reader = csv.DictReader(iter_log_lines(path))
+    if reader.fieldnames:
+        for row_idx, row in enumerate(reader):
+            ts = _parse_time(row.get("timestamp"))
+            if ts is None:
+                continue
+            ticker = row.get("market_ticker") or ""
+            code = ticker_codes.get(ticker)
+            if code is None:
+                code = len(tickers)
+                ticker_codes[ticker] = code
+                tickers.append(ticker)
+            times.append(_epoch_ns(ts))
+            codes.append(code)
+            rows.append(row_idx)
+            for name in PRICE_COLUMNS:
+                prices[name].append(_price_cents(row.get(CSV_COLUMNS[name])))
+    columns = {
+        "time_ns": np.asarray(times, dtype=np.int64),
+        "ticker": np.asarray(codes, dtype=np.int16),
+        "source_row": np.asarray(rows, dtype=np.int32),
+    }
+    for name in PRICE_COLUMNS:
+        columns[name] = np.asarray(prices[name], dtype=np.int16)
+    return columns, tickers
+
+
+def _entry_dir(store_dir: Path, csv_name: str) -> Path:
+    return store_dir / Path(csv_name).stem
+
+
+def _is_fresh(entry: Path, csv_path: Path | None) -> bool:
+    meta_path = entry / "meta.json"
+    if not meta_path.exists():
+        return False
+    mtime = log_mtime(csv_path) if csv_path is not None else None
+    if mtime is None:
+        return True
+    return mtime <= meta_path.stat().st_mtime
+
+
+def convert_market_log(csv_path: Path, store_dir: Path) -> Path:
+    columns, tickers = read_csv_columns(csv_path)
+    entry = _entry_dir(store_dir, csv_path.name)
+    entry.mkdir(parents=True, exist_ok=True)
+    for name, values in columns.items():
+        np.save(entry / f"{name}.npy", values)
+    meta = {
+        "version": STORE_VERSION,
+        "source": csv_path.name,
+        "rows": int(len(columns["time_ns"])),
+        "tickers": tickers,
+    }
+    # Write meta last so a half-written entry is never considered fresh.
+    temp_path = entry / "meta.json.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(temp_path, entry / "meta.json")
+    return entry
+
+
+def convert_market_logs(
+    log_dir: str,
+    *,
+    store_dir: str | None = None,
+    file_pattern: str = "market_data_*.csv",
+    force: bool = False,
+) -> list[str]:
+    """Convert every CSV that has no up-to-date store entry; returns converted names."""
+    store_path = Path(store_dir) if store_dir else default_store_dir(log_dir)
+    converted = []
+    for path in list_log_files(log_dir, file_pattern):
+        if not force and _is_fresh(_entry_dir(store_path, path.name), path):
+            continue
+        convert_market_log(path, store_path)
+        converted.append(path.name)
+    return converted
+
+
+def load_store_entry(entry: Path) -> tuple[dict[str, np.ndarray], list[str], str]:
+    with open(entry / "meta.json", "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    columns = {}
+    for name in ("time_ns", "ticker", "source_row") + PRICE_COLUMNS:
+        columns[name] = np.load(entry / f"{name}.npy", mmap_mode="r")
+    return columns, list(meta.get("tickers") or []), meta.get("source") or f"{entry.name}.csv"
+
+
+def _store_sources(store_path: Path, file_pattern: str) -> dict[str, Path]:
+    sources = {}
+    if not store_path.is_dir():
+        return sources
+    for entry in store_path.iterdir():
+        name = f"{entry.name}.csv"
+        if fnmatch(name, file_pattern) and (entry / "meta.json").exists():
+            sources[name] = entry
+    return sources
+
+
+def load_market_columns(
+    log_dir: str,
+    *,
+    store_dir: str | None = None,
+    file_pattern: str = "market_data_*.csv",
+    start_ts: datetime | None = None,
+    end_ts: datetime | None = None,
+) -> tuple[dict[str, np.ndarray], list[str], list[str]]:
+    """Merge all market files into time-sorted columns.
+
+    Returns (columns, tickers, source_files). Columns carry global ticker codes
+    and a "source_order" index into source_files; rows are ordered by
+    (time, source_order, source_row) like iter_ticks_from_market_logs.
+    """
+    log_path = Path(log_dir)
+    store_path = Path(store_dir) if store_dir else default_store_dir(log_dir)
+    start_ns = _epoch_ns(start_ts) if start_ts is not None else None
+    end_ns = _epoch_ns(end_ts) if end_ts is not None else None
+    csv_files = {p.name: p for p in list_log_files(log_path, file_pattern)}
+    store_entries = _store_sources(store_path, file_pattern)
+
+    tickers: list[str] = []
+    ticker_codes: dict[str, int] = {}
+    parts: dict[str, list[np.ndarray]] = {}
+    source_files: list[str] = []
+    for name in sorted(set(csv_files) | set(store_entries)):
+        csv_path = csv_files.get(name)
+        entry = store_entries.get(name)
+        try:
+            if entry is not None and _is_fresh(entry, csv_path):
+                columns, file_tickers, _ = load_store_entry(entry)
+            elif csv_path is not None:
+                columns, file_tickers = read_csv_columns(csv_path)
+            else:
+                continue
+        except OSError:
+            continue
+        if start_ns is not None or end_ns is not None:
+            times = np.asarray(columns["time_ns"])
+            mask = np.ones(len(times), dtype=bool)
+            if start_ns is not None:
+                mask &= times >= start_ns
+            if end_ns is not None:
+                mask &= times <= end_ns
+            columns = {name: np.asarray(values)[mask] for name, values in columns.items()}
+        remap = np.empty(max(len(file_tickers), 1), dtype=np.int32)
+        for code, ticker in enumerate(file_tickers):
+            global_code = ticker_codes.get(ticker)
+            if global_code is None:
+                global_code = len(tickers)
+                ticker_codes[ticker] = global_code
+                tickers.append(ticker)
+            remap[code] = global_code
+        n = len(columns["time_ns"])
+        file_idx = len(source_files)
+        source_files.append(name)
+        parts.setdefault("ticker", []).append(remap[np.asarray(columns["ticker"], dtype=np.int32)])
+        parts.setdefault("source_order", []).append(np.full(n, file_idx, dtype=np.int32))
+        for col in ("time_ns", "source_row") + PRICE_COLUMNS:
+            parts.setdefault(col, []).append(np.asarray(columns[col]))
+
+    if not source_files:
+        return {}, tickers, source_files
+    merged = {col: np.concatenate(values) for col, values in parts.items()}
+    order = np.lexsort((merged["source_row"], merged["source_order"], merged["time_ns"]))
+    return {col: values[order] for col, values in merged.items()}, tickers, source_files
+
+
+def iter_ticks_from_columns(
+    columns: dict[str, np.ndarray],
+    tickers: list[str],
+    source_files: list[str],
+) -> Iterable[dict]:
+    total = len(columns.get("time_ns", ()))
+    seq = 0
+    for start in range(0, total, _CHUNK_ROWS):
+        stop = min(start + _CHUNK_ROWS, total)
+        times = columns["time_ns"][start:stop].view("datetime64[ns]").astype("datetime64[us]").tolist()
+        codes = columns["ticker"][start:stop].tolist()
+        orders = columns["source_order"][start:stop].tolist()
+        rows = columns["source_row"][start:stop].tolist()
+        prices = {
+            name: [None if v < 0 else float(v) for v in columns[name][start:stop].tolist()]
+            for name in PRICE_COLUMNS
+        }
+        for i in range(stop - start):
+            seq += 1
+            yield {
+                "time": times[i],
+                "ticker": tickers[codes[i]],
+                "market_state": _build_market_state({name: prices[name][i] for name in PRICE_COLUMNS}),
+                "seq": seq,
+                "source_file": source_files[orders[i]],
+                "source_row": rows[i],
+            }
+
+
+def iter_ticks_from_tick_store(
+    log_dir: str,
+    *,
+    store_dir: str | None = None,
+    file_pattern: str = "market_data_*.csv",
+    start_ts: datetime | None = None,
+    end_ts: datetime | None = None,
+) -> Iterable[dict]:
+    """Drop-in replacement for the non-follow iter_ticks_from_market_logs."""
+    columns, tickers, source_files = load_market_columns(
+        log_dir,
+        store_dir=store_dir,
+        file_pattern=file_pattern,
+        start_ts=start_ts,
+        end_ts=end_ts,
+    )
+    if not source_files:
+        return []
+    yield from iter_ticks_from_columns(columns, tickers, source_files)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Convert market_data_*.csv logs into the columnar tick store.")
+    parser.add_argument("--log-dir", default=os.path.join("vm_logs", "market_logs"))
+    parser.add_argument("--store-dir", default="", help="Store directory (blank = <log-dir>/tick_store)")
+    parser.add_argument("--file-pattern", default="market_data_*.csv", help="Glob pattern for market logs")
+    parser.add_argument("--force", action="store_true", help="Re-convert files even if their store entry is fresh")
+    args = parser.parse_args()
+
+    converted = convert_market_logs(
+        args.log_dir,
+        store_dir=args.store_dir or None,
+        file_pattern=args.file_pattern,
+        force=args.force,
+    )
+    store_dir = args.store_dir or default_store_dir(args.log_dir)
+    print(f"Converted {len(converted)} file(s) into {store_dir}")
+    for name in converted:
+        print(f"  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
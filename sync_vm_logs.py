@@ -1,8 +1,9 @@
 import subprocess
+import hashlib
+import json
 import os
+import shlex
 import sys
-from datetime import datetime, timedelta
-import re
 
 # Configuration
 VM_USER = "jetpackjules"
@@ -11,9 +12,288 @@ SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 KEY_FILE = os.path.join(SCRIPT_DIR, "keys", "gcp_key")  # Absolute path to SSH key
 LOCAL_LOG_DIR = "vm_logs"
 LOCAL_MIRROR_DIR = "server_mirror"
+REMOTE_MARKET_DIR = "market_logs"
+# Remote files as last synced: {remote path: {"size", "mtime", "sha256", "local_mtime"}}
+SYNC_STATE_FILE = os.path.join(LOCAL_LOG_DIR, "sync_state.json")
+# Command prefix that runs one shell command on the VM. Override with e.g.
+# VM_SSH="bash -c" VM_HOME=/tmp/fake_vm to sync from a local directory.
+SSH_PREFIX = shlex.split(os.environ["VM_SSH"]) if os.environ.get("VM_SSH") else [
+    "ssh",
+    "-i", KEY_FILE,
+    "-o", "StrictHostKeyChecking=no",
+    f"{VM_USER}@{VM_IP}",
+]
+# Directory remote paths are relative to ("" = the ssh login directory).
+REMOTE_HOME = os.environ.get("VM_HOME", "")
+SKIP_SUFFIXES = (".tmp", ".sock", ".idx")  # .idx sidecars are rebuilt locally
+HASH_CHUNK = 1 << 20
+
+# Runs on the VM: stats the requested files and directories and hashes
+# anything that changed since the last sync. Reads {"files": {path:
+# [size, mtime]}, "dirs": [dir]} on stdin and prints {path: info}. For
+# files that grew, "prefix_sha256" covers the first `size` bytes we already
+# hold, so a local copy can be extended in place rather than re-fetched.
+# CSVs are cut back to the last complete row so a half-written line never
+# lands locally.
+REMOTE_STAT_SCRIPT = r'''
+import hashlib, json, os, sys
+req = json.load(sys.stdin)
+known = req["files"]
+paths = list(known)
+for d in req["dirs"]:
+    try:
+        names = sorted(os.listdir(d))
+    except OSError:
+        continue
+    for name in names:
+        if name.endswith(tuple(req["skip"])):
+            continue
+        path = d + "/" + name
+        if path not in known and os.path.isfile(path):
+            paths.append(path)
+out = {}
+for path in paths:
+    try:
+        st = os.stat(path)
+    except OSError:
+        continue
+    have_size, have_mtime = known.get(path) or (0, None)
+    if st.st_size == have_size and st.st_mtime == have_mtime:
+        out[path] = {"size": st.st_size, "mtime": st.st_mtime, "unchanged": True}
+        continue
+    size = st.st_size
+    info = {"mtime": st.st_mtime}
+    with open(path, "rb") as f:
+        if path.endswith(".csv") and size:
+            f.seek(max(0, size - 65536))
+            tail = f.read(size - f.tell())
+            size -= len(tail) - (tail.rfind(b"\n") + 1)
+            f.seek(0)
+        h = hashlib.sha256()
+        done = 0
+        while done < size:
+            if done < have_size <= size:
+                step = have_size - done
+            else:
+                step = size - done
+            chunk = f.read(min(step, 1 << 20))
+            if not chunk:
+                break
+            h.update(chunk)
+            done += len(chunk)
+            if done == have_size:
+                info["prefix_sha256"] = h.hexdigest()
+    info["size"] = done
+    info["sha256"] = h.hexdigest()
+    out[path] = info
+json.dump(out, sys.stdout)
+'''
+
+
+def remote_path(path):
+    return f"{REMOTE_HOME.rstrip('/')}/{path}" if REMOTE_HOME else path
+
+
+def run_remote(command, **kwargs):
+    return subprocess.run(SSH_PREFIX + [command], **kwargs)
+
+
+def load_sync_state():
+    try:
+        with open(SYNC_STATE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_sync_state(state):
+    temp_path = SYNC_STATE_FILE + ".tmp"
+    with open(temp_path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(temp_path, SYNC_STATE_FILE)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def remove_sidecars(local_path):
+    # log_index sidecars only notice truncation, so a file that was replaced
+    # rather than appended to must have its index rebuilt from scratch.
+    index_path = local_path + ".idx"
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+
+def stat_remote(targets, state, dirs=()):
+    """Stat (and where needed hash) remote files in one ssh round trip.
+
+    targets maps remote path -> local path; only entries whose local copy
+    still matches the recorded state send their known size and mtime, so
+    anything touched locally is re-verified from scratch.
+    """
+    known = {}
+    for remote, local in targets.items():
+        entry = state.get(remote)
+        if (
+            entry
+            and os.path.exists(local)
+            and os.path.getsize(local) == entry["size"]
+            and os.path.getmtime(local) == entry.get("local_mtime")
+        ):
+            known[remote] = [entry["size"], entry["mtime"]]
+        else:
+            known[remote] = [0, None]
+    request = json.dumps({"files": known, "dirs": list(dirs), "skip": list(SKIP_SUFFIXES)})
+    result = run_remote(
+        "python3 -c " + shlex.quote(REMOTE_STAT_SCRIPT),
+        input=request, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout), known
+
+
+def fetch_range(remote, local_handle, offset, length):
+    """Stream `length` bytes of the remote file starting at `offset` into local_handle."""
+    command = f"tail -c +{offset + 1} {shlex.quote(remote)} | head -c {length}"
+    run_remote(command, stdout=local_handle, stderr=subprocess.PIPE, check=True)
+
+
+def record_synced(state, remote, local, info):
+    state[remote] = {
+        "size": info["size"],
+        "mtime": info["mtime"],
+        "sha256": info["sha256"],
+        "local_mtime": os.path.getmtime(local),
+    }
+
+
+def sync_file(remote, local, info, known_size, state):
+    """Bring `local` up to date with the remote file described by info.
+
+    Returns "unchanged", "appended", "fetched" or "failed". Transfers are
+    verified against the remote sha256 before the sync state records them.
+    """
+    entry = state.get(remote)
+    size = info["size"]
+    if info.get("unchanged"):
+        return "unchanged"
+
+    can_append = (
+        entry is not None
+        and known_size == entry["size"]
+        and info.get("prefix_sha256") == entry["sha256"]
+        and os.path.exists(local)
+        and os.path.getsize(local) == known_size
+    )
+    if can_append and size == known_size:
+        # Touched but not grown: nothing to transfer.
+        record_synced(state, remote, local, info)
+        return "unchanged"
+
+    try:
+        if can_append:
+            with open(local, "ab") as f:
+                fetch_range(remote, f, known_size, size - known_size)
+            if os.path.getsize(local) != size or file_sha256(local) != info["sha256"]:
+                with open(local, "r+b") as f:
+                    f.truncate(known_size)
+                print(f"  Verification failed for {remote}; kept the previous {known_size} bytes")
+                return "failed"
+            outcome = "appended"
+        else:
+            temp_path = local + ".part"
+            with open(temp_path, "wb") as f:
+                fetch_range(remote, f, 0, size)
+            if os.path.getsize(temp_path) != size or file_sha256(temp_path) != info["sha256"]:
+                os.remove(temp_path)
+                print(f"  Verification failed for {remote}; local copy left as it was")
+                return "failed"
+            os.replace(temp_path, local)
+            remove_sidecars(local)
+            outcome = "fetched"
+    except subprocess.CalledProcessError as e:
+        print(f"  Error transferring {remote}: {e.stderr.decode(errors='ignore').strip() or e}")
+        if can_append:
+            with open(local, "r+b") as f:
+                f.truncate(known_size)
+        return "failed"
+
+    record_synced(state, remote, local, info)
+    return outcome
+
+
+def sync_remote_files(targets, state, dirs=(), local_dirs=None):
+    """Delta-sync explicit files plus every file in the given remote directories.
+
+    targets maps remote path -> local path; local_dirs maps each remote
+    directory to the local directory its files land in.
+    """
+    local_dirs = local_dirs or {}
+    targets = dict(targets)
+    for d in dirs:
+        for remote in state:
+            if remote.startswith(d + "/"):
+                targets.setdefault(remote, os.path.join(local_dirs[d], remote.rsplit("/", 1)[1]))
+    try:
+        remote_info, known = stat_remote(targets, state, dirs)
+    except subprocess.CalledProcessError as e:
+        print(f"Error listing remote files: {e.stderr.strip() or e.returncode}")
+        return {}
+    except ValueError as e:
+        print(f"Error reading remote file list: {e}")
+        return {}
+
+    outcomes = {}
+    for remote in sorted(remote_info):
+        local = targets.get(remote)
+        if local is None:
+            d, name = remote.rsplit("/", 1)
+            local = os.path.join(local_dirs[d], name)
+        info = remote_info[remote]
+        outcome = sync_file(remote, local, info, known.get(remote, [0, None])[0], state)
+        outcomes[remote] = outcome
+        if outcome in ("appended", "fetched"):
+            moved = info["size"] - (known.get(remote, [0])[0] if outcome == "appended" else 0)
+            print(f"  {outcome:8s} {os.path.basename(remote)} (+{moved} bytes)")
+
+    for remote in targets:
+        if remote not in remote_info and not any(remote.startswith(d + "/") for d in dirs):
+            print(f"  {remote} not found on the VM")
+
+    for d in dirs:
+        # A plain log that vanished because the logger rotated it into
+        # <name>.gz must go locally too, or readers would see its rows twice.
+        for remote in [r for r in state if r.startswith(d + "/") and r not in remote_info]:
+            if remote + ".gz" in remote_info and outcomes.get(remote + ".gz") != "failed":
+                local = targets[remote]
+                if os.path.exists(local):
+                    os.remove(local)
+                    remove_sidecars(local)
+                    print(f"  removed  {os.path.basename(local)} (rotated on the VM)")
+                del state[remote]
+    return outcomes
+
+
+def sync_market_logs():
+    """Incrementally mirror the VM's market_logs/ into vm_logs/market_logs/."""
+    local_market_dir = os.path.join(LOCAL_LOG_DIR, "market_logs")
+    os.makedirs(local_market_dir, exist_ok=True)
+    remote_dir = remote_path(REMOTE_MARKET_DIR)
+    state = load_sync_state()
+    outcomes = sync_remote_files({}, state, dirs=[remote_dir], local_dirs={remote_dir: local_market_dir})
+    save_sync_state(state)
+    changed = sum(1 for o in outcomes.values() if o in ("appended", "fetched"))
+    failed = sum(1 for o in outcomes.values() if o == "failed")
+    print(f"market_logs: {changed} updated, {len(outcomes) - changed - failed} unchanged, {failed} failed")
+    return outcomes
+
 
 def sync_logs():
-    """Downloads logger.log and market_logs from the VM."""
+    """Downloads logger.log and market_logs from the VM, transferring only what changed."""
     
     # Ensure local log directory exists
     if not os.path.exists(LOCAL_LOG_DIR):
@@ -22,39 +302,22 @@ def sync_logs():
 
     print(f"Syncing logs from {VM_IP}...")
 
-    # 1. Download logger.log (granular logger stdout)
-    print("Downloading logger.log...")
-    cmd_logger = [
-        "scp",
-        "-i", KEY_FILE,
-        "-o", "StrictHostKeyChecking=no",
-        f"{VM_USER}@{VM_IP}:~/logger.log",
-        f"{LOCAL_LOG_DIR}/"
-    ]
-
-    try:
-        subprocess.run(cmd_logger, check=True)
-        print("Successfully downloaded logger.log")
-    except subprocess.CalledProcessError as e:
-        print(f"Error downloading logger.log: {e}")
-
-    # 1a. Download output.log into server_mirror/ for live status parsing
+    # 1. Growing logs: logger.log (granular logger stdout), output.log into
+    # server_mirror/ for live status parsing, and unified_engine.log. Only
+    # the bytes appended since the last sync cross the wire.
     if not os.path.exists(LOCAL_MIRROR_DIR):
         os.makedirs(LOCAL_MIRROR_DIR)
-    print("Downloading output.log...")
-    cmd_output = [
-        "scp",
-        "-i", KEY_FILE,
-        "-o", "StrictHostKeyChecking=no",
-        f"{VM_USER}@{VM_IP}:~/output.log",
-        f"{LOCAL_MIRROR_DIR}/"
-    ]
-
-    try:
-        subprocess.run(cmd_output, check=True)
-        print("Successfully downloaded output.log")
-    except subprocess.CalledProcessError as e:
-        print(f"Error downloading output.log: {e}")
+    print("Syncing logger.log, output.log and unified_engine.log...")
+    state = load_sync_state()
+    sync_remote_files(
+        {
+            remote_path("logger.log"): os.path.join(LOCAL_LOG_DIR, "logger.log"),
+            remote_path("output.log"): os.path.join(LOCAL_MIRROR_DIR, "output.log"),
+            remote_path("unified_engine.log"): os.path.join(LOCAL_LOG_DIR, "unified_engine.log"),
+        },
+        state,
+    )
+    save_sync_state(state)
 
     # 1b. Download trader_status.json
     print("Downloading trader_status.json...")
@@ -97,22 +360,6 @@ def sync_logs():
     except subprocess.CalledProcessError as e:
         print(f"Error downloading trader_status.json: {e}")
 
-    # 1c. Download unified_engine.log
-    print("Downloading unified_engine.log...")
-    cmd_unified_log = [
-        "scp",
-        "-i", KEY_FILE,
-        "-o", "StrictHostKeyChecking=no",
-        f"{VM_USER}@{VM_IP}:~/unified_engine.log",
-        f"{LOCAL_LOG_DIR}/"
-    ]
-
-    try:
-        subprocess.run(cmd_unified_log, check=True)
-        print("Successfully downloaded unified_engine.log")
-    except subprocess.CalledProcessError as e:
-        print(f"Error downloading unified_engine.log: {e}")
-
     # 1d. Download unified_engine_out outputs (live unified engine)
     print("Downloading unified_engine_out outputs...")
     unified_out_dir = os.path.join(LOCAL_LOG_DIR, "unified_engine_out")
@@ -161,88 +408,17 @@ def sync_logs():
     except subprocess.CalledProcessError as e:
         print(f"Error downloading daily snapshots: {e}")
 
-    # 2. Download market_logs directory (selective)
+    # 2. market_logs/: growing CSVs and journals are extended in place,
+    # unchanged closed files are skipped, rotated .gz logs replace their CSVs.
     print("\nSyncing market_logs/...")
-    
-    # Ensure local market_logs directory exists
-    local_market_dir = os.path.join(LOCAL_LOG_DIR, "market_logs")
-    if not os.path.exists(local_market_dir):
-        os.makedirs(local_market_dir)
-
-    # Get list of files on VM
-    cmd_list_vm = [
-        "ssh",
-        "-i", KEY_FILE,
-        "-o", "StrictHostKeyChecking=no",
-        f"{VM_USER}@{VM_IP}",
-        "ls ~/market_logs"
-    ]
-    
-    try:
-        result = subprocess.run(cmd_list_vm, capture_output=True, text=True, check=True)
-        vm_files = result.stdout.splitlines()
-    except subprocess.CalledProcessError as e:
-        print(f"Error listing files on VM: {e}")
-        return
-
-    # Get list of local files
-    local_files = os.listdir(local_market_dir)
-    
-    # Date threshold: 2 days ago
-    threshold_date = datetime.now() - timedelta(days=2)
-    
-    files_to_download = []
-    
-    # Regex to extract date from filename (e.g., market_data_KXHIGHNY-25DEC22.csv)
-    date_pattern = re.compile(r'-(\d{2}[A-Z]{3}\d{2})\.csv')
-
-    for filename in vm_files:
-        if filename == "manifest.json":
-            files_to_download.append(filename)
-            continue
-            
-        is_missing = filename not in local_files
-        
-        # Check if it's a recent file
-        match = date_pattern.search(filename)
-        is_recent = False
-        if match:
-            date_str = match.group(1)
-            try:
-                # Format: 25DEC22
-                file_date = datetime.strptime(date_str, "%y%b%d")
-                if file_date >= threshold_date:
-                    is_recent = True
-            except ValueError:
-                pass
-        
-        if is_missing or is_recent:
-            files_to_download.append(filename)
-            reason = "missing" if is_missing else "recent"
-            print(f"  Queuing {filename} ({reason})")
-
-    if not files_to_download:
-        print("No new or recent files to download.")
-    else:
-        print(f"Downloading {len(files_to_download)} files...")
-        # Download files individually to avoid complex scp patterns
-        for filename in files_to_download:
-            cmd_scp = [
-                "scp",
-                "-i", KEY_FILE,
-                "-o", "StrictHostKeyChecking=no",
-                f"{VM_USER}@{VM_IP}:~/market_logs/{filename}",
-                f"{local_market_dir}/"
-            ]
-            try:
-                subprocess.run(cmd_scp, check=True, capture_output=True)
-                # print(f"  Downloaded {filename}")
-            except subprocess.CalledProcessError as e:
-                print(f"  Error downloading {filename}: {e}")
+    sync_market_logs()
 
     print("\nSync complete! Logs are in the 'vm_logs' folder.")
 
 if __name__ == "__main__":
     # Change to the directory of the script to ensure relative paths work
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
-    sync_logs()
+    if "--market-logs-only" in sys.argv[1:]:
+        sync_market_logs()
+    else:
+        sync_logs()
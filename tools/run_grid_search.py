@@ -1,90 +1,54 @@
 import argparse
+import json
 import subprocess
 import sys
 import os
-import time
-import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
 
-def run_variant(variant_config, snapshot_path, out_dir, verbose=False, stream_output=False):
+# Ensure repo root is on sys.path so `server_mirror` imports work when executed from `tools/`.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+from server_mirror.unified_engine.backtest import BacktestConfig
+from server_mirror.unified_engine.sweep import run_sweep, variant_dir_name
+
+GRID_START_TS = datetime(2025, 12, 5, 0, 0, 0)  # Fixed start for consistency
+GRID_END_TS = datetime(2026, 1, 11, 23, 59, 59)  # Fixed end
+
+
+def build_config(variant_config) -> BacktestConfig:
     """
-    Runs a single backtest variant.
     variant_config: (strategy_name, hours_only, label, max_loss_pct, extra_kwargs)
     """
     strategy_name, hours_only, label, max_loss_pct, extra_kwargs = variant_config
-    
-    # Construct command
-    cmd = [
-        sys.executable, "run_unified_backtest.py",
-        "--snapshot", snapshot_path,
-        "--strategy", strategy_name,
-        "--out-dir", os.path.join(out_dir, label.replace(" ", "_").replace("(", "").replace(")", "")),
-        "--start-ts", "2025-12-05 00:00:00", # Fixed start for consistency
-        "--end-ts", "2026-01-11 23:59:59",   # Fixed end
-    ]
-    
-    if max_loss_pct is not None:
-        cmd.extend(["--max-loss-pct", str(max_loss_pct)])
-        
-    if not hours_only:
-        cmd.append("--trade-all-day")
-        
-    if extra_kwargs:
-        import json
-        cmd.extend(["--strategy-kwargs", json.dumps(extra_kwargs)])
-
-    if verbose:
-        cmd.append("--verbose")
-    elif not stream_output:
-        # If streaming, we want default output (progress bar), so don't add quiet.
-        # If NOT streaming, we want quiet.
-        cmd.append("--quiet")
-
-    start_time = time.time()
-    try:
-        # Run process
-        if stream_output:
-            # Stream directly to stdout/stderr
-            subprocess.run(cmd, check=True)
-            print() # Newline after progress bar
-            # We can't capture output easily if we stream, so we can't parse final equity from stdout.
-            # We need to read it from the CSV or just return 0.0 and rely on the file.
-            # OR we can rely on the fact that run_unified_backtest.py writes to a file.
-            # Let's just return 0.0 for equity for the streaming one, or try to read the log file?
-            # Reading the log file is safer.
-            final_equity = 0.0 
-            # TODO: Read from trade log or summary file if needed.
-            # For now, just return 0.0 to avoid crashing. The user sees the progress bar, that's what matters.
-        else:
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            
-            # Parse Output for Final Equity
-            final_equity = 0.0
-            match = re.search(r"Total Portfolio Value: \$([\d\.]+)", result.stdout)
-            if match:
-                final_equity = float(match.group(1))
-            
-        duration = time.time() - start_time
-        return {
-            "label": label,
-            "equity": final_equity,
-            "duration": duration,
-            "status": "SUCCESS"
-        }
-        
-    except subprocess.CalledProcessError as e:
-        return {
-            "label": label,
-            "equity": 0.0,
-            "duration": time.time() - start_time,
-            "status": "FAIL",
-            "error": str(e)
-        }
+    return BacktestConfig(
+        start_ts=GRID_START_TS,
+        end_ts=GRID_END_TS,
+        strategy=strategy_name,
+        strategy_kwargs=extra_kwargs or None,
+        label=label,
+        max_loss_pct=max_loss_pct,
+        trade_all_day=not hours_only,
+    )
+
 
 def main():
     parser = argparse.ArgumentParser(description="Run Grid Search Strategy Optimization")
     parser.add_argument("--snapshot", required=True, help="Path to snapshot JSON")
     parser.add_argument("--workers", type=int, default=16, help="Number of parallel workers")
+    parser.add_argument("--log-dir", default=os.path.join("vm_logs", "market_logs"), help="Directory containing market logs")
+    parser.add_argument(
+        "--tick-cache",
+        default="",
+        help="Shared tick cache dir every worker replays from (blank = <log-dir>/tick_cache)",
+    )
+    parser.add_argument(
+        "--engines-per-worker",
+        type=int,
+        default=1,
+        help="Variants each worker drives side by side from a single pass over the ticks",
+    )
     args = parser.parse_args()
     
     # 1. Define Grid
@@ -110,34 +74,45 @@ def main():
         )
         
     print(f"Generated {len(variants)} variants. Running with {args.workers} workers...")
-    
-    results = []
-    with ThreadPoolExecutor(max_workers=args.workers) as executor:
-        # Submit variants, enabling streaming for one worker per batch (roughly)
-        futures = {}
-        for i, v in enumerate(variants):
-            # Stream if it's the first of a batch (0, 16, 32...)
-            should_stream = (i % args.workers == 0)
-            futures[executor.submit(run_variant, v, args.snapshot, "grid_search_out", stream_output=should_stream)] = v
-        
-        completed = 0
-        for future in as_completed(futures):
-            completed += 1
-            res = future.result()
-            results.append(res)
-            print(f"[{completed}/{len(variants)}] {res['status']} {res['label']} -> ${res['equity']:.2f} ({res['duration']:.1f}s)")
-            
+
+    completed = 0
+
+    def _report(res):
+        nonlocal completed
+        completed += 1
+        print(
+            f"[{completed}/{len(variants)}] {res.status} {res.label} -> ${res.final_equity:.2f} "
+            f"({res.trade_count} trades, {res.wall_time:.1f}s)"
+        )
+        if res.error:
+            print(res.error)
+
+    results = run_sweep(
+        [build_config(v) for v in variants],
+        snapshot_path=args.snapshot,
+        log_dir=args.log_dir,
+        tick_cache=args.tick_cache or None,
+        out_root="grid_search_out",
+        workers=args.workers,
+        engines_per_worker=args.engines_per_worker,
+        on_result=_report,
+    )
+
+    os.makedirs("grid_search_out", exist_ok=True)
+    with open(os.path.join("grid_search_out", "results.json"), "w", encoding="utf-8") as f:
+        json.dump([vars(res) for res in results], f, indent=2)
+
     # 2. Analyze Results
     print("\n--- GRID SEARCH RESULTS ---")
-    sorted_results = sorted(results, key=lambda x: x['equity'], reverse=True)
+    sorted_results = sorted(results, key=lambda x: x.final_equity, reverse=True)
     
-    print(f"{'Rank':<5} {'Label':<30} {'Equity':<10} {'Duration':<10}")
-    print("-" * 60)
+    print(f"{'Rank':<5} {'Label':<30} {'Equity':<10} {'Trades':<8} {'Duration':<10}")
+    print("-" * 70)
     for i, res in enumerate(sorted_results):
-        print(f"{i+1:<5} {res['label']:<30} ${res['equity']:<10.2f} {res['duration']:<10.1f}s")
+        print(f"{i+1:<5} {res.label:<30} ${res.final_equity:<10.2f} {res.trade_count:<8} {res.wall_time:<10.1f}s")
         
     # Calculate Stats
-    equities = [r['equity'] for r in results if r['status'] == 'SUCCESS']
+    equities = [r.final_equity for r in results if r.status == 'SUCCESS']
     if equities:
         import statistics
         print(f"\nMean Equity: ${statistics.mean(equities):.2f}")
@@ -157,15 +132,10 @@ def main():
             return
 
         # Construct variants args: --out-dir PATH --label LABEL
-        # Path must match what was passed to run_unified_backtest.py
-        # out_dir = os.path.join("grid_search_out", label...)
         variant_args = []
         for res in top_variants:
-            label = res['label']
-            # Reconstruct the directory path logic from run_variant
-            dir_name = label.replace(" ", "_").replace("(", "").replace(")", "")
-            path = os.path.join("grid_search_out", dir_name)
-            variant_args.extend(["--out-dir", path, "--label", label])
+            path = res.out_dir or os.path.join("grid_search_out", variant_dir_name(res.label))
+            variant_args.extend(["--out-dir", path, "--label", res.label])
 
         cmd = [
             sys.executable, graph_script,
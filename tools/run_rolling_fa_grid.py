@@ -1,5 +1,6 @@
 import argparse
 import csv
+import os
 import subprocess
 import sys
 from pathlib import Path
@@ -55,6 +56,12 @@ def main() -> None:
     parser.add_argument("--workers", type=int, default=6, help="Workers per rolling run")
     parser.add_argument("--out-dir", default="backtest_charts", help="Output directory")
     parser.add_argument("--out-prefix", default="rolling_start_roi_dec04_dec100", help="Output prefix")
+    parser.add_argument("--log-dir", default=os.path.join("vm_logs", "market_logs"), help="Directory containing market logs")
+    parser.add_argument(
+        "--tick-cache",
+        default="",
+        help="Shared tick cache dir reused by every rolling run (built once on first use)",
+    )
     args = parser.parse_args()
 
     out_dir = Path(args.out_dir)
@@ -103,7 +110,11 @@ def main() -> None:
                 "--skip-existing",
                 "--workers",
                 str(args.workers),
+                "--log-dir",
+                args.log_dir,
             ]
+            if args.tick_cache:
+                cmd.extend(["--tick-cache", args.tick_cache])
             if args.strategy_kwargs and args.strategy_kwargs != "{}":
                 cmd.extend(["--strategy-kwargs", args.strategy_kwargs])
             subprocess.run(cmd, check=True)
@@ -9,6 +9,11 @@ from pathlib import Path
 
 import plotly.graph_objects as go
 
+# Ensure repo root is on sys.path so `server_mirror` imports work when executed from `tools/`.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
 
 def _parse_date(value: str) -> datetime.date:
     return datetime.strptime(value, "%Y-%m-%d").date()
@@ -101,6 +106,12 @@ def main() -> None:
         default=min(8, os.cpu_count() or 4),
         help="Max parallel workers",
     )
+    parser.add_argument("--log-dir", default=os.path.join("vm_logs", "market_logs"), help="Directory containing market logs")
+    parser.add_argument(
+        "--tick-cache",
+        default="",
+        help="Parse the history once into this shared tick cache dir and have every run attach to it",
+    )
     args = parser.parse_args()
 
     start_date = _parse_date(args.start_date)
@@ -144,6 +155,12 @@ def main() -> None:
             continue
         pending_days.append((day, start_ts_str, out_dir))
 
+    if pending_days and args.tick_cache:
+        from server_mirror.unified_engine.tick_cache import ensure_tick_cache
+
+        built = ensure_tick_cache(args.log_dir, args.tick_cache)
+        print(f"{'Built' if built else 'Reusing'} shared tick cache: {args.tick_cache}")
+
     def _run_day(day: datetime.date, start_ts_str: str, out_dir: Path) -> datetime.date:
         cmd = [
             sys.executable,
@@ -164,8 +181,12 @@ def main() -> None:
             str(args.min_requote_interval),
             "--day-boundary-hour",
             str(args.day_boundary_hour),
+            "--log-dir",
+            args.log_dir,
             "--quiet",
         ]
+        if args.tick_cache:
+            cmd.extend(["--tick-cache", args.tick_cache])
         if args.strategy_kwargs and args.strategy_kwargs != "{}":
             cmd.extend(["--strategy-kwargs", args.strategy_kwargs])
         if args.famine_days and args.abundance_days:
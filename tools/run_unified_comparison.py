@@ -8,6 +8,11 @@ import sys
 import time
 from pathlib import Path
 
+# Ensure repo root is on sys.path so `server_mirror` imports work when executed from `tools/`.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
 
 def run_command(cmd, show_command=False):
     if show_command:
@@ -133,8 +138,27 @@ def main():
         default="backtest_charts/variant_graphs",
         help="Output directory for per-variant graphs",
     )
+    parser.add_argument(
+        "--log-dir",
+        type=str,
+        default="",
+        help="Market log directory passed to run_unified_backtest.py (blank = its default)",
+    )
+    parser.add_argument(
+        "--tick-cache",
+        type=str,
+        default="",
+        help="Parse the history once into this shared tick cache dir and have every variant attach to it",
+    )
     args = parser.parse_args()
 
+    if args.tick_cache:
+        from server_mirror.unified_engine.tick_cache import ensure_tick_cache
+
+        cache_log_dir = args.log_dir or os.path.join("vm_logs", "market_logs")
+        built = ensure_tick_cache(cache_log_dir, args.tick_cache)
+        print(f"{'Built' if built else 'Reusing'} shared tick cache: {args.tick_cache}", flush=True)
+
     if args.use_snapshot_start or args.use_snapshot_balance or not args.start_ts or args.initial_cash is None:
         with open(args.snapshot, "r", encoding="utf-8") as f:
             snapshot = json.load(f)
@@ -354,6 +378,10 @@ def main():
         ]
         if max_loss_pct is not None:
             cmd.extend(["--max-loss-pct", str(max_loss_pct)])
+        if args.log_dir:
+            cmd.extend(["--log-dir", f'"{args.log_dir}"'])
+        if args.tick_cache:
+            cmd.extend(["--tick-cache", f'"{args.tick_cache}"'])
         if strat_kwargs:
             # Pass as JSON string
             kwargs_json = json.dumps(strat_kwargs).replace('"', '\\"')